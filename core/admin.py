@@ -1,7 +1,8 @@
 from django.contrib import admin
 from .models import (
     UserProfile, RoomType, Room, ServiceType, Service,
-    Reservation, ReservationService, Payment, Review
+    Reservation, ReservationService, Payment, Review, RoomNight, RoomTypeRating, RoomRating, Task,
+    ArchivedReservation, ArchivedReservationService, ArchivedPayment, ArchivedReview,
 )
 
 admin.site.register(UserProfile)
@@ -13,3 +14,11 @@ admin.site.register(Reservation)
 admin.site.register(ReservationService)
 admin.site.register(Payment)
 admin.site.register(Review)
+admin.site.register(RoomNight)
+admin.site.register(RoomTypeRating)
+admin.site.register(RoomRating)
+admin.site.register(Task)
+admin.site.register(ArchivedReservation)
+admin.site.register(ArchivedReservationService)
+admin.site.register(ArchivedPayment)
+admin.site.register(ArchivedReview)
@@ -0,0 +1,85 @@
+from datetime import date, timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from .models import (
+    ArchivedPayment, ArchivedReservation, ArchivedReservationService, ArchivedReview,
+    Payment, Reservation, ReservationService, Review, RoomNight,
+)
+from .signals import bump_version
+
+# Archival of finished stays. Reservations that checked out or were cancelled
+# before the cutoff move to the Archived* tables together with their services,
+# payments and reviews, one primary key batch per transaction, so the live tables
+# (and the staff lists, exports and indexes over them) only hold the recent past
+# and the future. Stays still holding a room are never archived.
+#
+# The moved rows are deleted without model signals: the stay's nights remain in
+# the occupancy calendar (detached from the reservation) and its reviews keep
+# counting in the rating aggregates; rebuild_ratings and the revenue reports read
+# the archive next to the live tables.
+
+FINISHED_STATUSES = ('checked_out', 'cancelled')
+
+# (live model, archive model), parents first
+ARCHIVED_MODELS = (
+    (Reservation, ArchivedReservation),
+    (ReservationService, ArchivedReservationService),
+    (Payment, ArchivedPayment),
+    (Review, ArchivedReview),
+)
+
+
+def archive_cutoff(today=None):
+    """Stays that checked out before this day are archived."""
+    return (today or date.today()) - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+
+
+def _copy(row, archive_model):
+    return archive_model(**{field.attname: getattr(row, field.attname) for field in row._meta.concrete_fields})
+
+
+def archive_batch(cutoff, batch_size=500):
+    """Move up to ``batch_size`` finished stays that checked out before ``cutoff``.
+
+    Returns {live model: rows moved}, empty when nothing is left to archive.
+    Reservations locked by a concurrent edit are skipped and picked up by a later batch.
+    """
+    with transaction.atomic():
+        reservations = list(
+            Reservation.objects.select_for_update(skip_locked=True)
+            .filter(status__in=FINISHED_STATUSES, check_out__lt=cutoff)
+            .order_by('pk')[:batch_size]
+        )
+        if not reservations:
+            return {}
+        pks = [reservation.pk for reservation in reservations]
+        moved = {}
+        for model, archive_model in ARCHIVED_MODELS:
+            rows = reservations if model is Reservation else list(model.objects.filter(reservation_id__in=pks))
+            archive_model.objects.bulk_create([_copy(row, archive_model) for row in rows])
+            moved[model] = len(rows)
+        RoomNight.objects.filter(reservation_id__in=pks).update(reservation_id=None)
+        # Children first, as plain DELETEs: the rows are not collected and no
+        # post_delete is sent
+        with connection.cursor() as cursor:
+            for model, _ in reversed(ARCHIVED_MODELS):
+                key = model._meta.pk if model is Reservation else model._meta.get_field('reservation_id')
+                cursor.execute(
+                    f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)} '
+                    f'WHERE {connection.ops.quote_name(key.column)} = ANY(%s)',
+                    [pks],
+                )
+        for model, archive_model in ARCHIVED_MODELS:
+            bump_version(model)
+            bump_version(archive_model)
+    return moved
+
+
+def archive_history(cutoff=None, batch_size=500):
+    """Archive every finished stay that checked out before ``cutoff``; returns {live model: rows moved}."""
+    cutoff = cutoff or archive_cutoff()
+    totals = {model: 0 for model, _ in ARCHIVED_MODELS}
+    while moved := archive_batch(cutoff, batch_size):
+        for model, count in moved.items():
+            totals[model] += count
+    return totals
@@ -0,0 +1,110 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.views import View
+from rest_framework.response import Response
+from .cache import CatalogCacheMixin
+from .db import replica_reads
+from .fastpath import ValuesListMixin
+from .middleware import serialization_timer
+from .renderers import FastJSONRenderer
+from .views import ReservationViewSet, RoomTypeViewSet, RoomViewSet
+
+# Async read path for ASGI deployments (see README). Each view runs one list-style
+# action of an existing viewset: authentication, permissions, throttling, query
+# parameters, querysets, pagination, the catalog cache and the .values() fast path
+# are the viewset's own, so the responses match the synchronous endpoints. What
+# differs is how the request waits: the page is counted and fetched with the async
+# ORM, and the DRF setup that may query (token lookup, parameter validation) makes a
+# single hop to the request's thread-sensitive executor. JSON only; conditional GET
+# (ETags) stays on the synchronous endpoints.
+
+
+class AsyncListView(View):
+    viewset = None
+    action = 'list'
+
+    def get_queryset(self, view):
+        """The action's rows before pagination (called in the executor)."""
+        return view.filter_queryset(view.get_queryset())
+
+    async def get(self, request, *args, **kwargs):
+        view = self.viewset(
+            action_map={'get': self.action}, detail=False, basename=self.viewset.queryset.model._meta.model_name,
+            renderer_classes=[FastJSONRenderer],
+        )
+        # What APIView.dispatch() sets up before calling the handler
+        view.args, view.kwargs = args, kwargs
+        view.format_kwarg = view.get_format_suffix(**kwargs)
+        request = view.initialize_request(request, *args, **kwargs)
+        view.request, view.headers = request, view.default_response_headers
+        # ReplicaReadMixin turns replica reads on in the executor; the flag reaches
+        # this context from there and must not outlive the request
+        token = replica_reads.set(False)
+        try:
+            try:
+                response = await self.respond(view, request)
+            except Exception as exc:
+                response = view.handle_exception(exc)
+            view._replica_token = None
+            return view.finalize_response(request, response, *args, **kwargs)
+        finally:
+            replica_reads.reset(token)
+
+    async def respond(self, view, request):
+        cache_key, data, queryset, level = await sync_to_async(self.prepare)(view, request)
+        if data is not None:
+            return Response(data)
+        rows = None
+        if view.paginator is not None:
+            rows = await view.paginator.apaginate_queryset(queryset, request, view)
+        paginated = rows is not None
+        if not paginated:
+            rows = [row async for row in queryset]
+        if level is not None:
+            with serialization_timer(request):
+                data = view.represent_rows(level, rows)
+        else:
+            data = await sync_to_async(lambda: view.get_serializer(rows, many=True).data)()
+        response = view.get_paginated_response(data) if paginated else Response(data)
+        if cache_key is not None:
+            await cache.aset(cache_key, response.data, settings.CATALOG_CACHE_TIMEOUT)
+        return response
+
+    def prepare(self, view, request):
+        view.initial(request, *view.args, **view.kwargs)
+        cache_key = None
+        if isinstance(view, CatalogCacheMixin) and view.caches_action():
+            cache_key = view.catalog_cache_key(request)
+            data = view.cached_data(cache_key)
+            if data is not None:
+                return cache_key, data, None, None
+        queryset = self.get_queryset(view)
+        level = view.values_plan() if isinstance(view, ValuesListMixin) else None
+        if level is not None:
+            queryset = view.values_rows(queryset, level)
+        return cache_key, None, queryset, level
+
+
+class AsyncRoomTypeListView(AsyncListView):
+    viewset = RoomTypeViewSet
+    query_budget = RoomTypeViewSet.query_budget['list']
+
+
+class AsyncRoomListView(AsyncListView):
+    viewset = RoomViewSet
+    query_budget = RoomViewSet.query_budget['list']
+
+
+class AsyncRoomAvailabilityView(AsyncListView):
+    viewset = RoomViewSet
+    action = 'availability'
+    query_budget = RoomViewSet.query_budget['availability']
+
+    def get_queryset(self, view):
+        return view.get_availability_queryset()
+
+
+class AsyncReservationListView(AsyncListView):
+    viewset = ReservationViewSet
+    query_budget = ReservationViewSet.query_budget['list']
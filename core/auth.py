@@ -0,0 +1,64 @@
+import binascii
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from knox.auth import TokenAuthentication
+from knox.crypto import hash_token
+from knox.models import AuthToken
+from knox.settings import knox_settings
+from rest_framework import exceptions
+
+
+def _token_cache_key(digest):
+    return f'knox:token:{digest}'
+
+
+def forget_tokens(*digests):
+    cache.delete_many([_token_cache_key(digest) for digest in digests])
+
+
+# Knox authentication with a short-lived cache of verified tokens.
+# A hit costs one hash and one cache read instead of the token lookup, the
+# expired-token sweep and the user fetch. Entries are dropped when the token is
+# deleted (logout, pruning) or its user changes (see core.signals). That only
+# reaches the processes sharing the cache, so tokens are cached with SHARED_CACHE
+# only; TOKEN_CACHE_TIMEOUT bounds how long a cached copy is trusted.
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, token):
+        if knox_settings.AUTO_REFRESH or not settings.SHARED_CACHE:
+            # AUTO_REFRESH: every request may extend the expiry, which needs the database row
+            return super().authenticate_credentials(token)
+        try:
+            digest = hash_token(token.decode('utf-8'))
+        except (TypeError, UnicodeDecodeError, binascii.Error):
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        auth_token = cache.get(_token_cache_key(digest))
+        if auth_token is not None and (auth_token.expiry is None or auth_token.expiry > timezone.now()):
+            return self.validate_user(auth_token)
+
+        user, auth_token = super().authenticate_credentials(token)
+        timeout = settings.TOKEN_CACHE_TIMEOUT
+        if auth_token.expiry is not None:
+            timeout = min(timeout, int((auth_token.expiry - timezone.now()).total_seconds()))
+        if timeout > 0:
+            cache.set(_token_cache_key(digest), auth_token, timeout)
+        return user, auth_token
+
+
+def prune_tokens(batch_size=1000, max_age_days=None):
+    """Delete expired tokens and tokens of inactive users; returns the number deleted."""
+    now = timezone.now()
+    stale = Q(expiry__lt=now) | Q(user__is_active=False)
+    if max_age_days is not None:
+        stale |= Q(created__lt=now - timedelta(days=max_age_days))
+    deleted = 0
+    while True:
+        # Short transactions: one batch of primary keys at a time
+        digests = list(AuthToken.objects.filter(stale).values_list('digest', flat=True)[:batch_size])
+        if not digests:
+            return deleted
+        deleted += AuthToken.objects.filter(digest__in=digests).delete()[1].get(AuthToken._meta.label, 0)
@@ -0,0 +1,25 @@
+from django.db.models import Exists, OuterRef
+from .models import Reservation, Room
+
+
+def overlapping_reservations(check_in, check_out):
+    """Reservations holding a room for at least one night of [check_in, check_out)."""
+    return Reservation.objects.filter(
+        status__in=Reservation.ACTIVE_STATUSES,
+        check_in__lt=check_out,
+        check_out__gt=check_in,
+    )
+
+
+def available_rooms(check_in, check_out, occupancy=1, room_type=None):
+    """Rooms that can be booked for the whole stay, resolved in a single query.
+
+    The NOT EXISTS probe per room is answered by ``reservation_active_dates_idx``,
+    so its cost depends on the room's active bookings, not on the size of the
+    reservation history.
+    """
+    rooms = Room.objects.filter(type_id__max_occupancy__gte=occupancy).exclude(status='maintenance')
+    if room_type is not None:
+        rooms = rooms.filter(type_id=room_type)
+    booked = overlapping_reservations(check_in, check_out).filter(room_id=OuterRef('pk'))
+    return rooms.filter(~Exists(booked)).order_by('number')
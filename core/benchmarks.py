@@ -0,0 +1,173 @@
+import random
+import statistics
+import time
+from datetime import date, datetime, time as clock, timedelta, timezone
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection
+from .models import Payment, Reservation, Review, Room, RoomType, UserProfile
+from .pricing import record_rates
+
+# Helpers shared by the benchmark management commands. They insert synthetic rows
+# with bulk_create so seeding millions of rows stays practical. ``label`` prefixes
+# every seeded name, so throwaway benchmark data never collides with a seeded
+# load-test dataset.
+
+BATCH_SIZE = 5000
+
+
+class Rollback(Exception):
+    """Raised inside ``transaction.atomic()`` to discard benchmark data."""
+
+
+def seed_catalog(room_types=10, rooms=1000, label='bench'):
+    type_prefix, room_prefix = f"{label.capitalize()} type ", f"{label.upper()}-"
+    types = RoomType.objects.bulk_create([
+        RoomType(
+            name=f"{type_prefix}{i}",
+            price_per_night=random.randint(50, 500),
+            max_occupancy=random.randint(1, 6),
+            has_breakfast=bool(i % 2),
+        )
+        for i in range(room_types)
+    ])
+    Room.objects.bulk_create([
+        Room(number=f"{room_prefix}{i:06d}", type_id=types[i % len(types)])
+        for i in range(rooms)
+    ], batch_size=BATCH_SIZE)
+    return list(RoomType.objects.filter(name__startswith=type_prefix)), list(Room.objects.filter(number__startswith=room_prefix))
+
+
+def seed_users(count=100, label='bench', password=None):
+    """Users ``<label>_user_<n>``; with ``password`` they can log in (the hash is computed once)."""
+    hashed = make_password(password)
+    User.objects.bulk_create([
+        User(username=f"{label}_user_{i}", email=f"{label}_user_{i}@example.com", password=hashed)
+        for i in range(count)
+    ], batch_size=BATCH_SIZE)
+    users = list(User.objects.filter(username__startswith=f"{label}_user_"))
+    UserProfile.objects.bulk_create([UserProfile(user=user) for user in users], batch_size=BATCH_SIZE)
+    return users
+
+
+def seed_reservations(rooms, users, count, today=None, history_days=3 * 365, future_days=180):
+    """Insert ``count`` reservations, mostly checked-out history with a tail of upcoming stays.
+
+    Stays that still hold their room are queued back to back per room, so the
+    data satisfies the no-overlap constraint.
+    """
+    today = today or date.today()
+    free_from = {}
+    batch = []
+    for _ in range(count):
+        room = random.choice(rooms)
+        check_in = today + timedelta(days=random.randint(-history_days, future_days))
+        nights = timedelta(days=random.randint(1, 7))
+        if check_in + nights <= today:
+            status = random.choice(('checked_out', 'checked_out', 'checked_out', 'cancelled'))
+        else:
+            status = random.choice(Reservation.ACTIVE_STATUSES + ('cancelled',))
+        if status in Reservation.ACTIVE_STATUSES:
+            check_in = max(check_in, free_from.get(room.pk, check_in))
+            free_from[room.pk] = check_in + nights
+        batch.append(Reservation(
+            user_id=random.choice(users), room_id=room,
+            check_in=check_in, check_out=check_in + nights, status=status,
+            departed_on=check_in + nights if status == 'checked_out' else None,
+        ))
+        if len(batch) >= BATCH_SIZE:
+            record_rates(batch)
+            Reservation.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        record_rates(batch)
+        Reservation.objects.bulk_create(batch)
+
+
+def _reservation_batches(label, fields):
+    """Rows of the reservations in ``label``'s rooms in primary key batches (no cursor held open while inserting)."""
+    reservations = Reservation.objects.filter(room_id__number__startswith=f"{label.upper()}-").order_by('pk')
+    last = 0
+    while True:
+        batch = list(reservations.filter(pk__gt=last).values_list('pk', *fields)[:BATCH_SIZE])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1][0]
+
+
+def seed_payments(label='bench', ratio=0.8):
+    """Pay for a ``ratio`` of the stays that were not cancelled; completed once the guest arrived."""
+    methods = [method for method, _ in Payment.METHOD_CHOICES]
+    fields = ('status', 'check_in', 'check_out', 'room_id__type_id__price_per_night')
+    for batch in _reservation_batches(label, fields):
+        payments = []
+        for pk, status, check_in, check_out, price in batch:
+            if status == 'cancelled' or random.random() >= ratio:
+                continue
+            completed = status in ('checked_in', 'checked_out')
+            payments.append(Payment(
+                reservation_id_id=pk, amount=price * (check_out - check_in).days, method=random.choice(methods),
+                status='completed' if completed else 'pending', transaction_id=f"TX-{pk}" if completed else None,
+                paid_at=datetime.combine(check_in, clock(15), tzinfo=timezone.utc) if completed else None,
+            ))
+        Payment.objects.bulk_create(payments)
+
+
+def seed_reviews(label='bench', ratio=0.3):
+    """Review a ``ratio`` of the checked-out stays, skewed towards good ratings."""
+    for batch in _reservation_batches(label, ('status', 'user_id')):
+        Review.objects.bulk_create([
+            Review(reservation_id_id=pk, user_id_id=user_id, rating=random.choices(range(1, 6), (1, 2, 5, 12, 20))[0])
+            for pk, status, user_id in batch
+            if status == 'checked_out' and random.random() < ratio
+        ])
+
+
+def delete_tree(model, where, params=(), batch_size=BATCH_SIZE):
+    """DELETE the rows of ``model`` matching ``where`` (SQL over its table) and, first, every row referencing them.
+
+    Each table is emptied in ``batch_size`` statements of plain SQL: no rows are
+    loaded and no signals are sent, so callers bump model versions themselves.
+    Returns the number of rows deleted.
+    """
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    deleted = 0
+    for relation in model._meta.get_fields(include_hidden=True):
+        if relation.auto_created and not relation.concrete and (relation.one_to_many or relation.one_to_one):
+            selected = f"SELECT {quote(relation.field.target_field.column)} FROM {table} WHERE {where}"
+            deleted += delete_tree(
+                relation.related_model, f"{quote(relation.field.column)} IN ({selected})", params, batch_size,
+            )
+    pk = quote(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute(f"DELETE FROM {table} WHERE {pk} IN (SELECT {pk} FROM {table} WHERE {where} LIMIT {batch_size})", params)
+            deleted += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                return deleted
+
+
+def time_call(fn, repeat=20):
+    """Run ``fn`` ``repeat`` times and return the durations in milliseconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(durations):
+    return {
+        'p50': statistics.median(durations),
+        'p95': percentile(durations, 95),
+        'p99': percentile(durations, 99),
+    }
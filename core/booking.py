@@ -0,0 +1,171 @@
+import random
+import time
+from django.db import IntegrityError, OperationalError, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from .availability import available_rooms, overlapping_reservations
+from .bulk import apply_changes
+from .models import Reservation, Room
+from .occupancy import record_departure, replace_nights
+from .pricing import record_rates
+from .tasks import enqueue_many
+
+# Booking engine. Every write that can make a room's stays overlap locks that
+# room's row (SELECT ... FOR UPDATE) and re-checks overlaps inside the same
+# transaction, so bookings for different rooms never wait on each other. The
+# reservation_no_overlap exclusion constraint is the backstop for writes that
+# bypass this module. Transient failures (deadlocks, serialization and lock
+# timeouts) are retried with jittered backoff.
+
+MAX_ATTEMPTS = 5
+
+
+class BookingConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'The room is already booked for some of the requested nights.'
+    default_code = 'booking_conflict'
+
+
+def _retrying(operation):
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            with transaction.atomic():
+                return operation()
+        except IntegrityError as exc:
+            if 'reservation_no_overlap' in str(exc):
+                raise BookingConflict() from exc
+            raise
+        except OperationalError:
+            if attempt == MAX_ATTEMPTS:
+                raise
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+
+def _check_free(room, check_in, check_out, exclude=None):
+    overlapping = overlapping_reservations(check_in, check_out).filter(room_id=room)
+    if exclude is not None:
+        overlapping = overlapping.exclude(pk=exclude.pk)
+    if overlapping.exists():
+        raise BookingConflict()
+
+
+def book_room(*, user, room, check_in, check_out, status='pending'):
+    """Create a reservation for ``room``, raising BookingConflict if any night is taken."""
+    def operation():
+        locked = Room.objects.select_for_update().get(pk=room.pk)
+        if status in Reservation.ACTIVE_STATUSES:
+            _check_free(locked, check_in, check_out)
+        return Reservation.objects.create(
+            user_id=user, room_id=locked, check_in=check_in, check_out=check_out, status=status,
+        )
+    return _retrying(operation)
+
+
+def book_room_type(*, user, room_type, check_in, check_out, occupancy=1, status='pending'):
+    """Book any free room of ``room_type``.
+
+    Candidate rooms locked by concurrent bookings are skipped rather than waited
+    for, so a burst of requests for the same room type spreads over its rooms.
+    """
+    def operation():
+        tried = []
+        while True:
+            room = (
+                available_rooms(check_in, check_out, occupancy=occupancy, room_type=room_type)
+                .exclude(pk__in=tried)
+                .select_for_update(skip_locked=True, of=('self',))
+                .first()
+            )
+            if room is None:
+                raise BookingConflict('No room of this type is free for the requested nights.')
+            try:
+                # The candidate query ran before the lock was taken; re-check under it
+                _check_free(room, check_in, check_out)
+            except BookingConflict:
+                tried.append(room.pk)
+                continue
+            return Reservation.objects.create(
+                user_id=user, room_id=room, check_in=check_in, check_out=check_out, status=status,
+            )
+    return _retrying(operation)
+
+
+def update_reservation(reservation, **changes):
+    """Apply ``changes`` to ``reservation``, re-checking overlaps when the stay moves."""
+    def operation():
+        room = changes.get('room_id', reservation.room_id)
+        # Lock the old and the new room in a fixed order to avoid deadlocks
+        room_ids = sorted({reservation.room_id_id, room.pk})
+        list(Room.objects.select_for_update().filter(pk__in=room_ids).order_by('pk'))
+        for field, value in changes.items():
+            setattr(reservation, field, value)
+        if reservation.status in Reservation.ACTIVE_STATUSES:
+            _check_free(room, reservation.check_in, reservation.check_out, exclude=reservation)
+        reservation.save()
+        return reservation
+    return _retrying(operation)
+
+
+def _check_batch_free(reservations, exclude=()):
+    """Per-item conflicts of a batch, against stored stays and earlier items of the batch."""
+    active = [reservation for reservation in reservations if reservation.status in Reservation.ACTIVE_STATUSES]
+    if not active:
+        return
+    stored = {}
+    for room_id, check_in, check_out in overlapping_reservations(
+        min(reservation.check_in for reservation in active),
+        max(reservation.check_out for reservation in active),
+    ).filter(room_id__in={reservation.room_id_id for reservation in active}).exclude(
+        pk__in=exclude,
+    ).values_list('room_id', 'check_in', 'check_out'):
+        stored.setdefault(room_id, []).append((check_in, check_out))
+
+    errors = []
+    for reservation in reservations:
+        taken = stored.setdefault(reservation.room_id_id, [])
+        if reservation.status not in Reservation.ACTIVE_STATUSES:
+            errors.append({})
+        elif any(check_in < reservation.check_out and check_out > reservation.check_in for check_in, check_out in taken):
+            errors.append({'non_field_errors': [BookingConflict.default_detail]})
+        else:
+            errors.append({})
+            taken.append((reservation.check_in, reservation.check_out))
+    if any(errors):
+        raise BookingConflict({'errors': errors})
+
+
+def book_many(reservations):
+    """Insert unsaved ``reservations`` in one statement after checking the whole batch."""
+    def operation():
+        room_ids = sorted({reservation.room_id_id for reservation in reservations})
+        list(Room.objects.select_for_update().filter(pk__in=room_ids).order_by('pk'))
+        _check_batch_free(reservations)
+        record_rates(reservations)
+        for reservation in reservations:
+            record_departure(reservation)
+        created = Reservation.objects.bulk_create(reservations)
+        replace_nights(created)
+        # bulk_create sends no post_save, which queues confirmations for single bookings
+        enqueue_many('send_reservation_confirmation', [
+            {'reservation_id': reservation.pk} for reservation in created
+            if reservation.status in Reservation.ACTIVE_STATUSES
+        ])
+        return created
+    return _retrying(operation)
+
+
+def update_many(pairs):
+    """Apply (reservation, changes) pairs with one bulk update after checking the whole batch."""
+    def operation():
+        room_ids = {reservation.room_id_id for reservation, _ in pairs}
+        room_ids |= {changes['room_id'].pk for _, changes in pairs if 'room_id' in changes}
+        list(Room.objects.select_for_update().filter(pk__in=sorted(room_ids)).order_by('pk'))
+        reservations = apply_changes(pairs)
+        _check_batch_free(reservations, exclude=[reservation.pk for reservation in reservations])
+        for reservation in reservations:
+            record_departure(reservation)
+        fields = sorted({field for _, changes in pairs for field in changes} | {'departed_on', 'updated_at'})
+        Reservation.objects.bulk_update(reservations, fields, batch_size=500)
+        replace_nights(reservations)
+        return reservations
+    return _retrying(operation)
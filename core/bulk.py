@@ -0,0 +1,122 @@
+from django.db import transaction
+from django.utils import timezone
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from .serializers import parse_pk
+from .signals import bump_version
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """Validates a list of items together; for updates each item names its row by ``id``."""
+
+    def __init__(self, *args, instances_by_id=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.instances_by_id = instances_by_id
+
+    def run_child_validation(self, data):
+        if self.instances_by_id is None:
+            return super().run_child_validation(data)
+        pk = parse_pk(self.child.Meta.model, data.get('id')) if isinstance(data, dict) else None
+        instance = self.instances_by_id.get(pk)
+        if instance is None:
+            raise serializers.ValidationError({'id': ['Not found.']})
+        self.child.instance = instance
+        self.child.initial_data = data
+        return instance, super().run_child_validation(data)
+
+
+def _valid_pks(model, values):
+    """The ``values`` that are primary keys of ``model``; item validation reports the others."""
+    return {pk for pk in (parse_pk(model, value) for value in values) if pk is not None}
+
+
+def _related_rows(child, items):
+    """Resolve every primary-key relation of the batch with one query per field."""
+    rows = {}
+    for name, field in child.fields.items():
+        if not isinstance(field, serializers.PrimaryKeyRelatedField) or field.read_only:
+            continue
+        queryset = field.get_queryset()
+        pks = _valid_pks(queryset.model, (item.get(name) for item in items if isinstance(item, dict)))
+        if pks:
+            rows[name] = queryset.in_bulk(pks)
+    return rows
+
+
+# Bulk create (POST) and partial update (PATCH) of up to ``bulk_max_items`` rows
+# per request. The batch is validated as a whole and written with
+# bulk_create/bulk_update in one transaction; if any item is invalid nothing is
+# written and ``errors`` lists the problems per item, aligned with the input.
+# bulk_create/bulk_update send no model signals, so the hooks bump model
+# versions themselves. Rows to update come from the viewset's get_queryset() and
+# related rows from the serializer fields' querysets, so a bulk write reaches
+# exactly what the single-object endpoints let the caller write.
+class BulkMixin:
+    bulk_max_items = 1000
+
+    @swagger_auto_schema(
+        methods=['post', 'patch'],
+        operation_description="Create (POST) or partially update (PATCH, items carry their id) "
+                              "a list of objects in one transaction",
+    )
+    @action(detail=False, methods=['post', 'patch'])
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({'detail': 'Expected a non-empty list of objects.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.bulk_max_items:
+            return Response({'detail': f'At most {self.bulk_max_items} objects per request.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        updating = request.method == 'PATCH'
+        instances_by_id = None
+        if updating:
+            ids = _valid_pks(self.queryset.model, (item.get('id') for item in items if isinstance(item, dict)))
+            instances_by_id = self.get_queryset().in_bulk(ids)
+        child = self.get_serializer(partial=updating)
+        serializer = BulkListSerializer(
+            child=child, data=items, instances_by_id=instances_by_id, partial=updating,
+            context={**self.get_serializer_context(), 'related_rows': _related_rows(child, items)},
+        )
+        if not serializer.is_valid():
+            return Response({'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            if updating:
+                objects = self.perform_bulk_update(serializer.validated_data)
+            else:
+                objects = self.perform_bulk_create(serializer.validated_data)
+        return Response(
+            self.get_serializer(objects, many=True).data,
+            status=status.HTTP_200_OK if updating else status.HTTP_201_CREATED,
+        )
+
+    def perform_bulk_create(self, validated):
+        model = self.queryset.model
+        objects = model.objects.bulk_create([model(**data) for data in validated])
+        bump_version(model)
+        return objects
+
+    def perform_bulk_update(self, pairs):
+        model = self.queryset.model
+        objects = apply_changes(pairs)
+        fields = {field for _, data in pairs for field in data}
+        if fields:
+            if any(field.name == 'updated_at' for field in model._meta.get_fields()):
+                fields.add('updated_at')
+            model.objects.bulk_update(objects, sorted(fields), batch_size=500)
+        bump_version(model)
+        return objects
+
+
+def apply_changes(pairs):
+    now = timezone.now()
+    for instance, data in pairs:
+        for field, value in data.items():
+            setattr(instance, field, value)
+        if hasattr(instance, 'updated_at'):
+            # bulk_update does not run auto_now
+            instance.updated_at = now
+    return [instance for instance, _ in pairs]
@@ -0,0 +1,81 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+from . import metrics
+
+metrics.register_counter('catalog_cache_hits', "Catalog responses served from the cache")
+metrics.register_counter('catalog_cache_misses', "Catalog responses computed and stored in the cache")
+
+
+def _version_key(model):
+    return f'version:{model._meta.label_lower}'
+
+
+def model_versions(*models):
+    """Current version token of each model, bumped whenever one of its rows changes."""
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Never seen or evicted: start from a fresh token rather than 0 so entries
+            # cached under an evicted version can't be served again
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_model_version(model):
+    try:
+        cache.incr(_version_key(model))
+    except ValueError:
+        cache.set(_version_key(model), time.time_ns(), timeout=None)
+    cache.set(f'written:{model._meta.label_lower}', True, settings.REPLICA_STICKY_SECONDS)
+
+
+def recently_written(*models):
+    """Whether any of ``models`` changed within the replica sticky window."""
+    return bool(cache.get_many([f'written:{model._meta.label_lower}' for model in models]))
+
+
+# Read-through cache for public catalog viewsets. Responses are keyed on the full
+# request path and the versions of ``cache_models``, so any save/delete of those
+# models (see core.signals) makes every cached page unreachable at once. The bump
+# only reaches the processes sharing the cache, so without SHARED_CACHE nothing is
+# cached.
+class CatalogCacheMixin:
+    cache_models = ()
+    cache_actions = ('list', 'retrieve')
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if not self.caches_action():
+            return handler(request, *args, **kwargs)
+        key = self.catalog_cache_key(request)
+        data = self.cached_data(key)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.CATALOG_CACHE_TIMEOUT)
+        return response
+
+    def caches_action(self):
+        return settings.SHARED_CACHE and self.action in self.cache_actions
+
+    def catalog_cache_key(self, request):
+        versions = '.'.join(str(version) for version in model_versions(*self.cache_models))
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        return f'catalog:{self.basename}:{self.action}:{versions}:{path}'
+
+    @staticmethod
+    def cached_data(key):
+        data = cache.get(key)
+        metrics.incr('catalog_cache_misses' if data is None else 'catalog_cache_hits')
+        return data
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core import checks
+from .db import replica_aliases
+
+
+@checks.register(checks.Tags.caches)
+def check_replica_cache(app_configs, **kwargs):
+    # The read-your-writes window (core.db.pin_to_primary, core.cache.recently_written)
+    # lives in the cache: in a per-process cache the next request, served by another
+    # process, would read the replica before the write reached it
+    if replica_aliases() and not settings.SHARED_CACHE:
+        return [checks.Error(
+            "Read replicas (DB_REPLICA_HOSTS) need a cache shared by all processes.",
+            hint="Set CACHE_URL to a Redis instance.",
+            id='core.E001',
+        )]
+    return []
@@ -0,0 +1,93 @@
+import hashlib
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import serializers
+from .cache import model_versions
+
+# Conditional GET (ETag / If-None-Match, Last-Modified / If-Modified-Since).
+# Validators are computed before the view serializes anything:
+# - the viewset's own rows: a COUNT/MAX(updated_at) aggregate over the filtered
+#   queryset when the model has ``updated_at`` (answered from the keyset
+#   pagination indexes, which include ``updated_at``), otherwise its version token;
+# - models embedded by the requested expansions: their version tokens (see core.cache).
+# Unchanged resources then answer 304 without touching the serializers. A version
+# token is only bumped in the cache the write reached, so responses whose ETag
+# needs one get no validators unless SHARED_CACHE is set.
+
+
+def rendered_models(serializer):
+    """Models whose rows ``serializer`` renders, including nested serializers."""
+    models = {serializer.Meta.model}
+    for field in serializer.fields.values():
+        if isinstance(field, serializers.ListSerializer):
+            field = field.child
+        if isinstance(field, serializers.ModelSerializer):
+            models |= rendered_models(field)
+    return models
+
+
+class ConditionalGetMixin:
+
+    def list(self, request, *args, **kwargs):
+        models = self.version_models()
+        if models and not settings.SHARED_CACHE:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset()).order_by()
+        if self._has_updated_at():
+            state = queryset.aggregate(count=Count('pk'), last_modified=Max('updated_at'))
+        else:
+            state = {}
+        # Lists only honour If-None-Match: a deletion does not move MAX(updated_at)
+        etag = self._etag(models, state.get('count'), state.get('last_modified'))
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return self._with_validators(not_modified, etag)
+        return self._with_validators(super().list(request, *args, **kwargs), etag, state.get('last_modified'))
+
+    def retrieve(self, request, *args, **kwargs):
+        models = self.version_models()
+        if models and not settings.SHARED_CACHE:
+            return super().retrieve(request, *args, **kwargs)
+        last_modified = None
+        if self._has_updated_at():
+            # Fetched once here and reused by the view through get_object()
+            self._conditional_instance = self.get_object()
+            last_modified = self._conditional_instance.updated_at
+        etag = self._etag(models, self.kwargs.get(self.lookup_url_kwarg or self.lookup_field), last_modified)
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=last_modified and int(last_modified.timestamp()),
+        )
+        if not_modified is not None:
+            return self._with_validators(not_modified, etag, last_modified)
+        return self._with_validators(super().retrieve(request, *args, **kwargs), etag, last_modified)
+
+    def get_object(self):
+        instance = getattr(self, '_conditional_instance', None)
+        return instance if instance is not None else super().get_object()
+
+    def _has_updated_at(self):
+        return any(field.name == 'updated_at' for field in self.queryset.model._meta.get_fields())
+
+    def version_models(self):
+        """Models whose version tokens feed the ETag of this request."""
+        models = rendered_models(self.get_serializer())
+        if self._has_updated_at():
+            models.discard(self.queryset.model)
+        return sorted(models, key=lambda model: model._meta.label)
+
+    def _etag(self, models, *state):
+        parts = [
+            self.basename, self.action, self.request.get_full_path(), self.request.user.pk,
+            self.request.accepted_renderer.format, *model_versions(*models), *state,
+        ]
+        return quote_etag(hashlib.md5(repr(parts).encode()).hexdigest())
+
+    @staticmethod
+    def _with_validators(response, etag, last_modified=None):
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
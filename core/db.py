@@ -0,0 +1,87 @@
+import random
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+from . import metrics
+from .cache import recently_written
+
+metrics.register_counter('db_connections_opened', "Database connections opened by this deployment")
+
+
+def pool_stats():
+    """psycopg pool statistics per database alias, for aliases with pooling enabled."""
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is not None:
+            # requests_wait_ms / requests_waiting show callers queueing for a connection
+            stats[alias] = pool.get_stats()
+    return stats
+
+
+# Read-replica routing. Reads use a replica only while ``replica_reads`` is set,
+# which ReplicaReadMixin does for safe, opted-in viewset actions; everything else
+# (writes, auth, reads inside write requests) goes to the primary.
+replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if replicas and replica_reads.get():
+            return random.choice(replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def _pin_key(user):
+    return f'db:pinned:{user.pk}'
+
+
+def pin_to_primary(user):
+    """Keep ``user``'s reads on the primary for the sticky window after a write."""
+    cache.set(_pin_key(user), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(user):
+    return user.is_authenticated and cache.get(_pin_key(user), False)
+
+
+# Expects ConditionalGetMixin (version_models) further down the MRO.
+class ReplicaReadMixin:
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        use_replica = (
+            request.method in SAFE_METHODS
+            and self.action in self.replica_actions
+            and not is_pinned(request.user)
+            # Cached responses and ETags are keyed on model versions, which are
+            # already bumped while a replica may still serve the old rows
+            and not recently_written(*self.version_models(), *getattr(self, 'cache_models', ()))
+        )
+        self._replica_token = replica_reads.set(use_replica)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            replica_reads.reset(token)
+            self._replica_token = None
+        if request.method not in SAFE_METHODS and response.status_code < 400 and request.user.is_authenticated:
+            pin_to_primary(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,119 @@
+import csv
+import json
+from datetime import date, datetime
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router
+from rest_framework.renderers import BaseRenderer
+
+# Flat exports for finance reconciliation. Rows are read with values_list() and
+# .iterator() (a server-side cursor), formatted one at a time and handed to a
+# streaming response or file, so memory stays constant however many rows are
+# exported. Under ASGI the view streams ``aexport_lines`` instead: Django would
+# consume a synchronous iterator with a single sync_to_async(list) call, holding
+# the whole export in memory.
+
+PAYMENT_COLUMNS = (
+    ('id', 'id'),
+    ('reservation_id', 'reservation_id'),
+    ('user_id', 'reservation_id__user_id'),
+    ('username', 'reservation_id__user_id__username'),
+    ('room_number', 'reservation_id__room_id__number'),
+    ('amount', 'amount'),
+    ('method', 'method'),
+    ('status', 'status'),
+    ('transaction_id', 'transaction_id'),
+    ('paid_at', 'paid_at'),
+)
+
+RESERVATION_COLUMNS = (
+    ('id', 'id'),
+    ('user_id', 'user_id'),
+    ('username', 'user_id__username'),
+    ('room_id', 'room_id'),
+    ('room_number', 'room_id__number'),
+    ('room_type', 'room_id__type_id__name'),
+    ('check_in', 'check_in'),
+    ('check_out', 'check_out'),
+    ('status', 'status'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+)
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+CHUNK_SIZE = 2000
+
+
+class PassthroughRenderer(BaseRenderer):
+    """Lets export actions accept any media type; the view returns a streaming response itself."""
+    media_type = '*/*'
+    format = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _rows(queryset, columns):
+    # Resolve the database now: routing hints (replica reads) are reset when the
+    # view returns, before a streaming response is consumed
+    return (
+        queryset.using(router.db_for_read(queryset.model))
+        .order_by('id')
+        .values_list(*(lookup for _, lookup in columns))
+    )
+
+
+def _formatter(columns, output):
+    """(header lines, row formatter) of an export."""
+    names = [name for name, _ in columns]
+    if output == 'ndjson':
+        return [], lambda row: json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n'
+    writer = csv.writer(_Echo())
+    return [writer.writerow(names)], lambda row: writer.writerow([_csv_value(value) for value in row])
+
+
+def _lines(header, format_row, rows):
+    yield from header
+    for row in rows:
+        yield format_row(row)
+
+
+async def _alines(header, format_row, rows):
+    for line in header:
+        yield line
+    # One chunk of the server-side cursor per thread hop. QuerySet.aiterator() does
+    # the same for model rows, but for values_list() it opens the cursor on the event
+    # loop (ValuesListIterable.__iter__ executes the query as soon as it is called)
+    # and raises SynchronousOnlyOperation
+    next_chunk = sync_to_async(lambda: list(islice(rows, CHUNK_SIZE)))
+    while chunk := await next_chunk():
+        for row in chunk:
+            yield format_row(row)
+
+
+def export_lines(queryset, columns, output='csv'):
+    """Iterator over the export of ``queryset`` as CSV or NDJSON lines, header first for CSV."""
+    return _lines(*_formatter(columns, output), _rows(queryset, columns).iterator(chunk_size=CHUNK_SIZE))
+
+
+def aexport_lines(queryset, columns, output='csv'):
+    """Async iterator over the same lines as ``export_lines``, for ASGI responses."""
+    return _alines(*_formatter(columns, output), _rows(queryset, columns).iterator(chunk_size=CHUNK_SIZE))
@@ -0,0 +1,123 @@
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import PKOnlyObject, PrimaryKeyRelatedField
+from rest_framework.response import Response
+from .middleware import serialization_timer
+
+# Read-only fast path for list endpoints: rows are fetched with .values() and turned
+# into dicts by the serializer's own fields (field.to_representation), skipping model
+# instances and attribute lookups. The output is identical to the serializer's. Nested
+# serializers of single relations become joined lookups; a level whose serializer
+# renders a model property is rebuilt as an unsaved instance from its columns. Anything
+# else (custom to_representation, many=True, method fields, source='*') keeps the
+# regular serializer path.
+
+
+class Level:
+    def __init__(self, model):
+        self.model = model
+        self.values = []    # (name, lookup, field)
+        self.pks = []       # (name, lookup, field)
+        self.nested = []    # (name, pk lookup, Level)
+        self.computed = []  # (name, field)
+        self.columns = {}   # attname -> lookup, to rebuild an instance for computed fields
+        self.order = []
+
+
+def _plan(serializer, prefix=''):
+    if type(serializer).to_representation is not serializers.Serializer.to_representation:
+        return None
+    model = serializer.Meta.model
+    level = Level(model)
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        level.order.append(name)
+        source = field.source
+        if source == '*' or '.' in source or isinstance(field, (serializers.ListSerializer, serializers.ManyRelatedField)):
+            return None
+        try:
+            model_field = model._meta.get_field(source)
+        except FieldDoesNotExist:
+            model_field = None
+        if isinstance(field, serializers.ModelSerializer):
+            if model_field is None or not (model_field.many_to_one or model_field.one_to_one):
+                return None
+            nested = _plan(field, f'{prefix}{source}__')
+            if nested is None:
+                return None
+            level.nested.append((name, f'{prefix}{source}__pk', nested))
+        elif isinstance(field, PrimaryKeyRelatedField):
+            if model_field is None or not model_field.many_to_one or field.pk_field is not None:
+                return None
+            level.pks.append((name, prefix + source, field))
+        elif model_field is not None and model_field.concrete and not model_field.is_relation:
+            level.values.append((name, prefix + source, field))
+        elif isinstance(getattr(model, source, None), property):
+            level.computed.append((name, field))
+        else:
+            return None
+    if level.computed:
+        level.columns = {
+            model_field.attname: prefix + model_field.attname for model_field in model._meta.concrete_fields
+        }
+    return level
+
+
+def _lookups(level):
+    lookups = {lookup for _, lookup, _ in level.values + level.pks} | set(level.columns.values())
+    for _, pk_lookup, nested in level.nested:
+        lookups |= {pk_lookup} | _lookups(nested)
+    return lookups
+
+
+def _represent(level, row):
+    data = {}
+    for name, lookup, field in level.values:
+        value = row[lookup]
+        data[name] = None if value is None else field.to_representation(value)
+    for name, lookup, field in level.pks:
+        value = row[lookup]
+        data[name] = None if value is None else field.to_representation(PKOnlyObject(pk=value))
+    for name, pk_lookup, nested in level.nested:
+        data[name] = None if row[pk_lookup] is None else _represent(nested, row)
+    if level.computed:
+        instance = level.model(**{attname: row[lookup] for attname, lookup in level.columns.items()})
+        for name, field in level.computed:
+            value = field.get_attribute(instance)
+            data[name] = None if value is None else field.to_representation(value)
+    return {name: data[name] for name in level.order}
+
+
+class ValuesListMixin:
+    """Serve ``list`` from .values() rows when the requested serializer tree allows it."""
+    values_list_enabled = True
+
+    def list(self, request, *args, **kwargs):
+        level = self.values_plan()
+        if level is None:
+            return super().list(request, *args, **kwargs)
+        rows = self.values_rows(self.filter_queryset(self.get_queryset()), level)
+        page = self.paginate_queryset(rows)
+        rows = page if page is not None else list(rows)
+        with serialization_timer(request):
+            data = self.represent_rows(level, rows)
+        return self.get_paginated_response(data) if page is not None else Response(data)
+
+    def values_plan(self):
+        """The plan for the requested serializer tree, or None to use the serializers."""
+        if not (self.values_list_enabled and settings.FAST_LIST_SERIALIZATION):
+            return None
+        return _plan(self.get_serializer())
+
+    def values_rows(self, queryset, level):
+        lookups = _lookups(level)
+        # Keyset pagination reads its position from the rows
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+        lookups |= {term.lstrip('-') for term in ((ordering,) if isinstance(ordering, str) else ordering)}
+        return queryset.values(*sorted(lookups))
+
+    @staticmethod
+    def represent_rows(level, rows):
+        return [_represent(level, row) for row in rows]
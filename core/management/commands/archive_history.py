@@ -0,0 +1,18 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from core.archive import archive_cutoff, archive_history
+
+
+class Command(BaseCommand):
+    help = ("Move finished stays that checked out before the cutoff (ARCHIVE_AFTER_DAYS ago by default) "
+            "to the archive tables with their services, payments and reviews, one transaction per batch")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', type=date.fromisoformat, help="Cutoff date (YYYY-MM-DD)")
+        parser.add_argument('--batch-size', type=int, default=500, help="Reservations moved per transaction")
+
+    def handle(self, *args, **options):
+        cutoff = options['before'] or archive_cutoff()
+        totals = archive_history(cutoff, options['batch_size'])
+        moved = ", ".join(f"{count} {model._meta.verbose_name_plural}" for model, count in totals.items())
+        self.stdout.write(f"Archived stays that checked out before {cutoff}: {moved}")
@@ -0,0 +1,44 @@
+import random
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from core.availability import available_rooms
+from core.benchmarks import Rollback, seed_catalog, seed_reservations, seed_users, summarize, time_call
+
+
+class Command(BaseCommand):
+    help = "Measure availability search latency as the reservation table grows (data is rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=2000)
+        parser.add_argument('--sizes', default='10000,100000,1000000',
+                            help="Comma-separated reservation table sizes to measure at")
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options['sizes'].split(','))
+        try:
+            with transaction.atomic():
+                room_types, rooms = seed_catalog(rooms=options['rooms'])
+                users = seed_users()
+                seeded = 0
+                self.stdout.write(f"{'reservations':>14} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+                for size in sizes:
+                    seed_reservations(rooms, users, size - seeded)
+                    seeded = size
+                    self.analyze()
+                    stats = summarize(time_call(lambda: self.search(room_types), options['repeat']))
+                    self.stdout.write(f"{size:>14} {stats['p50']:>10.2f} {stats['p95']:>10.2f} {stats['p99']:>10.2f}")
+                raise Rollback
+        except Rollback:
+            pass
+
+    def analyze(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE core_reservation')
+
+    def search(self, room_types):
+        check_in = date.today() + timedelta(days=random.randint(0, 90))
+        check_out = check_in + timedelta(days=random.randint(1, 7))
+        return list(available_rooms(check_in, check_out, room_type=random.choice(room_types)).values_list('id', flat=True))
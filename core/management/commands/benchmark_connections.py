@@ -0,0 +1,48 @@
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.test import Client
+from core import metrics
+
+
+class Command(BaseCommand):
+    help = ("Compare requests/sec with a new database connection per request against the "
+            "configured connection handling (persistent connections or pool)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--path', help="Endpoint to request (defaults to an availability search)")
+
+    def handle(self, *args, **options):
+        check_in = date.today() + timedelta(days=30)
+        path = options['path'] or (
+            f'/api/rooms/availability/?check_in={check_in}&check_out={check_in + timedelta(days=2)}'
+        )
+        configured = dict(connection.settings_dict)
+        modes = [('per-request connections', {'CONN_MAX_AGE': 0, 'OPTIONS': {
+            key: value for key, value in configured['OPTIONS'].items() if key != 'pool'
+        }})]
+        if configured['OPTIONS'].get('pool'):
+            modes.append(('connection pool', {}))
+        else:
+            modes.append((f"persistent connections (CONN_MAX_AGE={configured['CONN_MAX_AGE'] or 600})",
+                          {'CONN_MAX_AGE': configured['CONN_MAX_AGE'] or 600}))
+        client = Client()
+        for label, overrides in modes:
+            connection.close()
+            connection.settings_dict.update(configured, **overrides)
+            close_old_connections()
+            client.get(path)  # warm up
+            opened = metrics.snapshot()['db_connections_opened']
+            started = time.perf_counter()
+            for _ in range(options['requests']):
+                # The test client disconnects Django's per-request connection handling; redo it
+                close_old_connections()
+                client.get(path)
+                close_old_connections()
+            elapsed = time.perf_counter() - started
+            opened = metrics.snapshot()['db_connections_opened'] - opened
+            self.stdout.write(f"{label}: {options['requests'] / elapsed:.0f} req/s, {opened} connections opened")
+        connection.close()
+        connection.settings_dict.update(configured)
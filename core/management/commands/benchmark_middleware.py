@@ -0,0 +1,60 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from knox.models import AuthToken
+from core.benchmarks import Rollback, seed_catalog, summarize, time_call
+
+# (label, method, path, body); the room type list is served from the catalog cache,
+# so its timings are mostly framework and middleware overhead
+ENDPOINTS = (
+    ('room types', 'get', '/api/room-types/', None),
+    ('reservations', 'get', '/api/reservations/', None),
+    ('login', 'post', '/api/login/', {'username': 'bench_middleware_user', 'password': 'bench-password'}),
+)
+
+# (label, API_SESSIONS)
+MODES = (
+    ('full stack', True),
+    ('lean API', False),
+)
+
+
+class Command(BaseCommand):
+    help = "Compare per-request latency and queries of API routes with the full and the lean middleware stack (data is rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=500)
+
+    # Login timings would be dominated by PBKDF2 otherwise
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                seed_catalog(room_types=20, rooms=100)
+                user = User.objects.create_user(username='bench_middleware_user', password='bench-password')
+                instance, token = AuthToken.objects.create(user)
+                cache.clear()
+                client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+                self.stdout.write(f"{'endpoint':<14}{'mode':<12}{'queries':>9}{'p50 ms':>10}{'p95 ms':>10}")
+                for name, method, path, body in ENDPOINTS:
+                    def call():
+                        if body is None:
+                            return getattr(client, method)(path)
+                        return getattr(client, method)(path, body, content_type='application/json')
+
+                    for label, sessions in MODES:
+                        # Each login adds a token, and saving the user walks all of them
+                        AuthToken.objects.filter(user=user).exclude(pk=instance.pk).delete()
+                        with override_settings(API_SESSIONS=sessions, REQUEST_METRICS_HEADERS=True):
+                            call()
+                            # Counted by RequestMetricsMiddleware, around every other middleware
+                            queries = call()['X-DB-Queries']
+                            stats = summarize(time_call(call, options['repeat']))
+                        self.stdout.write(
+                            f"{name:<14}{label:<12}{queries:>9}{stats['p50']:>10.3f}{stats['p95']:>10.3f}"
+                        )
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,60 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+from core.benchmarks import Rollback, seed_catalog, seed_reservations, seed_users, summarize, time_call
+from core.renderers import FastJSONRenderer
+from core.views import ReservationViewSet, RoomTypeViewSet, RoomViewSet
+
+ENDPOINTS = (
+    ('room types', RoomTypeViewSet, '/api/room-types/?page_size=200'),
+    ('rooms', RoomViewSet, '/api/rooms/?page_size=200&expand=type_id'),
+    ('reservations', ReservationViewSet, '/api/reservations/?page_size=200&expand=user_id,room_id'),
+)
+
+# (label, values() fast path, renderer)
+VARIANTS = (
+    ('serializers + json', False, JSONRenderer),
+    ('serializers + fast json', False, FastJSONRenderer),
+    ('values + fast json', True, FastJSONRenderer),
+)
+
+
+class Command(BaseCommand):
+    help = "Compare list endpoint latency of the serializer path and the .values() fast path (data is rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=2000)
+        parser.add_argument('--reservations', type=int, default=20000)
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        try:
+            with transaction.atomic():
+                room_types, rooms = seed_catalog(room_types=200, rooms=options['rooms'])
+                users = seed_users()
+                seed_reservations(rooms, users, options['reservations'])
+                staff = User.objects.create_user(username='bench_serialization_staff', is_staff=True)
+                self.stdout.write(f"{'endpoint':<14}{'variant':<26}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+                for name, viewset, url in ENDPOINTS:
+                    for label, fast, renderer in VARIANTS:
+                        initkwargs = {'cache_actions': ()} if hasattr(viewset, 'cache_actions') else {}
+                        view = viewset.as_view({'get': 'list'}, renderer_classes=[renderer], **initkwargs)
+
+                        def call():
+                            request = factory.get(url)
+                            force_authenticate(request, staff)
+                            return view(request).render()
+
+                        with override_settings(FAST_LIST_SERIALIZATION=fast):
+                            call()
+                            stats = summarize(time_call(call, options['repeat']))
+                        self.stdout.write(
+                            f"{name:<14}{label:<26}{stats['p50']:>10.2f}{stats['p95']:>10.2f}{stats['p99']:>10.2f}"
+                        )
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,41 @@
+from contextlib import nullcontext
+from datetime import date
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIClient
+from core import queryplans
+
+
+class Command(BaseCommand):
+    help = ("EXPLAIN the SELECTs of the API's read endpoints against the current database and fail "
+            "if a growing table is read in full (see core.queryplans)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', nargs='+', help="Users to request as: guests see their own rows, staff all of them")
+        parser.add_argument('--discourage-seq-scans', action='store_true',
+                            help="Plan with enable_seqscan off, for databases too small to show the real plans")
+
+    def handle(self, *args, **options):
+        users = list(User.objects.filter(username__in=options['username']))
+        missing = set(options['username']) - {user.username for user in users}
+        if missing:
+            raise CommandError(f"Unknown users: {', '.join(sorted(missing))}")
+        planning = queryplans.seq_scans_discouraged if options['discourage_seq_scans'] else nullcontext
+        failures = 0
+        for user in users:
+            client = APIClient()
+            client.force_authenticate(user)
+            for path in queryplans.endpoints(date.today()):
+                with planning():
+                    response, results = queryplans.endpoint_scans(client, path)
+                scanned = sorted({table for *_, scans in results for table in scans})
+                failures += bool(scanned)
+                self.stdout.write(
+                    f"{user.username:<16}{response.status_code:>4}  {len(results):>2} queries  {path}"
+                    + (f"  FULL SCAN: {', '.join(scanned)}" if scanned else "")
+                )
+                for alias, sql, plan, scans in results:
+                    if scans or options['verbosity'] > 1:
+                        self.stdout.write(f"    [{alias}] {sql}\n" + "".join(f"      {line}\n" for line in plan))
+        if failures:
+            raise CommandError(f"{failures} endpoint requests read a growing table in full")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from core.exports import FORMATS, PAYMENT_COLUMNS, RESERVATION_COLUMNS, export_lines
+from core.models import Payment, Reservation
+
+EXPORTS = {
+    'payments': (Payment, PAYMENT_COLUMNS),
+    'reservations': (Reservation, RESERVATION_COLUMNS),
+}
+
+
+class Command(BaseCommand):
+    help = "Stream all payments or reservations to a CSV/NDJSON file (or stdout) in constant memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(EXPORTS))
+        parser.add_argument('--output', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--file', help="Write to this path instead of stdout")
+
+    def handle(self, *args, **options):
+        model, columns = EXPORTS[options['dataset']]
+        lines = export_lines(model.objects.all(), columns, options['output'])
+        if not options['file']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        written = -1 if options['output'] == 'csv' else 0
+        with open(options['file'], 'w', newline='', encoding='utf-8') as handle:
+            for line in lines:
+                handle.write(line)
+                written += 1
+        self.stderr.write(f"Exported {written} {options['dataset']} to {options['file']}")
@@ -0,0 +1,14 @@
+from importlib import import_module
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from core.schema import code_version, write_artifacts
+
+
+class Command(BaseCommand):
+    help = "Pre-render the OpenAPI schema in every format to OPENAPI_SCHEMA_DIR (run at deploy time)"
+
+    def handle(self, *args, **options):
+        schema_view = import_module(settings.ROOT_URLCONF).schema_view
+        for path in write_artifacts(schema_view):
+            self.stdout.write(f"Wrote {path}")
+        self.stdout.write(f"Code version {code_version()}")
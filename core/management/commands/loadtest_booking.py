@@ -0,0 +1,87 @@
+import random
+import threading
+import time
+from datetime import date, timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import F
+from core.benchmarks import seed_catalog, seed_users
+from core.booking import BookingConflict, book_room, book_room_type
+from core.models import Reservation, Room, RoomType
+
+
+class Command(BaseCommand):
+    help = ("Fire concurrent booking attempts at a small set of rooms and verify that no two "
+            "active reservations overlap. Seeded rows are deleted afterwards.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=50)
+        parser.add_argument('--attempts', type=int, default=2000, help="Total booking attempts")
+        parser.add_argument('--rooms', type=int, default=20)
+        parser.add_argument('--days', type=int, default=30, help="Window the stays are spread over")
+
+    def handle(self, *args, **options):
+        room_types, rooms = seed_catalog(room_types=2, rooms=options['rooms'])
+        users = seed_users(options['threads'])
+        try:
+            counts = {'booked': 0, 'conflict': 0, 'error': 0}
+            lock = threading.Lock()
+            remaining = iter(range(options['attempts']))
+            start_day = date.today() + timedelta(days=1)
+
+            def worker(user):
+                try:
+                    while True:
+                        with lock:
+                            if next(remaining, None) is None:
+                                return
+                        check_in = start_day + timedelta(days=random.randint(0, options['days']))
+                        check_out = check_in + timedelta(days=random.randint(1, 4))
+                        try:
+                            if random.random() < 0.5:
+                                book_room(user=user, room=random.choice(rooms), check_in=check_in, check_out=check_out)
+                            else:
+                                book_room_type(user=user, room_type=random.choice(room_types),
+                                               check_in=check_in, check_out=check_out)
+                            outcome = 'booked'
+                        except BookingConflict:
+                            outcome = 'conflict'
+                        except Exception as exc:
+                            self.stderr.write(f"{type(exc).__name__}: {exc}")
+                            outcome = 'error'
+                        with lock:
+                            counts[outcome] += 1
+                finally:
+                    connection.close()
+
+            threads = [threading.Thread(target=worker, args=(users[i % len(users)],)) for i in range(options['threads'])]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+            overlaps = self.count_overlaps(rooms)
+            self.stdout.write(
+                f"{options['attempts']} attempts in {elapsed:.2f}s ({options['attempts'] / elapsed:.0f}/s) with "
+                f"{options['threads']} threads: {counts['booked']} booked, {counts['conflict']} conflicts, "
+                f"{counts['error']} errors, {overlaps} overlapping pairs"
+            )
+            if overlaps:
+                raise CommandError("Double booking detected")
+        finally:
+            Reservation.objects.filter(room_id__in=rooms).delete()
+            Room.objects.filter(pk__in=[room.pk for room in rooms]).delete()
+            RoomType.objects.filter(pk__in=[room_type.pk for room_type in room_types]).delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    def count_overlaps(self, rooms):
+        active = Reservation.objects.filter(room_id__in=rooms, status__in=Reservation.ACTIVE_STATUSES)
+        return active.filter(
+            room_id__reservation__status__in=Reservation.ACTIVE_STATUSES,
+            room_id__reservation__check_in__lt=F('check_out'),
+            room_id__reservation__check_out__gt=F('check_in'),
+            room_id__reservation__id__gt=F('id'),
+        ).count()
@@ -0,0 +1,117 @@
+import asyncio
+import itertools
+import json
+import time
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+from core.benchmarks import summarize
+
+
+class Client:
+    """One keep-alive connection, reconnecting when the server closes it (sync workers do)."""
+
+    def __init__(self, host, port, timeout):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.reader = self.writer = None
+
+    async def request(self, message):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        self.writer.write(message)
+        await self.writer.drain()
+        return await asyncio.wait_for(self.read_response(), self.timeout)
+
+    async def read_response(self):
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while (line := await self.reader.readline()) not in (b'\r\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        await self.reader.readexactly(int(headers.get('content-length', 0)))
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class Command(BaseCommand):
+    help = ("Hold a number of concurrent connections against a running server (one worker process, "
+            "WSGI or ASGI) and report throughput, latency and errors per concurrency level")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--prefix', default='/api/async/',
+                            help="API prefix: /api/async/ for the async views, /api/ for the synchronous ones")
+        parser.add_argument('--connections', default='10,50,200', help="Comma-separated concurrency levels")
+        parser.add_argument('--duration', type=float, default=15, help="Seconds per level")
+        parser.add_argument('--token', help="Knox token, to include the reservation list")
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--output', help="Write the results as JSON to this path")
+
+    def handle(self, *args, **options):
+        parts = urlsplit(options['url'])
+        if parts.scheme != 'http':
+            raise CommandError("Only http:// URLs are supported")
+        levels = [int(level) for level in options['connections'].split(',') if level.strip()]
+        check_in = date.today() + timedelta(days=30)
+        prefix = options['prefix']
+        paths = [
+            f'{prefix}room-types/',
+            f'{prefix}rooms/?page_size=50',
+            f'{prefix}rooms/availability/?check_in={check_in}&check_out={check_in + timedelta(days=3)}',
+        ]
+        headers = f'Host: {parts.netloc}\r\nAccept: application/json\r\n'
+        if options['token']:
+            paths.append(f'{prefix}reservations/')
+            headers += f"Authorization: Token {options['token']}\r\n"
+        requests = [f'GET {path} HTTP/1.1\r\n{headers}\r\n'.encode() for path in paths]
+
+        results = {'url': options['url'], 'prefix': prefix, 'levels': []}
+        self.stdout.write(f"{'connections':>12}{'requests':>10}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for level in levels:
+            row = asyncio.run(self.run_level(parts.hostname, parts.port or 80, requests, level, options))
+            results['levels'].append(row)
+            self.stdout.write(
+                f"{level:>12}{row['count']:>10}{row['errors']:>8}{row['per_second']:>9}"
+                f"{row.get('p50', 0):>10.1f}{row.get('p95', 0):>10.1f}{row.get('p99', 0):>10.1f}"
+            )
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+
+    async def run_level(self, host, port, requests, connections, options):
+        timings, errors = [], 0
+        deadline = time.perf_counter() + options['duration']
+
+        async def run_client(number):
+            nonlocal errors
+            client = Client(host, port, options['timeout'])
+            for message in itertools.islice(itertools.cycle(requests), number % len(requests), None):
+                if time.perf_counter() >= deadline:
+                    break
+                started = time.perf_counter()
+                try:
+                    status = await client.request(message)
+                except (OSError, EOFError, ValueError, IndexError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    client.close()
+                    errors += 1
+                    continue
+                if status == 200:
+                    timings.append((time.perf_counter() - started) * 1000)
+                else:
+                    errors += 1
+            client.close()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run_client(number) for number in range(connections)))
+        elapsed = time.perf_counter() - started
+        return {
+            'connections': connections, 'count': len(timings), 'errors': errors,
+            'per_second': round(len(timings) / elapsed, 1),
+            **{key: round(value, 2) for key, value in (summarize(timings) if timings else {}).items()},
+        }
@@ -0,0 +1,200 @@
+import http.client
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from urllib.parse import urlencode, urlsplit
+from django.core.management.base import BaseCommand, CommandError
+from core.benchmarks import summarize
+
+# Flow name -> relative weight in the request mix
+FLOWS = {
+    'browse': 30,
+    'availability': 25,
+    'payments': 15,
+    'reserve': 10,
+    'login': 10,
+    'register': 10,
+}
+
+
+class Client:
+    """One simulated user: a keep-alive HTTP connection and a knox token."""
+
+    def __init__(self, url, timeout):
+        parts = urlsplit(url)
+        self.host, self.port, self.timeout = parts.hostname, parts.port or 80, timeout
+        self.connection = None
+        self.token = None
+
+    def request(self, method, path, body=None):
+        headers = {'Accept': 'application/json'}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        if self.token:
+            headers['Authorization'] = f'Token {self.token}'
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self.connection.request(method, path, body, headers)
+            response = self.connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            raise
+        return response.status, json.loads(data) if data else None
+
+
+class Command(BaseCommand):
+    help = ("Drive the main API flows with concurrent clients against a running server seeded with "
+            "seed_loadtest, and report throughput and p50/p95/p99 latency per flow")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--clients', type=int, default=20)
+        parser.add_argument('--duration', type=float, default=30, help="Seconds to run")
+        parser.add_argument('--flows', default=','.join(FLOWS), help="Comma-separated subset of: " + ', '.join(FLOWS))
+        parser.add_argument('--users', type=int, default=10000, help="Seeded users to log in as")
+        parser.add_argument('--password', default='loadtest-password')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help="Write the results as JSON to this path")
+        parser.add_argument('--baseline', help="JSON results of an earlier run to compare p95 against")
+        parser.add_argument('--max-regression', type=float,
+                            help="Fail when a flow's p95 is this many percent slower than the baseline")
+
+    def handle(self, *args, **options):
+        flows = [flow.strip() for flow in options['flows'].split(',') if flow.strip()]
+        unknown = set(flows) - set(FLOWS)
+        if unknown:
+            raise CommandError(f"Unknown flows: {', '.join(sorted(unknown))}")
+        self.options = options
+        self.run_id = uuid.uuid4().hex[:8]
+        self.catalog, self.room_pages = self.fetch_catalog()
+        timings = {flow: [] for flow in flows}
+        errors = {flow: 0 for flow in flows}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+
+        def worker(number):
+            rng = random.Random(options['seed'] + number)
+            client = Client(options['url'], options['timeout'])
+            self.login(client, rng)
+            weights = [FLOWS[flow] for flow in flows]
+            count = 0
+            while time.perf_counter() < deadline:
+                flow = rng.choices(flows, weights)[0]
+                count += 1
+                started = time.perf_counter()
+                try:
+                    ok = getattr(self, f'flow_{flow}')(client, rng, f'{number}_{count}')
+                except (OSError, http.client.HTTPException, ValueError):
+                    ok = False
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    timings[flow].append(elapsed)
+                    errors[flow] += not ok
+
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(options['clients'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        results = {
+            'url': options['url'], 'clients': options['clients'], 'seconds': round(elapsed, 2),
+            'flows': {
+                flow: {'count': len(durations), 'errors': errors[flow], 'per_second': round(len(durations) / elapsed, 1),
+                       **{key: round(value, 2) for key, value in summarize(durations).items()}}
+                for flow, durations in timings.items() if durations
+            },
+        }
+        self.report(results)
+
+    def fetch_catalog(self):
+        client = Client(self.options['url'], self.options['timeout'])
+        status, room_types = client.request('GET', '/api/room-types/?page_size=200&fields=id')
+        if status != 200 or not room_types['results']:
+            raise CommandError(f"Could not read the catalog from {self.options['url']} (HTTP {status}); run seed_loadtest first")
+        status, rooms = client.request('GET', '/api/rooms/?fields=id')
+        pages = -(-rooms['count'] // max(1, len(rooms['results'])))
+        return [room_type['id'] for room_type in room_types['results']], max(1, pages)
+
+    def login(self, client, rng):
+        status, data = client.request('POST', '/api/login/', {
+            'username': f"load_user_{rng.randrange(self.options['users'])}", 'password': self.options['password'],
+        })
+        if status == 200:
+            client.token = data['token']
+        return status == 200
+
+    def stay(self, rng):
+        check_in = date.today() + timedelta(days=rng.randint(1, 180))
+        return check_in, check_in + timedelta(days=rng.randint(1, 7))
+
+    def flow_browse(self, client, rng, key):
+        status, _ = client.request('GET', '/api/room-types/')
+        if status != 200:
+            return False
+        status, _ = client.request('GET', f'/api/rooms/?page={rng.randint(1, self.room_pages)}&expand=type_id')
+        return status == 200
+
+    def flow_availability(self, client, rng, key):
+        check_in, check_out = self.stay(rng)
+        query = urlencode({'check_in': check_in, 'check_out': check_out, 'room_type': rng.choice(self.catalog)})
+        status, _ = client.request('GET', f'/api/rooms/availability/?{query}')
+        return status == 200
+
+    def flow_payments(self, client, rng, key):
+        status, _ = client.request('GET', '/api/payments/')
+        return status == 200
+
+    def flow_reserve(self, client, rng, key):
+        check_in, check_out = self.stay(rng)
+        status, _ = client.request('POST', '/api/reservations/book/', {
+            'room_type': rng.choice(self.catalog), 'check_in': str(check_in), 'check_out': str(check_out),
+        })
+        # A fully booked room type is an expected outcome, not an error
+        return status in (201, 409)
+
+    def flow_login(self, client, rng, key):
+        return self.login(client, rng)
+
+    # Registered users stay behind; `seed_loadtest --clear` deletes them
+    def flow_register(self, client, rng, key):
+        status, _ = Client(self.options['url'], self.options['timeout']).request('POST', '/api/register/', {
+            'username': f'lt_{self.run_id}_{key}', 'email': f'lt_{self.run_id}_{key}@example.com',
+            'password': self.options['password'],
+        })
+        return status == 201
+
+    def report(self, results):
+        baseline = {}
+        if self.options['baseline']:
+            with open(self.options['baseline']) as handle:
+                baseline = json.load(handle)['flows']
+        self.stdout.write(f"{results['clients']} clients for {results['seconds']}s against {results['url']}")
+        self.stdout.write(f"{'flow':<14}{'count':>8}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'p95 vs base':>13}")
+        regressions = []
+        for flow, row in results['flows'].items():
+            change = ''
+            if flow in baseline and baseline[flow]['p95']:
+                percent = (row['p95'] / baseline[flow]['p95'] - 1) * 100
+                change = f'{percent:+.1f}%'
+                if self.options['max_regression'] is not None and percent > self.options['max_regression']:
+                    regressions.append(flow)
+            self.stdout.write(
+                f"{flow:<14}{row['count']:>8}{row['errors']:>8}{row['per_second']:>9}"
+                f"{row['p50']:>10.1f}{row['p95']:>10.1f}{row['p99']:>10.1f}{change:>13}"
+            )
+        if self.options['output']:
+            with open(self.options['output'], 'w') as handle:
+                json.dump(results, handle, indent=2)
+        if regressions:
+            raise CommandError(f"p95 regressed by more than {self.options['max_regression']}% for: {', '.join(regressions)}")
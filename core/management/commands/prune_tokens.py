@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from core.auth import prune_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete expired knox tokens and tokens of inactive users, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-age-days', type=int,
+                            help="Also delete tokens created more than this many days ago")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Deleted {prune_tokens(options['batch_size'], options['max_age_days'])} tokens")
+
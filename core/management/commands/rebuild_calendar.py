@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.occupancy import rebuild_nights
+
+
+class Command(BaseCommand):
+    help = "Recompute the occupancy calendar (RoomNight rows) from all reservations"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            written = rebuild_nights(options['batch_size'])
+        self.stdout.write(f"Wrote {written} room nights")
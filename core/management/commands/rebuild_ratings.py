@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from core.models import RoomRating, RoomTypeRating
+from core.ratings import rebuild_ratings
+from core.signals import bump_version
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-room and per-room-type review aggregates from all reviews"
+
+    def handle(self, *args, **options):
+        rooms, room_types = rebuild_ratings()
+        bump_version(RoomRating)
+        bump_version(RoomTypeRating)
+        self.stdout.write(f"Rated {rooms} rooms and {room_types} room types")
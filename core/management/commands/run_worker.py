@@ -0,0 +1,50 @@
+import signal
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from core.tasks import claim, requeue_stale, run, run_pending, schedule_periodic
+
+# Seconds between checks for periodic tasks and abandoned runs
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks (see core.tasks); any number of workers can run side by side"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run the tasks that are due, then exit")
+        parser.add_argument('--batch-size', type=int, default=10, help="Tasks claimed per poll")
+        parser.add_argument('--sleep', type=float, default=1.0, help="Seconds to wait when the queue is empty")
+
+    def handle(self, *args, **options):
+        # The task counters and the reports warmed by refresh_reports are written to
+        # the cache, where a local-memory cache would keep them from the web processes:
+        # without a shared cache the worker runs tasks but skips both
+        if not settings.SHARED_CACHE:
+            self.stderr.write("No shared cache (CACHE_URL): task counters and report warming are skipped")
+        if options['once']:
+            schedule_periodic()
+            self.stdout.write(f"Ran {run_pending(options['batch_size'])} tasks")
+            return
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        maintained = 0
+        while not self.stopping:
+            # Long-running process: honour CONN_MAX_AGE and drop broken connections
+            close_old_connections()
+            if time.monotonic() - maintained > MAINTENANCE_INTERVAL:
+                requeue_stale()
+                schedule_periodic()
+                maintained = time.monotonic()
+            tasks = claim(options['batch_size'])
+            for claimed in tasks:
+                # Claimed tasks are finished before stopping, the rest stay queued
+                run(claimed)
+            if not tasks:
+                time.sleep(options['sleep'])
+        self.stdout.write("Worker stopped")
+
+    def stop(self, signum, frame):
+        self.stopping = True
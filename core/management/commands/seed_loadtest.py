@@ -0,0 +1,94 @@
+import random
+import time
+from datetime import date
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from knox.models import AuthToken
+from core.auth import forget_tokens
+from core.benchmarks import delete_tree, seed_catalog, seed_payments, seed_reservations, seed_reviews, seed_users
+from core.models import (
+    ArchivedPayment, ArchivedReservation, ArchivedReservationService, ArchivedReview, Payment, Reservation,
+    ReservationService, Review, Room, RoomRating, RoomType, RoomTypeRating, UserProfile,
+)
+from core.occupancy import rebuild_nights
+from core.ratings import rebuild_ratings
+from core.signals import bump_version
+
+LABEL = 'load'
+# Users loadtest_http's register flow creates: lt_<run id>_<n>
+REGISTERED_USERS = r'^lt_[0-9a-f]{8}_[0-9]+$'
+
+
+class Command(BaseCommand):
+    help = ("Seed a reproducible synthetic dataset for loadtest_http: rooms, users (all sharing one "
+            "password), reservations, payments and reviews, then rebuild the calendar and ratings")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--room-types', type=int, default=50)
+        parser.add_argument('--rooms', type=int, default=20000)
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--reservations', type=int, default=1000000)
+        parser.add_argument('--payment-ratio', type=float, default=0.8)
+        parser.add_argument('--review-ratio', type=float, default=0.3)
+        parser.add_argument('--password', default='loadtest-password')
+        parser.add_argument('--seed', type=int, default=42, help="Random seed, so runs are comparable")
+        parser.add_argument('--anchor-date', type=date.fromisoformat, default=None,
+                            help="Day (YYYY-MM-DD) history and upcoming stays are laid out around; default today. "
+                                 "Together with --seed it makes the dataset identical across runs")
+        parser.add_argument('--clear', action='store_true',
+                            help="Delete a previously seeded dataset and the users load tests registered first")
+
+    def handle(self, *args, **options):
+        if Room.objects.filter(number__startswith=f"{LABEL.upper()}-").exists():
+            if not options['clear']:
+                raise CommandError("A load-test dataset already exists, pass --clear to replace it")
+            self.step("Deleted the previous dataset", self.clear)
+        random.seed(options['seed'])
+        anchor = options['anchor_date'] or date.today()
+        rooms_seeded = Room.objects.filter(number__startswith=f"{LABEL.upper()}-")
+        with transaction.atomic():
+            room_types, rooms = self.step(
+                f"Seeded {options['rooms']} rooms", seed_catalog, options['room_types'], options['rooms'], LABEL,
+            )
+            users = self.step(f"Seeded {options['users']} users", seed_users, options['users'], LABEL, options['password'])
+            self.step(
+                f"Seeded {options['reservations']} reservations around {anchor}",
+                seed_reservations, rooms, users, options['reservations'], anchor,
+            )
+            self.step("Seeded payments", seed_payments, LABEL, options['payment_ratio'])
+            self.step("Seeded reviews", seed_reviews, LABEL, options['review_ratio'])
+            self.step("Rebuilt the occupancy calendar of the seeded rooms", rebuild_nights, 2000, rooms_seeded)
+            self.step("Rebuilt rating aggregates of the seeded rooms", rebuild_ratings, rooms_seeded)
+        self.bump_versions()
+        self.stdout.write(
+            f"{Payment.objects.count()} payments, {Review.objects.count()} reviews; "
+            f"log in as {LABEL}_user_<0..{options['users'] - 1}> with the given password"
+        )
+
+    def step(self, message, fn, *args):
+        started = time.perf_counter()
+        result = fn(*args)
+        self.stdout.write(f"{message} in {time.perf_counter() - started:.1f}s")
+        return result
+
+    def clear(self):
+        # Children first, in batches of plain DELETEs (see delete_tree): the ORM would
+        # load every row and send its signals. Cached tokens of the users go too.
+        tokens = AuthToken.objects.filter(
+            Q(user__username__startswith=f"{LABEL}_user_") | Q(user__username__regex=REGISTERED_USERS)
+        )
+        forget_tokens(*tokens.values_list('digest', flat=True))
+        with transaction.atomic():
+            delete_tree(Room, "starts_with(number, %s)", [f"{LABEL.upper()}-"])
+            delete_tree(RoomType, "starts_with(name, %s)", [f"{LABEL.capitalize()} type "])
+            delete_tree(User, "starts_with(username, %s)", [f"{LABEL}_user_"])
+            delete_tree(User, "username ~ %s", [REGISTERED_USERS])
+        self.bump_versions()
+
+    def bump_versions(self):
+        for model in (RoomType, Room, User, UserProfile, Reservation, ReservationService, Payment, Review,
+                      RoomRating, RoomTypeRating, ArchivedReservation, ArchivedReservationService,
+                      ArchivedPayment, ArchivedReview):
+            bump_version(model)
@@ -0,0 +1,123 @@
+from django.core.cache import caches
+from django.core.cache.backends.redis import RedisCache
+
+# Counters live in the 'metrics' cache (see settings.CACHES), out of reach of the
+# response caches' eviction, so every worker process adds to the same totals when
+# a shared backend (Redis) is configured. Without one, each process counts its own.
+
+KEY_PREFIX = 'metrics:'
+_counters = {}
+
+
+def register_counter(name, description):
+    _counters[name] = description
+
+
+def incr(name, value=1):
+    incr_many({name: value})
+
+
+def incr_many(values):
+    """Add {name: value} to the counters, in one round trip on Redis."""
+    store = caches['metrics']
+    values = {KEY_PREFIX + name: value for name, value in values.items() if value}
+    if isinstance(store, RedisCache):
+        # The backend has no incr_many: pipeline INCRBYs on its client. INCRBY creates
+        # missing keys, and the backend stores integers as such, so get_many reads them.
+        pipeline = store._cache.get_client(write=True).pipeline(transaction=False)
+        for key, value in values.items():
+            pipeline.incrby(store.make_and_validate_key(key), value)
+        pipeline.execute()
+        return
+    for key, value in values.items():
+        try:
+            store.incr(key, value)
+        except ValueError:
+            # First increment
+            if not store.add(key, value, timeout=None):
+                store.incr(key, value)
+
+
+def snapshot():
+    values = caches['metrics'].get_many([KEY_PREFIX + name for name in _counters])
+    return {name: values.get(KEY_PREFIX + name, 0) for name in _counters}
+
+
+# Per-endpoint request metrics, recorded by core.middleware.RequestMetricsMiddleware
+# with one incr_many per request. Durations are stored as integer microseconds so
+# they can be incremented; the latency histogram stores one non-cumulative counter
+# per bucket.
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+REQUEST_FIELDS = ('count', 'queries', 'db_us', 'serialize_us', 'render_us', 'total_us', 'over_budget')
+
+
+def _request_key(label, field):
+    return f'request:{label}:{field}'
+
+
+def observe_request(label, queries, db_seconds, serialize_seconds, render_seconds, seconds, over_budget=False):
+    bucket = next((index for index, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+    incr_many({
+        _request_key(label, 'count'): 1,
+        _request_key(label, 'queries'): queries,
+        _request_key(label, 'db_us'): round(db_seconds * 1e6),
+        _request_key(label, 'serialize_us'): round(serialize_seconds * 1e6),
+        _request_key(label, 'render_us'): round(render_seconds * 1e6),
+        _request_key(label, 'total_us'): round(seconds * 1e6),
+        _request_key(label, 'over_budget'): int(over_budget),
+        _request_key(label, f'bucket_{bucket}'): 1,
+    })
+
+
+def request_snapshot(labels):
+    """{label: {field: value}} for every label that has served a request."""
+    fields = REQUEST_FIELDS + tuple(f'bucket_{index}' for index in range(len(LATENCY_BUCKETS) + 1))
+    values = caches['metrics'].get_many([KEY_PREFIX + _request_key(label, field) for label in labels for field in fields])
+    snapshot = {}
+    for label in labels:
+        row = {field: values.get(KEY_PREFIX + _request_key(label, field), 0) for field in fields}
+        if row['count']:
+            snapshot[label] = row
+    return snapshot
+
+
+def _labels(label):
+    view, _, action = label.partition('.')
+    return f'view="{view}",action="{action}"'
+
+
+def prometheus_text(labels):
+    """Counters and request metrics in the Prometheus text exposition format."""
+    lines = []
+    for name, value in snapshot().items():
+        lines += [f'# HELP hcx_{name}_total {_counters[name]}', f'# TYPE hcx_{name}_total counter', f'hcx_{name}_total {value}']
+    requests = request_snapshot(labels)
+    series = (
+        ('requests_total', "Requests handled per view and action", 'count', 1),
+        ('request_db_queries_total', "Database queries run while handling requests", 'queries', 1),
+        ('request_db_seconds_total', "Time spent in database queries", 'db_us', 1e6),
+        ('request_serialize_seconds_total', "Time spent in serializer.data", 'serialize_us', 1e6),
+        ('request_render_seconds_total', "Time spent rendering response bodies", 'render_us', 1e6),
+        ('request_query_budget_exceeded_total', "Requests that ran more queries than the view's query budget", 'over_budget', 1),
+    )
+    for name, description, field, scale in series:
+        lines += [f'# HELP hcx_{name} {description}', f'# TYPE hcx_{name} counter']
+        lines += [f'hcx_{name}{{{_labels(label)}}} {row[field] / scale if scale != 1 else row[field]}' for label, row in requests.items()]
+    lines += ['# HELP hcx_request_duration_seconds Request latency', '# TYPE hcx_request_duration_seconds histogram']
+    for label, row in requests.items():
+        cumulative = 0
+        for index, bound in enumerate(LATENCY_BUCKETS + ('+Inf',)):
+            cumulative += row[f'bucket_{index}']
+            lines.append(f'hcx_request_duration_seconds_bucket{{{_labels(label)},le="{bound}"}} {cumulative}')
+        lines.append(f'hcx_request_duration_seconds_sum{{{_labels(label)}}} {row["total_us"] / 1e6}')
+        lines.append(f'hcx_request_duration_seconds_count{{{_labels(label)}}} {row["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def prometheus_gauges(gauges):
+    """(name, description, value) triples in the Prometheus text exposition format."""
+    lines = []
+    for name, description, value in gauges:
+        lines += [f'# HELP hcx_{name} {description}', f'# TYPE hcx_{name} gauge', f'hcx_{name} {value}']
+    return '\n'.join(lines) + '\n' if lines else ''
@@ -0,0 +1,220 @@
+import functools
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.db import connections
+from django.middleware.clickjacking import XFrameOptionsMiddleware
+from django.middleware.csrf import CsrfViewMiddleware
+from django.urls import get_resolver
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def _view_class(view_func):
+    # DRF sets ``cls`` on its views, Django's View.as_view() sets ``view_class``
+    return getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+
+
+def view_label(view_func, method):
+    """"ViewClass.action" for viewsets, "ViewClass.method" for other class-based views, else None."""
+    cls = _view_class(view_func)
+    if cls is None:
+        return None
+    actions = getattr(view_func, 'actions', None)
+    if actions is not None:
+        return f'{cls.__name__}.{actions.get(method, method)}'
+    return f'{cls.__name__}.{method}'
+
+
+@functools.cache
+def api_view_labels():
+    """Every label the URLconf can produce, so the metrics endpoint knows which keys to read."""
+    labels = set()
+    patterns = list(get_resolver().url_patterns)
+    while patterns:
+        pattern = patterns.pop()
+        if hasattr(pattern, 'url_patterns'):
+            patterns += pattern.url_patterns
+            continue
+        callback = pattern.callback
+        cls = _view_class(callback)
+        if cls is None:
+            continue
+        methods = getattr(callback, 'actions', None) or {
+            method: method for method in cls.http_method_names if hasattr(cls, method)
+        }
+        labels |= {view_label(callback, method) for method in methods}
+    return sorted(labels)
+
+
+def query_budget(view_func, label):
+    """The view's ``query_budget``: an int, or a dict of per-action ints."""
+    budget = getattr(_view_class(view_func), 'query_budget', None)
+    if isinstance(budget, dict):
+        return budget.get(label.partition('.')[2])
+    return budget
+
+
+@contextmanager
+def serialization_timer(request):
+    """Count the time spent in the block as the request's serialization time."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = getattr(request, '_metrics', None)
+        if stats is not None:
+            stats['serialize'] += time.perf_counter() - started
+
+
+# Request instrumentation: counts the queries and database time of every class-based
+# view through connection.execute_wrapper, times serialization (serializer.data and
+# the .values() fast path, see serialization_timer), response rendering and the whole
+# request, and records them per view and action with one batched cache write (see
+# core.metrics). It runs natively under WSGI and ASGI, so async views are not pushed
+# onto a thread by it; the cache write happens off the event loop. Views may
+# declare a ``query_budget``; going over it is logged and counted, or raises
+# QueryBudgetExceeded when QUERY_BUDGET_STRICT is on (as it is under the test runner).
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.REQUEST_METRICS:
+            return self.get_response(request)
+        started = time.perf_counter()
+        with self._count_queries(request):
+            response = self.get_response(request)
+        return self._record(request, response, started)
+
+    async def __acall__(self, request):
+        if not settings.REQUEST_METRICS:
+            return await self.get_response(request)
+        started = time.perf_counter()
+        # Under ASGI the ORM runs in the request's thread-sensitive executor, whose
+        # connections are the ones to wrap
+        counting = await sync_to_async(self._count_queries)(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(counting.close)()
+        return await sync_to_async(self._record)(request, response, started)
+
+    def _count_queries(self, request):
+        request._metrics = {'label': None, 'queries': 0, 'db': 0.0, 'serialize': 0.0, 'render': 0.0}
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self._count_query(request._metrics)))
+        return stack
+
+    def _record(self, request, response, started):
+        label = request._metrics['label']
+        if label is None:
+            return response
+        elapsed = time.perf_counter() - started
+        queries = request._metrics['queries']
+        budget = query_budget(request._metrics['view'], label)
+        over_budget = budget is not None and queries > budget
+        metrics.observe_request(
+            label, queries, request._metrics['db'], request._metrics['serialize'], request._metrics['render'],
+            elapsed, over_budget,
+        )
+        if over_budget:
+            message = f"{label} ran {queries} queries, over its budget of {budget}"
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        if settings.REQUEST_METRICS_HEADERS:
+            response['X-DB-Queries'] = str(queries)
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={request._metrics["db"] * 1000:.1f}',
+                f'serialize;dur={request._metrics["serialize"] * 1000:.1f}',
+                f'render;dur={request._metrics["render"] * 1000:.1f}',
+                f'total;dur={elapsed * 1000:.1f}',
+            ])
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, '_metrics'):
+            request._metrics['label'] = view_label(view_func, request.method.lower())
+            request._metrics['view'] = view_func
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns
+        if hasattr(request, '_metrics'):
+            started = time.perf_counter()
+
+            def rendered(response):
+                request._metrics['render'] += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    @staticmethod
+    def _count_query(stats):
+        def wrapper(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                stats['queries'] += 1
+                stats['db'] += time.perf_counter() - started
+        return wrapper
+
+
+# Lean API routes: requests under API_PATH_PREFIXES authenticate with knox tokens,
+# so unless API_SESSIONS is on they skip sessions, the session-backed user and
+# messages, CSRF (DRF views are exempt anyway) and the clickjacking header. The
+# admin and the Swagger UI keep the full stack. These subclasses replace Django's
+# middleware in MIDDLEWARE and behave exactly like it everywhere else.
+def is_lean_api_request(request):
+    return not settings.API_SESSIONS and request.path_info.startswith(tuple(settings.API_PATH_PREFIXES))
+
+
+class LeanAPIMixin:
+    def __call__(self, request):
+        if is_lean_api_request(request):
+            # A coroutine when the stack runs under ASGI, as MiddlewareMixin returns
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class LeanSessionMiddleware(LeanAPIMixin, SessionMiddleware):
+    pass
+
+
+class LeanCsrfViewMiddleware(LeanAPIMixin, CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if is_lean_api_request(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class LeanAuthenticationMiddleware(LeanAPIMixin, AuthenticationMiddleware):
+    pass
+
+
+class LeanMessageMiddleware(LeanAPIMixin, MessageMiddleware):
+    pass
+
+
+class LeanXFrameOptionsMiddleware(LeanAPIMixin, XFrameOptionsMiddleware):
+    pass
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-17 22:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_alter_review_user_id_alter_reservation_user_id_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('status__in', ('pending', 'confirmed', 'checked_in'))), fields=['room_id', 'check_out', 'check_in'], name='reservation_active_dates_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+import core.models
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import IntegrityError, migrations, models
+
+# Exclusion constraint that makes overlapping active stays of one room impossible
+# at the database level (btree_gist provides the room_id equality in a GiST index).
+# Double bookings made before it cannot be resolved automatically, which guest
+# keeps the room is the hotel's call: the migration lists them and stops, see
+# "Double bookings" in the README.
+
+OVERLAPS = """
+SELECT a.room_id_id, a.id, a.check_in, a.check_out, b.id, b.check_in, b.check_out
+FROM core_reservation a JOIN core_reservation b
+    ON b.room_id_id = a.room_id_id AND b.id > a.id
+    AND daterange(b.check_in, b.check_out) && daterange(a.check_in, a.check_out)
+WHERE a.status IN ('pending', 'confirmed', 'checked_in')
+    AND b.status IN ('pending', 'confirmed', 'checked_in')
+ORDER BY a.room_id_id, a.check_in, a.id, b.id
+"""
+
+
+def check_overlaps(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(OVERLAPS)
+        overlaps = cursor.fetchall()
+    if overlaps:
+        listing = '\n'.join(
+            f'  room {room}: reservation {first} ({first_in} to {first_out}) '
+            f'overlaps reservation {second} ({second_in} to {second_out})'
+            for room, first, first_in, first_out, second, second_in, second_out in overlaps
+        )
+        raise IntegrityError(
+            f"{len(overlaps)} overlapping active reservations must be moved to another room "
+            f"or cancelled before the reservation_no_overlap constraint can be added:\n{listing}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        BtreeGistExtension(),
+        migrations.RunPython(check_overlaps, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='reservation',
+            constraint=ExclusionConstraint(
+                condition=models.Q(('status__in', ('pending', 'confirmed', 'checked_in'))),
+                expressions=[('room_id', '='), (core.models.DateRange('check_in', 'check_out'), '&&')],
+                name='reservation_no_overlap',
+            ),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-17 22:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_reservation_no_overlap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomNight',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('checked_in', 'Checked In'), ('checked_out', 'Checked Out')], max_length=20)),
+                ('reservation_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.reservation')),
+                ('room_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.room')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date', 'room_id'], name='roomnight_date_room_idx')],
+                'constraints': [models.UniqueConstraint(fields=('reservation_id', 'date'), name='roomnight_reservation_date_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-17 22:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_task'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('status', 'completed')), fields=['paid_at'], name='payment_completed_paid_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('transaction_id__isnull', False)), fields=['transaction_id'], name='payment_transaction_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['user_id', 'created_at', 'id'], name='reservation_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['check_in', 'status'], name='reservation_check_in_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservationservice',
+            index=models.Index(condition=models.Q(('scheduled_time__isnull', False)), fields=['scheduled_time'], name='resservice_scheduled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user_id', 'created_at', 'id'], name='review_user_created_idx'),
+        ),
+    ]
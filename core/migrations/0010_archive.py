@@ -0,0 +1,98 @@
+# Generated by Django 5.2 on 2026-10-17 22:56
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_query_plan_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='roomnight',
+            name='reservation_id',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='core.reservation'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedReservation',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('check_in', models.DateField()),
+                ('check_out', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('checked_in', 'Checked In'), ('checked_out', 'Checked Out')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('room_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_reservations', to='core.room')),
+                ('user_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_reservations', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedPayment',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('method', models.CharField(choices=[('credit_card', 'Credit Card'), ('debit_card', 'Debit Card'), ('cash', 'Cash'), ('mobile_payment', 'Mobile Payment'), ('bank_transfer', 'Bank Transfer')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed'), ('refunded', 'Refunded')], max_length=20)),
+                ('transaction_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('paid_at', models.DateTimeField(blank=True, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('reservation_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.archivedreservation')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedReservationService',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('quantity', models.IntegerField()),
+                ('scheduled_time', models.DateTimeField(blank=True, null=True)),
+                ('reservation_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.archivedreservation')),
+                ('service_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_uses', to='core.service')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedReview',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('rating', models.IntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)])),
+                ('comment', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('reservation_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.archivedreservation')),
+                ('user_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_reviews', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedreservation',
+            index=models.Index(fields=['created_at', 'id'], name='archived_res_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedreservation',
+            index=models.Index(fields=['user_id', 'created_at', 'id'], name='archived_res_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedreservation',
+            index=models.Index(fields=['check_in', 'status'], name='archived_res_check_in_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedpayment',
+            index=models.Index(condition=models.Q(('status', 'completed')), fields=['paid_at'], name='archived_payment_paid_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedreservationservice',
+            index=models.Index(condition=models.Q(('scheduled_time__isnull', False)), fields=['scheduled_time'], name='archived_service_scheduled_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedreview',
+            index=models.Index(fields=['created_at', 'id'], name='archived_review_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedreview',
+            index=models.Index(fields=['user_id', 'created_at', 'id'], name='archived_review_user_idx'),
+        ),
+    ]
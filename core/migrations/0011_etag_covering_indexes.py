@@ -0,0 +1,47 @@
+# Generated by Django 5.2 on 2026-10-17 23:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='archivedreservation',
+            name='archived_res_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='archivedreservation',
+            name='archived_res_user_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='reservation',
+            name='reservation_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='reservation',
+            name='reservation_user_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='archivedreservation',
+            index=models.Index(fields=['created_at', 'id'], include=('updated_at',), name='archived_res_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedreservation',
+            index=models.Index(fields=['user_id', 'created_at', 'id'], include=('updated_at',), name='archived_res_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['created_at', 'id'], include=('updated_at',), name='reservation_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['user_id', 'created_at', 'id'], include=('updated_at',), name='reservation_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-17 23:19
+
+from django.db import migrations, models
+
+# Checked-out stays so far kept their nights up to the day they were saved as
+# checked out: the day after their last night is their departure
+BACKFILL_DEPARTURES = """
+UPDATE core_reservation SET departed_on = COALESCE(
+    (SELECT MAX(night.date) + 1 FROM core_roomnight night WHERE night.reservation_id_id = core_reservation.id),
+    check_in
+) WHERE status = 'checked_out';
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_etag_covering_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedreservation',
+            name='departed_on',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='departed_on',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunSQL(BACKFILL_DEPARTURES, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-17 23:20
+
+from django.db import migrations, models
+
+# Rates were not recorded so far: existing stays and nights take their room
+# type's current price, which is what the reports used until now
+BACKFILL_RATES = """
+UPDATE core_reservation SET nightly_rate = type.price_per_night
+FROM core_room room JOIN core_roomtype type ON type.id = room.type_id_id
+WHERE room.id = core_reservation.room_id_id;
+UPDATE core_archivedreservation SET nightly_rate = type.price_per_night
+FROM core_room room JOIN core_roomtype type ON type.id = room.type_id_id
+WHERE room.id = core_archivedreservation.room_id_id;
+UPDATE core_roomnight SET rate = type.price_per_night
+FROM core_room room JOIN core_roomtype type ON type.id = room.type_id_id
+WHERE room.id = core_roomnight.room_id_id;
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_reservation_departed_on'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedreservation',
+            name='nightly_rate',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='nightly_rate',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='roomnight',
+            name='rate',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunSQL(BACKFILL_RATES, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-17 23:44
+
+from django.db import migrations, models
+
+# Service prices were not recorded so far: existing services take their service
+# type's current price, which is what the reports used until now
+BACKFILL_PRICES = """
+UPDATE core_reservationservice SET unit_price = type.price
+FROM core_service service JOIN core_servicetype type ON type.id = service.service_type_id_id
+WHERE service.id = core_reservationservice.service_id_id;
+UPDATE core_archivedreservationservice SET unit_price = type.price
+FROM core_service service JOIN core_servicetype type ON type.id = service.service_type_id_id
+WHERE service.id = core_archivedreservationservice.service_id_id;
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_booked_rates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedreservationservice',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='reservationservice',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=10, null=True),
+        ),
+        migrations.RunSQL(BACKFILL_PRICES, migrations.RunSQL.noop),
+    ]
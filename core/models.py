@@ -1,3 +1,7 @@
+from decimal import Decimal
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateRangeField, RangeOperators
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.contrib.auth.models import User  # Use built-in User model
 
@@ -56,6 +60,14 @@ class Service(models.Model):
     def __str__(self):
         return self.name
 
+# daterange(check_in, check_out): the nights of a stay, departure day excluded
+class DateRange(models.Func):
+    function = 'DATERANGE'
+    output_field = DateRangeField()
+
+# Statuses that hold the room for the stay dates
+ACTIVE_RESERVATION_STATUSES = ('pending', 'confirmed', 'checked_in')
+
 class Reservation(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -64,15 +76,50 @@ class Reservation(models.Model):
         ('checked_in', 'Checked In'),
         ('checked_out', 'Checked Out'),
     )
+    ACTIVE_STATUSES = ACTIVE_RESERVATION_STATUSES
     id = models.AutoField(primary_key=True)
     user_id = models.ForeignKey(User, on_delete=models.CASCADE)  # Updated to use built-in User
     room_id = models.ForeignKey(Room, on_delete=models.CASCADE)
     check_in = models.DateField(null=False)
     check_out = models.DateField(null=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    # The day the guest actually left, set on checkout (see core.occupancy)
+    departed_on = models.DateField(null=True, blank=True, editable=False)
+    # Room type price per night when booked (see core.pricing); reports sum it
+    nightly_rate = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Overlap probe for availability: only reservations that still hold the room,
+            # so checked-out/cancelled history does not grow the index
+            models.Index(
+                fields=['room_id', 'check_out', 'check_in'],
+                condition=models.Q(status__in=ACTIVE_RESERVATION_STATUSES),
+                name='reservation_active_dates_idx',
+            ),
+            # Keyset pagination order; a guest's own list reads the per-user prefix in
+            # that order. updated_at makes the lists' ETag aggregate an index-only scan
+            models.Index(fields=['created_at', 'id'], include=['updated_at'], name='reservation_created_idx'),
+            models.Index(fields=['user_id', 'created_at', 'id'], include=['updated_at'],
+                         name='reservation_user_created_idx'),
+            # Stays by arrival date across all rooms (reports), the status checked in the index
+            models.Index(fields=['check_in', 'status'], name='reservation_check_in_idx'),
+        ]
+        constraints = [
+            # Backstop for writes that bypass the booking engine: no two active stays of
+            # one room share a night (GiST over btree_gist for the room equality)
+            ExclusionConstraint(
+                name='reservation_no_overlap',
+                expressions=[
+                    ('room_id', RangeOperators.EQUAL),
+                    (DateRange('check_in', 'check_out'), RangeOperators.OVERLAPS),
+                ],
+                condition=models.Q(status__in=ACTIVE_RESERVATION_STATUSES),
+            ),
+        ]
+
     def __str__(self):
         return f"Reservation {self.id} - {self.user_id.username}"
 
@@ -82,6 +129,19 @@ class ReservationService(models.Model):
     service_id = models.ForeignKey(Service, on_delete=models.CASCADE)
     quantity = models.IntegerField(default=1)
     scheduled_time = models.DateTimeField(null=True, blank=True)
+    # Service type price when ordered (see core.pricing); reports sum it
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Service revenue by scheduled day (reports); unscheduled services are dated
+            # by the reservation's check-in instead
+            models.Index(
+                fields=['scheduled_time'],
+                condition=models.Q(scheduled_time__isnull=False),
+                name='resservice_scheduled_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"Service for Reservation {self.reservation_id.id}"
@@ -109,6 +169,19 @@ class Payment(models.Model):
     paid_at = models.DateTimeField(null=True, blank=True)
     notes = models.TextField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Collected revenue by payment date (reports)
+            models.Index(
+                fields=['paid_at'], condition=models.Q(status='completed'), name='payment_completed_paid_at_idx',
+            ),
+            # Reconciliation with the payment provider looks payments up by its transaction id
+            models.Index(
+                fields=['transaction_id'], condition=models.Q(transaction_id__isnull=False),
+                name='payment_transaction_idx',
+            ),
+        ]
+
     def __str__(self):
         return f"Payment {self.id} - {self.reservation_id}"
 
@@ -116,9 +189,188 @@ class Review(models.Model):
     id = models.AutoField(primary_key=True)
     user_id = models.ForeignKey(User, on_delete=models.CASCADE)  # Updated to use built-in User
     reservation_id = models.ForeignKey(Reservation, on_delete=models.CASCADE)
-    rating = models.IntegerField(null=False)  # Assuming 1-5 scale
+    rating = models.IntegerField(null=False, validators=[MinValueValidator(1), MaxValueValidator(5)])
     comment = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination order, overall and per user
+            models.Index(fields=['created_at', 'id'], name='review_created_idx'),
+            models.Index(fields=['user_id', 'created_at', 'id'], name='review_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Review {self.id} - {self.rating}/5"
+
+# One row per room per occupied night, maintained from Reservation saves (see
+# core.occupancy) so the front-desk grid is a single range scan over dates
+class RoomNight(models.Model):
+    id = models.AutoField(primary_key=True)
+    room_id = models.ForeignKey(Room, on_delete=models.CASCADE)
+    # Null once the reservation is archived: the night stays as occupancy history
+    reservation_id = models.ForeignKey(Reservation, on_delete=models.CASCADE, null=True, blank=True)
+    date = models.DateField(null=False)
+    status = models.CharField(max_length=20, choices=Reservation.STATUS_CHOICES)
+    # The reservation's nightly rate, kept after archival for the revenue reports
+    rate = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'room_id'], name='roomnight_date_room_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['reservation_id', 'date'], name='roomnight_reservation_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Room {self.room_id_id} on {self.date}"
+
+# Review aggregates kept up to date from Review saves and deletes (see core.ratings),
+# so the catalog shows ratings without walking Review -> Reservation -> Room
+class RatingAggregate(models.Model):
+    review_count = models.IntegerField(default=0)
+    rating_total = models.IntegerField(default=0)
+    stars_1 = models.IntegerField(default=0)
+    stars_2 = models.IntegerField(default=0)
+    stars_3 = models.IntegerField(default=0)
+    stars_4 = models.IntegerField(default=0)
+    stars_5 = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def average_rating(self):
+        if not self.review_count:
+            return None
+        return (Decimal(self.rating_total) / self.review_count).quantize(Decimal('0.01'))
+
+class RoomTypeRating(RatingAggregate):
+    room_type = models.OneToOneField(RoomType, on_delete=models.CASCADE, primary_key=True, related_name='rating')
+
+    def __str__(self):
+        return f"Rating of {self.room_type_id}"
+
+class RoomRating(RatingAggregate):
+    room = models.OneToOneField(Room, on_delete=models.CASCADE, primary_key=True, related_name='rating')
+
+    def __str__(self):
+        return f"Rating of room {self.room_id}"
+
+# Background jobs, run by `manage.py run_worker` (see core.tasks). A task is queued
+# in the caller's transaction, so it only becomes visible to workers once the
+# booking or payment that queued it has committed.
+class Task(models.Model):
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    run_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers poll for due tasks in run_at order
+            models.Index(fields=['status', 'run_at'], name='task_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
+# Archive of finished stays (see core.archive). ``manage.py archive_history`` moves
+# reservations that checked out or were cancelled long ago here, with their
+# services, payments and reviews, so the live tables only hold recent and upcoming
+# business. Rows keep their ids and timestamps; the archive is read-only through
+# the API under /api/archive/.
+class ArchivedReservation(models.Model):
+    id = models.IntegerField(primary_key=True)
+    user_id = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_reservations')
+    room_id = models.ForeignKey(Room, on_delete=models.CASCADE, related_name='archived_reservations')
+    check_in = models.DateField()
+    check_out = models.DateField()
+    status = models.CharField(max_length=20, choices=Reservation.STATUS_CHOICES)
+    departed_on = models.DateField(null=True, blank=True)
+    nightly_rate = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], include=['updated_at'], name='archived_res_created_idx'),
+            models.Index(fields=['user_id', 'created_at', 'id'], include=['updated_at'],
+                         name='archived_res_user_created_idx'),
+            models.Index(fields=['check_in', 'status'], name='archived_res_check_in_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived reservation {self.id}"
+
+class ArchivedReservationService(models.Model):
+    id = models.IntegerField(primary_key=True)
+    reservation_id = models.ForeignKey(ArchivedReservation, on_delete=models.CASCADE)
+    service_id = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='archived_uses')
+    quantity = models.IntegerField()
+    scheduled_time = models.DateTimeField(null=True, blank=True)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['scheduled_time'],
+                condition=models.Q(scheduled_time__isnull=False),
+                name='archived_service_scheduled_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Service for archived reservation {self.reservation_id_id}"
+
+class ArchivedPayment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    reservation_id = models.ForeignKey(ArchivedReservation, on_delete=models.CASCADE)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    method = models.CharField(max_length=20, choices=Payment.METHOD_CHOICES)
+    status = models.CharField(max_length=20, choices=Payment.STATUS_CHOICES)
+    transaction_id = models.CharField(max_length=100, null=True, blank=True)
+    paid_at = models.DateTimeField(null=True, blank=True)
+    notes = models.TextField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['paid_at'], condition=models.Q(status='completed'), name='archived_payment_paid_at_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Archived payment {self.id}"
+
+class ArchivedReview(models.Model):
+    id = models.IntegerField(primary_key=True)
+    user_id = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_reviews')
+    reservation_id = models.ForeignKey(ArchivedReservation, on_delete=models.CASCADE)
+    rating = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
+    comment = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='archived_review_created_idx'),
+            models.Index(fields=['user_id', 'created_at', 'id'], name='archived_review_user_idx'),
+        ]
+
     def __str__(self):
-        return f"Review {self.id} - {self.rating}/5"
\ No newline at end of file
+        return f"Archived review {self.id} - {self.rating}/5"
@@ -0,0 +1,84 @@
+from datetime import date, timedelta
+from .models import Reservation, RoomNight
+
+# Occupancy calendar maintenance. A reservation occupies one RoomNight per night
+# of its stay while it is pending, confirmed or checked in; a checked-out stay
+# keeps the nights actually spent (up to ``departed_on``, recorded at checkout)
+# as history; cancelled stays occupy nothing.
+
+
+def record_departure(reservation, today=None):
+    """Set ``departed_on`` when ``reservation`` checks out; clear it if the checkout is undone."""
+    if reservation.status != 'checked_out':
+        reservation.departed_on = None
+    elif reservation.departed_on is None:
+        reservation.departed_on = today or date.today()
+
+
+def occupied_nights(reservation):
+    if reservation.status == 'cancelled':
+        return []
+    end = reservation.check_out
+    if reservation.status == 'checked_out' and reservation.departed_on is not None:
+        end = min(end, reservation.departed_on)
+    return [reservation.check_in + timedelta(days=offset) for offset in range((end - reservation.check_in).days)]
+
+
+def _night(reservation, night):
+    return RoomNight(
+        room_id_id=reservation.room_id_id, reservation_id_id=reservation.pk, date=night,
+        status=reservation.status, rate=reservation.nightly_rate,
+    )
+
+
+def sync_reservation_nights(reservation):
+    """Bring ``reservation``'s RoomNight rows in line with its room, dates and status."""
+    wanted = set(occupied_nights(reservation))
+    existing = RoomNight.objects.filter(reservation_id=reservation)
+    existing.exclude(room_id=reservation.room_id_id, status=reservation.status, date__in=wanted).delete()
+    kept = set(existing.values_list('date', flat=True))
+    RoomNight.objects.bulk_create([_night(reservation, night) for night in sorted(wanted - kept)])
+
+
+def rebuild_nights(batch_size=2000, rooms=None):
+    """Recompute the RoomNight rows from the reservations, of ``rooms`` (a Room queryset) or every room.
+
+    Returns the number of nights written. Nights of archived stays (no
+    reservation any more) are history and are kept.
+    """
+    nights = RoomNight.objects.filter(reservation_id__isnull=False)
+    reservations = Reservation.objects.exclude(status='cancelled')
+    if rooms is not None:
+        nights, reservations = nights.filter(room_id__in=rooms), reservations.filter(room_id__in=rooms)
+    nights.delete()
+    written = 0
+    batch = []
+    for reservation in reservations.iterator(chunk_size=batch_size):
+        batch += [_night(reservation, night) for night in occupied_nights(reservation)]
+        if len(batch) >= batch_size:
+            written += len(RoomNight.objects.bulk_create(batch))
+            batch = []
+    written += len(RoomNight.objects.bulk_create(batch))
+    return written
+
+
+def occupancy_grid(rooms, start, days):
+    """Attach to each room dict a ``nights`` map of date -> reservation id and status.
+
+    All nights of the page come from one range scan on ``roomnight_date_room_idx``.
+    """
+    by_room = {room['id']: dict(room, nights={}) for room in rooms}
+    nights = RoomNight.objects.filter(
+        date__gte=start, date__lt=start + timedelta(days=days), room_id__in=list(by_room),
+    ).values_list('room_id', 'date', 'reservation_id', 'status')
+    for room_id, night, reservation_id, status in nights:
+        by_room[room_id]['nights'][night.isoformat()] = {'reservation_id': reservation_id, 'status': status}
+    return list(by_room.values())
+
+
+def replace_nights(reservations):
+    """Rewrite the nights of ``reservations`` in bulk, for writes that bypass model signals."""
+    RoomNight.objects.filter(reservation_id__in=[reservation.pk for reservation in reservations]).delete()
+    RoomNight.objects.bulk_create([
+        _night(reservation, night) for reservation in reservations for night in occupied_nights(reservation)
+    ], batch_size=2000)
@@ -0,0 +1,99 @@
+from django.core.paginator import InvalidPage
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+
+# Keyset pagination is the default: the cursor encodes the last row's position on an
+# indexed ordering, so deep pages cost the same as the first one. Offset pagination
+# is kept for the public catalog, where the booking pages show page numbers.
+# ``apaginate_queryset`` is the counterpart of ``paginate_queryset`` for async views
+# (see core.asyncviews): it fetches the page with the async ORM, and the paginated
+# response is built the same way afterwards.
+
+
+class CursorPagination(pagination.CursorPagination):
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        window = self.page_window(queryset, request, view)
+        if window is None:
+            return None
+        return self.take_page(list(window))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        window = self.page_window(queryset, request, view)
+        if window is None:
+            return None
+        return self.take_page([row async for row in window])
+
+    # DRF's paginate_queryset, split around its single fetch so that the sync and the
+    # async path can each run it their own way
+
+    def page_window(self, queryset, request, view=None):
+        """The slice of ``queryset`` holding the requested page and the row after it, or None when not paginating."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, position = self.cursor or (0, False, None)
+        if reverse:
+            queryset = queryset.order_by(*(term[1:] if term.startswith('-') else f'-{term}' for term in self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            order = self.ordering[0]
+            # (cursor reversed) XOR (ordering descending)
+            lookup = 'lt' if self.cursor.reverse != order.startswith('-') else 'gt'
+            queryset = queryset.filter(**{f"{order.lstrip('-')}__{lookup}": position})
+        return queryset[offset:offset + self.page_size + 1]
+
+    def take_page(self, results):
+        """The page, and the cursor positions around it, from the rows ``page_window`` fetched."""
+        offset, reverse, position = self.cursor or (0, False, None)
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+        following = self._get_position_from_instance(results[-1], self.ordering) if has_following else None
+        if reverse:
+            # Fetched in reverse order
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None or offset > 0, has_following
+            self.next_position, self.previous_position = position, following
+        else:
+            self.has_next, self.has_previous = has_following, position is not None or offset > 0
+            self.next_position, self.previous_position = following, position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    ordering = ('-created_at', '-id')
+
+
+class PageNumberPagination(pagination.PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Paginator.count is a cached_property: count with the async ORM up front
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [item async for item in self.page.object_list]
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
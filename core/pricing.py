@@ -0,0 +1,137 @@
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from .cache import model_versions
+from .models import ReservationService, Room, RoomType, Service, ServiceType
+
+# Stay pricing: room type nightly rate x nights, plus service type price x quantity
+# for each requested service. Quotes are memoized in the cache under the price
+# versions of RoomType, Service and ServiceType, so any price change (or any other
+# write to those models) makes every memoized quote unreachable. Rates do not vary
+# by date, so the stay length rather than the exact dates keys the memo. Like the
+# catalog cache, memoization needs SHARED_CACHE: other processes would not see the
+# version bump.
+#
+# A reservation keeps the nightly rate of its room type at booking time
+# (``record_rates``), and a reservation service the price of its service type when
+# ordered (``record_service_prices``), so later price changes do not rewrite past
+# revenue or the quote of an existing reservation.
+
+
+def _quote_key(room_type_id, nights, services, versions):
+    service_part = ','.join(f'{service_id}x{quantity}' for service_id, quantity in services)
+    return f'quote:{versions}:{room_type_id}:{nights}:{service_part}'
+
+
+def _line(service, unit_price, quantity):
+    return {
+        'service': service.id,
+        'name': service.name,
+        'unit_price': unit_price,
+        'quantity': quantity,
+        'total': unit_price * quantity,
+    }
+
+
+def _quote(room_type, price_per_night, nights, lines):
+    room_total = price_per_night * nights
+    services_total = sum((line['total'] for line in lines), Decimal('0'))
+    return {
+        'room_type': room_type.id,
+        'room_type_name': room_type.name,
+        'nights': nights,
+        'price_per_night': price_per_night,
+        'room_total': room_total,
+        'breakfast_included': room_type.has_breakfast,
+        'services': lines,
+        'services_total': services_total,
+        'total': room_total + services_total,
+    }
+
+
+def _compute(room_type, nights, services, service_rows):
+    lines = []
+    for service_id, quantity in services:
+        service = service_rows[service_id]
+        lines.append(_line(service, service.service_type_id.price, quantity))
+    return _quote(room_type, room_type.price_per_night, nights, lines)
+
+
+def quote_stays(room_types, check_in, check_out, services=()):
+    """Quote the stay for each of ``room_types`` with ``services`` as (service, quantity) pairs.
+
+    Memoized quotes are fetched in one cache round trip; misses are computed from
+    one query for the services.
+    """
+    nights = (check_out - check_in).days
+    merged = {}
+    for service, quantity in services:
+        service_id = getattr(service, 'pk', service)
+        merged[service_id] = merged.get(service_id, 0) + quantity
+    services = sorted(merged.items())
+    keys = {room_type.pk: room_type.pk for room_type in room_types}
+    memoized = {}
+    if settings.SHARED_CACHE:
+        versions = '.'.join(str(version) for version in model_versions(RoomType, Service, ServiceType))
+        keys = {room_type.pk: _quote_key(room_type.pk, nights, services, versions) for room_type in room_types}
+        memoized = cache.get_many(list(keys.values()))
+
+    missing = [room_type for room_type in room_types if keys[room_type.pk] not in memoized]
+    if missing:
+        service_rows = Service.objects.select_related('service_type_id').in_bulk([pk for pk, _ in services])
+        computed = {keys[room_type.pk]: _compute(room_type, nights, services, service_rows) for room_type in missing}
+        if settings.SHARED_CACHE:
+            cache.set_many(computed, settings.QUOTE_CACHE_TIMEOUT)
+        memoized.update(computed)
+    return [dict(memoized[keys[room_type.pk]], check_in=check_in, check_out=check_out) for room_type in room_types]
+
+
+def quote_reservation(reservation):
+    """Quote ``reservation`` at the rates it was booked at.
+
+    The catalog prices stand in only where no rate was recorded.
+    """
+    room_type = RoomType.objects.get(room=reservation.room_id_id)
+    price_per_night = reservation.nightly_rate
+    if price_per_night is None:
+        price_per_night = room_type.price_per_night
+    lines = []
+    ordered = (
+        ReservationService.objects.filter(reservation_id=reservation)
+        .select_related('service_id__service_type_id').order_by('pk')
+    )
+    for ordered_service in ordered:
+        service = ordered_service.service_id
+        unit_price = ordered_service.unit_price
+        if unit_price is None:
+            unit_price = service.service_type_id.price
+        lines.append(_line(service, unit_price, ordered_service.quantity))
+    nights = (reservation.check_out - reservation.check_in).days
+    quote = _quote(room_type, price_per_night, nights, lines)
+    return dict(quote, check_in=reservation.check_in, check_out=reservation.check_out)
+
+
+def record_rates(reservations):
+    """Set the nightly rate of unpriced ``reservations`` from their room type, in one query."""
+    unpriced = [reservation for reservation in reservations if reservation.nightly_rate is None]
+    if not unpriced:
+        return
+    prices = dict(
+        Room.objects.filter(pk__in={reservation.room_id_id for reservation in unpriced})
+        .values_list('pk', 'type_id__price_per_night')
+    )
+    for reservation in unpriced:
+        reservation.nightly_rate = prices.get(reservation.room_id_id)
+
+
+def record_service_prices(services):
+    """Set the unit price of unpriced reservation ``services`` from their service type, in one query."""
+    unpriced = [service for service in services if service.unit_price is None]
+    if not unpriced:
+        return
+    prices = dict(
+        Service.objects.filter(pk__in={service.service_id_id for service in unpriced})
+        .values_list('pk', 'service_type_id__price')
+    )
+    for service in unpriced:
+        service.unit_price = prices.get(service.service_id_id)
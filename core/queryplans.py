@@ -0,0 +1,102 @@
+import re
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+from django.db import DEFAULT_DB_ALIAS, connections
+from .models import Room, RoomRating, RoomType, RoomTypeRating, Service, ServiceType
+
+# Query plan checks for the API's read paths (QueryPlanTests, ``manage.py
+# explain_queries``). The SELECTs an endpoint runs are captured and EXPLAINed, and
+# every table the plan reads in full is reported. Catalog tables are exempt: they
+# stay small and their list endpoints return the whole table anyway. Everything
+# else grows with the hotel's history and must be reached through an index.
+#
+# Queries are captured on every database alias (reads may go to a replica) and
+# EXPLAINed on the alias that ran them. Small test tables make a sequential scan
+# the cheapest plan, so ``seq_scans_discouraged()`` turns enable_seqscan off: a
+# Seq Scan is then only planned when no index can serve the query at all.
+
+CATALOG_TABLES = frozenset(model._meta.db_table for model in (
+    RoomType, Room, ServiceType, Service, RoomTypeRating, RoomRating,
+))
+
+_FULL_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def endpoints(today):
+    """GET paths covered by the plan checks; reservation-scoped rows are filtered per user unless staff."""
+    check_in = today + timedelta(days=30)
+    return [
+        '/api/users/',
+        '/api/room-types/',
+        '/api/rooms/',
+        f'/api/rooms/availability/?check_in={check_in}&check_out={check_in + timedelta(days=3)}',
+        '/api/service-types/',
+        '/api/services/',
+        '/api/reservations/',
+        '/api/reservation-services/',
+        '/api/payments/',
+        '/api/reviews/',
+        '/api/archive/reservations/',
+        '/api/archive/reservation-services/',
+        '/api/archive/payments/',
+        '/api/archive/reviews/',
+        f'/api/reports/?start={today - timedelta(days=90)}&end={today}&period=week',
+    ]
+
+
+@contextmanager
+def capture_selects():
+    """Collect the (alias, sql, params) of the SELECTs run inside the block on any database."""
+    statements = []
+
+    def recorder(alias):
+        def record(execute, sql, params, many, context):
+            if sql.lstrip()[:6].upper() == 'SELECT':
+                statements.append((alias, sql, params))
+            return execute(sql, params, many, context)
+        return record
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder(connection.alias)))
+        yield statements
+
+
+def _set_seqscan(connection, value):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SET enable_seqscan = {value}')
+
+
+@contextmanager
+def seq_scans_discouraged():
+    for connection in connections.all():
+        _set_seqscan(connection, 'off')
+    try:
+        yield
+    finally:
+        for connection in connections.all():
+            _set_seqscan(connection, 'DEFAULT')
+
+
+def explain(sql, params=(), using=DEFAULT_DB_ALIAS):
+    """The plan of ``sql`` on database ``using`` as lines of text."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'EXPLAIN {sql}', params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def full_scans(plan):
+    """Non-catalog tables that ``plan`` reads in full."""
+    scanned = {match.group(1) for line in plan if (match := _FULL_SCAN.search(line))}
+    return sorted(scanned - CATALOG_TABLES)
+
+
+def endpoint_scans(client, path):
+    """Response of a GET of ``path`` and [(alias, sql, plan, full scans)] of the SELECTs it ran."""
+    with capture_selects() as statements:
+        response = client.get(path)
+    results = []
+    for alias, sql, params in statements:
+        plan = explain(sql, params, alias)
+        results.append((alias, sql, plan, full_scans(plan)))
+    return response, results
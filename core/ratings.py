@@ -0,0 +1,54 @@
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from .models import ArchivedReview, Reservation, Review, RoomRating, RoomTypeRating
+
+# Rating aggregates per room and per room type. Each review save or delete moves
+# the counters of the reviewed room and its type with F() expressions, in the
+# review's own transaction when there is one (ReviewViewSet opens it), so
+# concurrent reviews never lose an increment and a failed write moves nothing.
+
+STARS = range(1, 6)
+
+
+def apply_rating(reservation_id, rating, sign):
+    """Add (sign=1) or remove (sign=-1) one ``rating`` for the room of ``reservation_id``."""
+    room = Reservation.objects.filter(pk=reservation_id).values_list('room_id', 'room_id__type_id').first()
+    if room is None:
+        return
+    changes = {'review_count': F('review_count') + sign, 'rating_total': F('rating_total') + sign * rating}
+    if rating in STARS:
+        changes[f'stars_{rating}'] = F(f'stars_{rating}') + sign
+    with transaction.atomic():
+        for model, pk in zip((RoomRating, RoomTypeRating), room):
+            model.objects.get_or_create(pk=pk)
+            model.objects.filter(pk=pk).update(**changes)
+
+
+def rebuild_ratings(rooms=None):
+    """Recompute the aggregates from the reviews, archived ones included; returns (rooms, room types) rated.
+
+    With ``rooms`` (a Room queryset) only those rooms and their room types are recomputed.
+    """
+    histogram = {f'stars_{stars}': Count('id', filter=Q(rating=stars)) for stars in STARS}
+    written = []
+    with transaction.atomic():
+        for model, path, room_field in (
+            (RoomRating, 'reservation_id__room_id', 'pk'),
+            (RoomTypeRating, 'reservation_id__room_id__type_id', 'type_id'),
+        ):
+            stored, scope = model.objects.all(), {}
+            if rooms is not None:
+                keys = rooms.values(room_field)
+                stored, scope = stored.filter(pk__in=keys), {f'{path}__in': keys}
+            stored.delete()
+            aggregates = {}
+            for reviews in (Review, ArchivedReview):
+                rows = reviews.objects.filter(**scope).values(path).annotate(
+                    review_count=Count('id'), rating_total=Sum('rating'), **histogram,
+                ).order_by()
+                for row in rows:
+                    totals = aggregates.setdefault(row.pop(path), dict.fromkeys(row, 0))
+                    for field, value in row.items():
+                        totals[field] += value
+            written.append(len(model.objects.bulk_create(model(pk=pk, **row) for pk, row in aggregates.items())))
+    return tuple(written)
@@ -0,0 +1,45 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:  # Optional: without it these behave exactly like DRF's JSON classes
+    orjson = None
+
+# orjson-backed JSON renderer and parser. Output matches DRF's JSONRenderer with
+# its defaults (compact, UTF-8, U+2028/U+2029 escaped); dates, Decimals, lazy
+# strings and anything else orjson does not serialize itself go through DRF's encoder.
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or not (api_settings.COMPACT_JSON and api_settings.UNICODE_JSON):
+            return super().render(data, accepted_media_type, renderer_context)
+        indent = self.get_indent(accepted_media_type or '', renderer_context or {})
+        if indent not in (None, 2):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        # Dates and times keep DRF's formatting (millisecond precision, "Z" for UTC)
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        encoder = self.encoder_class()
+        ret = orjson.dumps(data, default=encoder.default, option=option)
+        # Same as DRF: these are valid JSON but break JavaScript string literals
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,185 @@
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DateField, F, Sum, Window
+from django.db.models.functions import Rank, Trunc, TruncDate
+from django.utils import timezone
+from .models import ArchivedPayment, ArchivedReservationService, Payment, ReservationService, Room, RoomNight
+
+# Revenue and occupancy reporting. Everything is aggregated in the database and
+# grouped per period (day, week or month) with Trunc, one query per source:
+#
+# - room nights sold and room revenue from RoomNight (the nightly rate booked),
+# - service revenue from ReservationService (unit price when ordered x quantity), dated
+#   by the scheduled time, or the reservation's check-in when unscheduled,
+# - collected revenue from completed Payments by method, dated by paid_at.
+#
+# Services and payments of archived stays (see core.archive) count too: those
+# sources are each one UNION ALL over the live and archive tables, every part
+# served by its own index.
+#
+# Periods that ended more than REPORT_CACHE_GRACE_DAYS ago are settled and cached
+# for REPORT_CACHE_TIMEOUT, so only recent periods and uncached history are queried.
+# Recently closed periods still change: cancelling a past no-show drops its nights
+# and a payment may be recorded with an earlier paid_at. Changes older than the
+# grace window show once the cached period expires.
+# Available room nights use the current room inventory.
+
+PERIODS = ('day', 'week', 'month')
+
+ZERO = Decimal('0.00')
+
+
+def period_start(day, period):
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_period(start, period):
+    if period == 'week':
+        return start + timedelta(days=7)
+    if period == 'month':
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def periods(start, end, period):
+    """(period key, first day, end day exclusive) of each period in [start, end), clipped to the range."""
+    buckets = []
+    key = period_start(start, period)
+    while key < end:
+        following = _next_period(key, period)
+        buckets.append((key, max(key, start), min(following, end)))
+        key = following
+    return buckets
+
+
+def _cache_key(period, first, last):
+    return f'report:{period}:{first.isoformat()}:{last.isoformat()}'
+
+
+def _ratio(numerator, denominator):
+    if not denominator:
+        return ZERO
+    return (Decimal(numerator) / Decimal(denominator)).quantize(Decimal('0.01'))
+
+
+def _empty():
+    return {
+        'room_nights_sold': 0, 'room_revenue': ZERO, 'service_revenue': ZERO,
+        'by_room_type': [], 'payments_by_method': [],
+    }
+
+
+def _kpis(sold, room_revenue, available):
+    return {
+        'occupancy': _ratio(sold, available),
+        'adr': _ratio(room_revenue, sold),
+        'revpar': _ratio(room_revenue, available),
+    }
+
+
+def _midnight(day):
+    """Start of ``day`` in the current time zone, the day boundary TruncDate uses."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _aggregate(start, end, period):
+    """Per-period figures for [start, end) keyed by period start, three queries in total."""
+    bucket = lambda expression: Trunc(expression, period, output_field=DateField())
+    figures = {}
+
+    def row(key):
+        return figures.setdefault(key, _empty())
+
+    nights = (
+        RoomNight.objects.filter(date__gte=start, date__lt=end)
+        .annotate(period=bucket('date'))
+        .values('period', room_type=F('room_id__type_id'), room_type_name=F('room_id__type_id__name'))
+        .annotate(nights=Count('id'), revenue=Sum('rate', default=ZERO))
+        .annotate(rank=Window(Rank(), partition_by=F('period'), order_by=F('revenue').desc()))
+        .order_by('period', 'rank', 'room_type')
+    )
+    for item in nights:
+        target = row(item.pop('period'))
+        target['room_nights_sold'] += item['nights']
+        target['room_revenue'] += item['revenue']
+        target['by_room_type'].append(item)
+
+    # Bounds as filters on the stored columns, so the indexes serve the ranges
+    # (TruncDate would have to be computed for every row)
+    start_at, end_at = _midnight(start), _midnight(end)
+    parts = []
+    for model in (ReservationService, ArchivedReservationService):
+        services = model.objects.exclude(reservation_id__status='cancelled')
+        revenue = Sum(F('quantity') * F('unit_price'))
+        parts += [
+            services.filter(scheduled_time__gte=start_at, scheduled_time__lt=end_at)
+            .annotate(period=bucket(TruncDate('scheduled_time'))).values('period').annotate(revenue=revenue).order_by(),
+            services.filter(scheduled_time__isnull=True, reservation_id__check_in__gte=start, reservation_id__check_in__lt=end)
+            .annotate(period=bucket('reservation_id__check_in')).values('period').annotate(revenue=revenue).order_by(),
+        ]
+    for item in parts[0].union(*parts[1:], all=True):
+        row(item['period'])['service_revenue'] += item['revenue']
+
+    live, archived = (
+        model.objects.filter(status='completed', paid_at__gte=start_at, paid_at__lt=end_at)
+        .annotate(period=bucket(TruncDate('paid_at')))
+        .values('period', 'method')
+        .annotate(amount=Sum('amount'), count=Count('id'))
+        .order_by()
+        for model in (Payment, ArchivedPayment)
+    )
+    collected = {}
+    for item in live.union(archived, all=True):
+        totals = collected.setdefault((item['period'], item['method']), {'method': item['method'], 'amount': ZERO, 'count': 0})
+        totals['amount'] += item['amount']
+        totals['count'] += item['count']
+    for (period, method), item in sorted(collected.items()):
+        row(period)['payments_by_method'].append(item)
+    return figures
+
+
+def revenue_report(start, end, period='month', today=None):
+    """Occupancy, ADR, RevPAR and revenue breakdowns for [start, end), per ``period`` and in total."""
+    today = today or date.today()
+    buckets = periods(start, end, period)
+    keys = {key: _cache_key(period, first, last) for key, first, last in buckets}
+    cached = cache.get_many(list(keys.values()))
+
+    missing = [(key, first, last) for key, first, last in buckets if keys[key] not in cached]
+    if missing:
+        figures = _aggregate(missing[0][1], missing[-1][2], period)
+        settled_by = today - timedelta(days=settings.REPORT_CACHE_GRACE_DAYS)
+        settled = {}
+        for key, first, last in missing:
+            cached[keys[key]] = figures.get(key) or _empty()
+            if last <= settled_by:
+                settled[keys[key]] = cached[keys[key]]
+        cache.set_many(settled, settings.REPORT_CACHE_TIMEOUT)
+
+    rooms = Room.objects.count()
+    rows = []
+    for key, first, last in buckets:
+        figures = cached[keys[key]]
+        available = rooms * (last - first).days
+        rows.append({
+            'period': key,
+            'start': first,
+            'end': last,
+            'closed': last <= today,
+            'room_nights_available': available,
+            **figures,
+            **_kpis(figures['room_nights_sold'], figures['room_revenue'], available),
+            'collected': sum((item['amount'] for item in figures['payments_by_method']), ZERO),
+        })
+    totals = {
+        field: sum((row[field] for row in rows), ZERO if field.endswith(('revenue', 'collected')) else 0)
+        for field in ('room_nights_available', 'room_nights_sold', 'room_revenue', 'service_revenue', 'collected')
+    }
+    totals.update(_kpis(totals['room_nights_sold'], totals['room_revenue'], totals['room_nights_available']))
+    return {'start': start, 'end': end, 'period': period, 'totals': totals, 'periods': rows}
@@ -0,0 +1,107 @@
+import functools
+import hashlib
+from pathlib import Path
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from drf_yasg.renderers import _SpecRenderer
+from drf_yasg.views import get_schema_view
+
+# The OpenAPI document only changes with the code: it is generated without a request
+# (the schema is public, and clients resolve the host themselves), rendered once per
+# format and reused under the code version. Sources, fastest first: this process,
+# the shared cache, the artifact written by ``manage.py generate_schema`` at deploy
+# time, and generation as a last resort.
+
+_rendered = {}
+
+
+@functools.cache
+def code_version():
+    """settings.CODE_VERSION (e.g. the release's commit), else a digest of the project's Python sources."""
+    if settings.CODE_VERSION:
+        return settings.CODE_VERSION
+    base = Path(settings.BASE_DIR)
+    roots = {Path(config.path) for config in apps.get_app_configs() if Path(config.path).is_relative_to(base)}
+    roots.add(base / settings.ROOT_URLCONF.split('.')[0])
+    digest = hashlib.md5()
+    for path in sorted(source for root in roots for source in root.rglob('*.py')):
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def artifact_path(renderer_class):
+    # drf_yasg's compatibility renderers use formats like ".json"
+    return Path(settings.OPENAPI_SCHEMA_DIR) / f'schema.{renderer_class.format.lstrip(".")}'
+
+
+@functools.cache
+def generate_schema(view_class):
+    generator = view_class.generator_class(view_class.api_info)
+    return generator.get_schema(request=None, public=True)
+
+
+def render_schema(schema, renderer_class):
+    return renderer_class().render(schema, renderer_class.media_type, {})
+
+
+def write_artifacts(view_class):
+    """Render every spec format to OPENAPI_SCHEMA_DIR, tagged with the code version."""
+    directory = Path(settings.OPENAPI_SCHEMA_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    schema = generate_schema(view_class)
+    paths = {}
+    for renderer_class in view_class.renderer_classes:
+        path = artifact_path(renderer_class)
+        if path not in paths:
+            path.write_bytes(render_schema(schema, renderer_class))
+            paths[path] = renderer_class
+    (directory / 'VERSION').write_text(code_version())
+    return list(paths)
+
+
+def _artifact(renderer_class):
+    try:
+        if (Path(settings.OPENAPI_SCHEMA_DIR) / 'VERSION').read_text().strip() != code_version():
+            return None
+        return artifact_path(renderer_class).read_bytes()
+    except OSError:
+        return None
+
+
+def schema_content(view_class, renderer_class):
+    key = f'openapi:{code_version()}:{renderer_class.format.lstrip(".")}'
+    content = _rendered.get(key)
+    if content is None:
+        content = cache.get(key)
+        if content is None:
+            content = _artifact(renderer_class) or render_schema(generate_schema(view_class), renderer_class)
+            cache.set(key, content, timeout=None)
+        _rendered[key] = content
+    return content
+
+
+def get_cached_schema_view(info, **kwargs):
+    """drf_yasg's get_schema_view() for a public schema, serving the spec formats from schema_content()."""
+    base = get_schema_view(info, public=True, **kwargs)
+
+    class CachedSchemaView(base):
+        api_info = info
+
+        def get(self, request, version='', format=None):
+            renderer = request.accepted_renderer
+            if not isinstance(renderer, _SpecRenderer):
+                # The UI pages load the spec with a second request
+                return super().get(request, version, format)
+            etag = quote_etag(code_version())
+            response = get_conditional_response(request, etag=etag) or HttpResponse(
+                schema_content(type(self), type(renderer)),
+                content_type=f'{renderer.media_type}; charset={renderer.charset}' if renderer.charset else renderer.media_type,
+            )
+            response['ETag'] = etag
+            return response
+
+    return CachedSchemaView
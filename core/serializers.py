@@ -1,5 +1,8 @@
-from rest_framework import serializers
+from rest_framework import permissions, serializers
+from rest_framework.serializers import LIST_SERIALIZER_KWARGS, LIST_SERIALIZER_KWARGS_REMOVE
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError as DjangoValidationError
+from .middleware import serialization_timer
 from .models import *
 
 # Registration serializer
@@ -27,6 +30,101 @@ class RegisterSerializer(serializers.ModelSerializer):
             UserProfile.objects.create(user=user)  # Create profile even if phone is not provided
         return user
 
+def _split_param(value):
+    return [item.strip() for item in value.split(',') if item.strip()] if value else []
+
+def parse_pk(model, value):
+    """``value`` as a primary key of ``model``, or None when it cannot be one."""
+    if isinstance(value, bool):
+        return None
+    try:
+        return model._meta.pk.to_python(value)
+    except (TypeError, ValueError, DjangoValidationError):
+        return None
+
+# Related rows a bulk request resolved up front (see core.bulk): the context's
+# ``related_rows`` maps field names to {pk: row}; anything else is looked up as usual.
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    def to_internal_value(self, data):
+        rows = self.context.get('related_rows', {}).get(self.field_name)
+        if rows:
+            row = rows.get(parse_pk(self.get_queryset().model, data))
+            if row is not None:
+                return row
+        return super().to_internal_value(data)
+
+# Reservation a service, payment or review is attached to: staff may pick any,
+# guests only their own (bulk requests resolve through the same queryset).
+class OwnReservationField(PrefetchedPrimaryKeyRelatedField):
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None or request.user.is_staff:
+            return queryset
+        return queryset.filter(user_id=request.user)
+
+# The requesting user; schema generation (drf_yasg) builds serializers without a request
+class RequestUserDefault(serializers.CurrentUserDefault):
+    def __call__(self, serializer_field):
+        request = serializer_field.context.get('request')
+        return request.user if request is not None else None
+
+# ``serializer.data`` counted as the request's serialization time (see
+# core.middleware); nested serializers are timed as part of their parent.
+class TimedDataMixin:
+    @property
+    def data(self):
+        with serialization_timer(self.context.get('request')):
+            return super().data
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    pass
+
+# Sparse fieldsets and opt-in expansion.
+# ``?fields=id,amount`` limits the top-level fields; ``?expand=reservation_id.room_id``
+# renders the listed relations (dotted for deeper levels) with their serializers.
+# Relations in ``Meta.expandable_fields`` are plain primary keys otherwise. Both
+# only apply to reads: writes always take and return the full representation.
+class DynamicFieldsModelSerializer(TimedDataMixin, serializers.ModelSerializer):
+    serializer_related_field = PrefetchedPrimaryKeyRelatedField
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        # BaseSerializer.many_init, with the timed list serializer
+        list_kwargs = {}
+        for key in LIST_SERIALIZER_KWARGS_REMOVE:
+            value = kwargs.pop(key, None)
+            if value is not None:
+                list_kwargs[key] = value
+        list_kwargs['child'] = cls(*args, **kwargs)
+        list_kwargs.update({key: value for key, value in kwargs.items() if key in LIST_SERIALIZER_KWARGS})
+        return TimedListSerializer(*args, **list_kwargs)
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if fields is None and expand is None and request is not None and request.method in permissions.SAFE_METHODS:
+            # Top-level serializer: read the query string
+            fields = _split_param(request.query_params.get('fields')) or None
+            expand = _split_param(request.query_params.get('expand'))
+        self._only_fields = fields
+        self._expand = expand or []
+
+    def get_fields(self):
+        fields = super().get_fields()
+        expand = {}
+        for path in self._expand:
+            name, _, rest = path.partition('.')
+            expand.setdefault(name, [])
+            if rest:
+                expand[name].append(rest)
+        for name, serializer_class in getattr(self.Meta, 'expandable_fields', {}).items():
+            if name in fields and name in expand:
+                fields[name] = serializer_class(read_only=True, expand=expand[name])
+        if self._only_fields:
+            fields = {name: field for name, field in fields.items() if name in self._only_fields}
+        return fields
+
 # Existing serializers (unchanged, included for context)
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
@@ -47,64 +145,220 @@ class UserProfileSerializer(serializers.ModelSerializer):
         model = UserProfile
         fields = ['phone', 'created_at', 'updated_at']
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsModelSerializer):
     profile = UserProfileSerializer()
 
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'profile']
 
-class RoomTypeSerializer(serializers.ModelSerializer):
+RATING_FIELDS = ('review_count', 'average_rating', 'stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5')
+
+class RoomTypeRatingSerializer(serializers.ModelSerializer):
+    average_rating = serializers.DecimalField(max_digits=3, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = RoomTypeRating
+        fields = RATING_FIELDS
+
+class RoomRatingSerializer(serializers.ModelSerializer):
+    average_rating = serializers.DecimalField(max_digits=3, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = RoomRating
+        fields = RATING_FIELDS
+
+# ``rating`` is null until the first review
+class RoomTypeSerializer(DynamicFieldsModelSerializer):
+    rating = RoomTypeRatingSerializer(read_only=True)
+
     class Meta:
         model = RoomType
         fields = '__all__'
 
-class RoomSerializer(serializers.ModelSerializer):
-    type_id = RoomTypeSerializer()
+class RoomSerializer(DynamicFieldsModelSerializer):
+    rating = RoomRatingSerializer(read_only=True)
 
     class Meta:
         model = Room
         fields = '__all__'
+        expandable_fields = {'type_id': RoomTypeSerializer}
 
-class ServiceTypeSerializer(serializers.ModelSerializer):
+class ServiceTypeSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = ServiceType
         fields = '__all__'
 
-class ServiceSerializer(serializers.ModelSerializer):
-    service_type_id = ServiceTypeSerializer()
-
+class ServiceSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Service
         fields = '__all__'
+        expandable_fields = {'service_type_id': ServiceTypeSerializer}
 
-class ReservationSerializer(serializers.ModelSerializer):
-    user_id = UserSerializer()
-    room_id = RoomSerializer()
-
+class ReservationSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Reservation
         fields = '__all__'
+        expandable_fields = {'user_id': UserSerializer, 'room_id': RoomSerializer}
+        extra_kwargs = {'user_id': {'default': RequestUserDefault()}}
+
+    def validate(self, data):
+        check_in = data.get('check_in', getattr(self.instance, 'check_in', None))
+        check_out = data.get('check_out', getattr(self.instance, 'check_out', None))
+        if check_in and check_out and check_out <= check_in:
+            raise serializers.ValidationError({'check_out': 'Check-out must be after check-in.'})
+        return data
 
-class ReservationServiceSerializer(serializers.ModelSerializer):
-    reservation_id = ReservationSerializer()
-    service_id = ServiceSerializer()
+class ReservationServiceSerializer(DynamicFieldsModelSerializer):
+    reservation_id = OwnReservationField(queryset=Reservation.objects.all())
 
     class Meta:
         model = ReservationService
         fields = '__all__'
+        expandable_fields = {'reservation_id': ReservationSerializer, 'service_id': ServiceSerializer}
 
-class PaymentSerializer(serializers.ModelSerializer):
-    reservation_id = ReservationSerializer()
+class PaymentSerializer(DynamicFieldsModelSerializer):
+    reservation_id = OwnReservationField(queryset=Reservation.objects.all())
 
     class Meta:
         model = Payment
         fields = '__all__'
+        expandable_fields = {'reservation_id': ReservationSerializer}
 
-class ReviewSerializer(serializers.ModelSerializer):
-    user_id = UserSerializer()
-    reservation_id = ReservationSerializer()
+class ReviewSerializer(DynamicFieldsModelSerializer):
+    reservation_id = OwnReservationField(queryset=Reservation.objects.all())
 
     class Meta:
         model = Review
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+        expandable_fields = {'user_id': UserSerializer, 'reservation_id': ReservationSerializer}
+        # The author is the reservation's guest (see ReviewViewSet.perform_create)
+        read_only_fields = ['user_id']
+
+# Archive (read-only, see core.archive)
+class ArchivedReservationSerializer(DynamicFieldsModelSerializer):
+    class Meta:
+        model = ArchivedReservation
+        fields = '__all__'
+        expandable_fields = {'user_id': UserSerializer, 'room_id': RoomSerializer}
+
+class ArchivedReservationServiceSerializer(DynamicFieldsModelSerializer):
+    class Meta:
+        model = ArchivedReservationService
+        fields = '__all__'
+        expandable_fields = {'reservation_id': ArchivedReservationSerializer, 'service_id': ServiceSerializer}
+
+class ArchivedPaymentSerializer(DynamicFieldsModelSerializer):
+    class Meta:
+        model = ArchivedPayment
+        fields = '__all__'
+        expandable_fields = {'reservation_id': ArchivedReservationSerializer}
+
+class ArchivedReviewSerializer(DynamicFieldsModelSerializer):
+    class Meta:
+        model = ArchivedReview
+        fields = '__all__'
+        expandable_fields = {'user_id': UserSerializer, 'reservation_id': ArchivedReservationSerializer}
+
+class AvailabilitySearchSerializer(serializers.Serializer):
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    occupancy = serializers.IntegerField(min_value=1, default=1)
+    room_type = serializers.PrimaryKeyRelatedField(queryset=RoomType.objects.all(), required=False)
+
+    def validate(self, data):
+        if data['check_out'] <= data['check_in']:
+            raise serializers.ValidationError({'check_out': 'Check-out must be after check-in.'})
+        return data
+
+class RoomTypeBookingSerializer(AvailabilitySearchSerializer):
+    room_type = serializers.PrimaryKeyRelatedField(queryset=RoomType.objects.all())
+
+class CalendarSearchSerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    days = serializers.IntegerField(min_value=1, max_value=90, default=60)
+    room_type = serializers.PrimaryKeyRelatedField(queryset=RoomType.objects.all(), required=False)
+
+class QuoteServiceSerializer(serializers.Serializer):
+    service = serializers.PrimaryKeyRelatedField(queryset=Service.objects.filter(is_active=True))
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+class QuoteRequestSerializer(serializers.Serializer):
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    room_types = serializers.PrimaryKeyRelatedField(queryset=RoomType.objects.all(), many=True, required=False)
+    services = QuoteServiceSerializer(many=True, required=False)
+
+    def validate(self, data):
+        if data['check_out'] <= data['check_in']:
+            raise serializers.ValidationError({'check_out': 'Check-out must be after check-in.'})
+        return data
+
+class QuoteLineSerializer(serializers.Serializer):
+    service = serializers.IntegerField()
+    name = serializers.CharField()
+    unit_price = serializers.DecimalField(max_digits=12, decimal_places=2)
+    quantity = serializers.IntegerField()
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+class QuoteSerializer(serializers.Serializer):
+    room_type = serializers.IntegerField()
+    room_type_name = serializers.CharField()
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    nights = serializers.IntegerField()
+    price_per_night = serializers.DecimalField(max_digits=12, decimal_places=2)
+    room_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    breakfast_included = serializers.BooleanField()
+    services = QuoteLineSerializer(many=True)
+    services_total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+class ReportRequestSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField(help_text="Exclusive")
+    period = serializers.ChoiceField(choices=('day', 'week', 'month'), default='month')
+
+    def validate(self, data):
+        if data['end'] <= data['start']:
+            raise serializers.ValidationError("end must be after start.")
+        if (data['end'] - data['start']).days > 3 * 366:
+            raise serializers.ValidationError("Reports span at most three years.")
+        return data
+
+class ReportRoomTypeSerializer(serializers.Serializer):
+    room_type = serializers.IntegerField()
+    room_type_name = serializers.CharField()
+    nights = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    rank = serializers.IntegerField()
+
+class ReportPaymentMethodSerializer(serializers.Serializer):
+    method = serializers.CharField()
+    amount = serializers.DecimalField(max_digits=14, decimal_places=2)
+    count = serializers.IntegerField()
+
+class ReportTotalsSerializer(serializers.Serializer):
+    room_nights_available = serializers.IntegerField()
+    room_nights_sold = serializers.IntegerField()
+    occupancy = serializers.DecimalField(max_digits=5, decimal_places=2)
+    room_revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    adr = serializers.DecimalField(max_digits=12, decimal_places=2)
+    revpar = serializers.DecimalField(max_digits=12, decimal_places=2)
+    service_revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+    collected = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+class ReportPeriodSerializer(ReportTotalsSerializer):
+    period = serializers.DateField()
+    start = serializers.DateField()
+    end = serializers.DateField()
+    closed = serializers.BooleanField()
+    by_room_type = ReportRoomTypeSerializer(many=True)
+    payments_by_method = ReportPaymentMethodSerializer(many=True)
+
+class ReportSerializer(serializers.Serializer):
+    start = serializers.DateField()
+    end = serializers.DateField()
+    period = serializers.CharField()
+    totals = ReportTotalsSerializer()
+    periods = ReportPeriodSerializer(many=True)
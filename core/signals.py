@@ -0,0 +1,137 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from knox.models import AuthToken
+from .auth import forget_tokens
+from . import metrics
+from .cache import bump_model_version
+from .occupancy import record_departure, sync_reservation_nights
+from .pricing import record_rates, record_service_prices
+from .ratings import apply_rating
+from .tasks import send_payment_receipt, send_reservation_confirmation
+from .models import *
+
+
+# Model version tokens key the catalog cache and the ETags of every viewset. The
+# version is bumped immediately and again on commit, so a response computed from
+# a concurrent read of the old rows while the write was in flight is dropped too.
+def bump_version(sender, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        # Logins touch User.last_login, which no serializer renders
+        return
+    bump_model_version(sender)
+    transaction.on_commit(lambda: bump_model_version(sender))
+
+
+for model in (
+    User, UserProfile, RoomType, Room, ServiceType, Service,
+    Reservation, ReservationService, Payment, Review,
+):
+    post_save.connect(bump_version, sender=model, dispatch_uid=f'bump_version_{model.__name__}')
+    post_delete.connect(bump_version, sender=model, dispatch_uid=f'bump_version_delete_{model.__name__}')
+
+
+# Cached token authentication: logout and pruning delete the token; deactivating
+# or editing the user must not be masked by a cached copy either.
+def forget_deleted_token(sender, instance, **kwargs):
+    forget_tokens(instance.digest)
+
+
+def forget_user_tokens(sender, instance, created, **kwargs):
+    if not created:
+        forget_tokens(*AuthToken.objects.filter(user=instance).values_list('digest', flat=True))
+
+
+post_delete.connect(forget_deleted_token, sender=AuthToken, dispatch_uid='forget_deleted_token')
+post_save.connect(forget_user_tokens, sender=User, dispatch_uid='forget_user_tokens')
+
+
+# Connection churn: with persistent or pooled connections this stays flat under load
+def count_new_connection(sender, connection, **kwargs):
+    metrics.incr('db_connections_opened')
+
+
+connection_created.connect(count_new_connection, dispatch_uid='count_new_connection')
+
+
+# Occupancy calendar: every saved reservation (created, moved, cancelled, checked
+# out) updates its own nights; deletes cascade to them
+def stamp_stay(sender, instance, **kwargs):
+    record_rates([instance])
+    record_departure(instance)
+
+
+def sync_calendar(sender, instance, **kwargs):
+    sync_reservation_nights(instance)
+
+
+pre_save.connect(stamp_stay, sender=Reservation, dispatch_uid='stamp_stay')
+post_save.connect(sync_calendar, sender=Reservation, dispatch_uid='sync_calendar')
+
+
+# Service revenue: a reservation service keeps its service type's price when ordered
+def price_service(sender, instance, **kwargs):
+    record_service_prices([instance])
+
+
+pre_save.connect(price_service, sender=ReservationService, dispatch_uid='price_service')
+
+
+# Rating aggregates: an edit moves the old rating out and the new one in. The
+# aggregates change through update(), so their version tokens are bumped here.
+# Inside a transaction (ReviewViewSet, the admin) the old rating is read with the
+# row locked, so concurrent edits of one review each move out the rating they replace.
+def remember_rating(sender, instance, using=None, **kwargs):
+    instance._rated = None
+    if instance.pk is not None:
+        rated = Review.objects.using(using).filter(pk=instance.pk)
+        if transaction.get_connection(using).in_atomic_block:
+            rated = rated.select_for_update()
+        instance._rated = rated.values_list('reservation_id', 'rating').first()
+
+
+def bump_ratings():
+    bump_version(RoomRating)
+    bump_version(RoomTypeRating)
+
+
+def count_rating(sender, instance, **kwargs):
+    rated = (instance.reservation_id_id, instance.rating)
+    if instance._rated != rated:
+        if instance._rated is not None:
+            apply_rating(*instance._rated, -1)
+        apply_rating(*rated, 1)
+        bump_ratings()
+
+
+def uncount_rating(sender, instance, **kwargs):
+    apply_rating(instance.reservation_id_id, instance.rating, -1)
+    bump_ratings()
+
+
+pre_save.connect(remember_rating, sender=Review, dispatch_uid='remember_rating')
+post_save.connect(count_rating, sender=Review, dispatch_uid='count_rating')
+post_delete.connect(uncount_rating, sender=Review, dispatch_uid='uncount_rating')
+
+
+# Guest emails go through the task queue (see core.tasks): confirmations for new
+# bookings, receipts when a payment becomes completed. Bulk creates bypass these
+# signals and queue their confirmations themselves.
+def confirm_reservation(sender, instance, created, **kwargs):
+    if created and instance.status in Reservation.ACTIVE_STATUSES:
+        send_reservation_confirmation.enqueue(reservation_id=instance.pk)
+
+
+def remember_payment_status(sender, instance, **kwargs):
+    instance._paid = instance.pk is not None and Payment.objects.filter(pk=instance.pk, status='completed').exists()
+
+
+def send_receipt(sender, instance, **kwargs):
+    if instance.status == 'completed' and not instance._paid:
+        send_payment_receipt.enqueue(payment_id=instance.pk)
+
+
+post_save.connect(confirm_reservation, sender=Reservation, dispatch_uid='confirm_reservation')
+pre_save.connect(remember_payment_status, sender=Payment, dispatch_uid='remember_payment_status')
+post_save.connect(send_receipt, sender=Payment, dispatch_uid='send_receipt')
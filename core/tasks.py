@@ -0,0 +1,226 @@
+import logging
+import time
+import traceback
+from collections import namedtuple
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+from . import metrics
+from .auth import prune_tokens
+from .models import Payment, Reservation, Task
+from .reports import period_start, revenue_report
+
+logger = logging.getLogger(__name__)
+
+# Database-backed task queue for work that should not sit in the request path.
+# Tasks are plain functions registered with @task and queued with
+# ``fn.enqueue(**payload)`` (JSON payloads: pass ids, not instances). Workers
+# (``manage.py run_worker``) claim due rows with SELECT ... FOR UPDATE SKIP LOCKED,
+# so any number of them can share the table; each task runs in its own transaction
+# and is retried with exponential backoff until ``max_attempts``. Tasks declared
+# with ``every=`` are queued again by the workers one interval after their last run.
+
+Spec = namedtuple('Spec', 'function max_attempts retry_delay every')
+_registry = {}
+
+metrics.register_counter('tasks_succeeded', "Background tasks that completed")
+metrics.register_counter('tasks_retried', "Background task attempts that failed and were rescheduled")
+metrics.register_counter('tasks_failed', "Background tasks that failed on their last attempt")
+metrics.register_counter('task_wait_us', "Time due tasks waited for a worker, in microseconds")
+metrics.register_counter('task_run_us', "Time spent running tasks, in microseconds")
+
+
+def _count(**values):
+    # The web processes serve the counters (/metrics), they only see the worker's
+    # in a shared cache
+    if settings.SHARED_CACHE:
+        metrics.incr_many(values)
+
+
+def task(name=None, *, max_attempts=3, retry_delay=30, every=None):
+    """Register a task; ``retry_delay`` (seconds) doubles with each failed attempt."""
+    def register(function):
+        task_name = name or function.__name__
+        _registry[task_name] = Spec(function, max_attempts, retry_delay, every)
+        function.enqueue = lambda run_at=None, **payload: enqueue(task_name, payload, run_at=run_at)
+        return function
+    return register
+
+
+def enqueue(name, payload=None, *, run_at=None):
+    """Queue ``name``; the row commits or rolls back with the caller's transaction."""
+    return Task.objects.create(
+        name=name, payload=payload or {}, max_attempts=_registry[name].max_attempts,
+        run_at=run_at or timezone.now(),
+    )
+
+
+def enqueue_many(name, payloads):
+    now = timezone.now()
+    return Task.objects.bulk_create([
+        Task(name=name, payload=payload, max_attempts=_registry[name].max_attempts, run_at=now)
+        for payload in payloads
+    ])
+
+
+def claim(batch_size=10, now=None):
+    """Mark up to ``batch_size`` due tasks as running and return them."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        tasks = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', run_at__lte=now)
+            .order_by('run_at')[:batch_size]
+        )
+        Task.objects.filter(pk__in=[claimed.pk for claimed in tasks]).update(
+            status='running', attempts=F('attempts') + 1, started_at=now,
+        )
+    for claimed in tasks:
+        claimed.status, claimed.attempts, claimed.started_at = 'running', claimed.attempts + 1, now
+    _count(task_wait_us=sum(round((now - claimed.run_at).total_seconds() * 1e6) for claimed in tasks))
+    return tasks
+
+
+def run(claimed):
+    """Run one claimed task and record the outcome."""
+    spec = _registry.get(claimed.name)
+    started = time.perf_counter()
+    try:
+        if spec is None:
+            raise LookupError(f"Unknown task {claimed.name!r}")
+        with transaction.atomic():
+            spec.function(**claimed.payload)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if spec is not None and claimed.attempts < claimed.max_attempts:
+            delay = timedelta(seconds=spec.retry_delay * 2 ** (claimed.attempts - 1))
+            Task.objects.filter(pk=claimed.pk).update(status='queued', run_at=now + delay, last_error=error)
+            _count(tasks_retried=1)
+            logger.warning("Task %s failed (attempt %s of %s), retrying in %s",
+                           claimed, claimed.attempts, claimed.max_attempts, delay)
+        else:
+            Task.objects.filter(pk=claimed.pk).update(status='failed', finished_at=now, last_error=error)
+            _count(tasks_failed=1)
+            logger.error("Task %s failed on its last attempt:\n%s", claimed, error)
+    else:
+        Task.objects.filter(pk=claimed.pk).update(status='done', finished_at=timezone.now())
+        _count(tasks_succeeded=1)
+    _count(task_run_us=round((time.perf_counter() - started) * 1e6))
+
+
+def run_pending(batch_size=10, now=None):
+    """Run due tasks until none are left; returns how many ran."""
+    count = 0
+    while tasks := claim(batch_size, now):
+        for claimed in tasks:
+            run(claimed)
+        count += len(tasks)
+    return count
+
+
+def requeue_stale(now=None):
+    """Queue again tasks whose worker died mid-run (running longer than TASK_TIMEOUT)."""
+    now = now or timezone.now()
+    stale = Task.objects.filter(status='running', started_at__lt=now - timedelta(seconds=settings.TASK_TIMEOUT))
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', finished_at=now, last_error='Abandoned by its worker',
+    )
+    return stale.update(status='queued', run_at=now) + failed
+
+
+def schedule_periodic(now=None):
+    """Queue the next run of every ``every=`` task that has none queued or running.
+
+    Two workers doing this at the same moment may both queue a run, so periodic
+    tasks must be safe to run twice.
+    """
+    now = now or timezone.now()
+    periodic = {name: spec for name, spec in _registry.items() if spec.every is not None}
+    pending = set(Task.objects.filter(name__in=periodic, status__in=('queued', 'running')).values_list('name', flat=True))
+    scheduled = []
+    for name, spec in periodic.items():
+        if name in pending:
+            continue
+        last = Task.objects.filter(name=name).order_by('-run_at').values_list('run_at', flat=True).first()
+        scheduled.append(enqueue(name, run_at=max(now, last + spec.every) if last else now))
+    return scheduled
+
+
+QUEUE_GAUGES = (
+    ('queued', "Tasks waiting to run, including retries scheduled for later"),
+    ('due', "Queued tasks whose run time has passed"),
+    ('running', "Tasks claimed by a worker"),
+    ('failed', "Tasks that failed on their last attempt"),
+    ('oldest_due_seconds', "How long the oldest due task has been waiting"),
+)
+
+
+def queue_stats(now=None):
+    """Queue depth and the age of the oldest due task, for monitoring."""
+    now = now or timezone.now()
+    stats = Task.objects.aggregate(
+        queued=Count('pk', filter=Q(status='queued')),
+        due=Count('pk', filter=Q(status='queued', run_at__lte=now)),
+        running=Count('pk', filter=Q(status='running')),
+        failed=Count('pk', filter=Q(status='failed')),
+        oldest_due=Min('run_at', filter=Q(status='queued', run_at__lte=now)),
+    )
+    oldest_due = stats.pop('oldest_due')
+    stats['oldest_due_seconds'] = round((now - oldest_due).total_seconds(), 3) if oldest_due else 0
+    return stats
+
+
+# Tasks
+
+@task(retry_delay=60)
+def send_reservation_confirmation(reservation_id):
+    reservation = Reservation.objects.select_related('user_id', 'room_id__type_id').filter(pk=reservation_id).first()
+    if reservation is None or not reservation.user_id.email:
+        return
+    send_mail(
+        f"Your reservation #{reservation.pk}",
+        f"{reservation.room_id.type_id.name}, room {reservation.room_id.number}: "
+        f"{reservation.check_in:%d %b %Y} to {reservation.check_out:%d %b %Y} ({reservation.get_status_display()}).",
+        None, [reservation.user_id.email],
+    )
+
+
+@task(retry_delay=60)
+def send_payment_receipt(payment_id):
+    payment = Payment.objects.select_related('reservation_id__user_id').filter(pk=payment_id).first()
+    if payment is None or payment.status != 'completed' or not payment.reservation_id.user_id.email:
+        return
+    send_mail(
+        f"Receipt for payment #{payment.pk}",
+        f"We received {payment.amount} by {payment.get_method_display()} for reservation "
+        f"#{payment.reservation_id_id}" + (f" (transaction {payment.transaction_id})." if payment.transaction_id else "."),
+        None, [payment.reservation_id.user_id.email],
+    )
+
+
+@task(every=timedelta(days=1))
+def prune_expired_tokens():
+    prune_tokens()
+
+
+@task(every=timedelta(days=1))
+def prune_finished_tasks():
+    Task.objects.filter(
+        status='done', finished_at__lt=timezone.now() - timedelta(days=settings.TASK_RETENTION_DAYS),
+    ).delete()
+
+
+@task(every=timedelta(hours=6))
+def refresh_reports():
+    # Caches the periods that settled since the last run, so reports over the past
+    # year by month or the past month by day only query the recent periods. A
+    # local-memory cache would keep them from the web processes.
+    if not settings.SHARED_CACHE:
+        return
+    today = date.today()
+    revenue_report(period_start(today - timedelta(days=365), 'month'), today + timedelta(days=1), 'month')
+    revenue_report(today - timedelta(days=31), today + timedelta(days=1), 'day')
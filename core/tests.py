@@ -1,3 +1,1311 @@
-from django.test import TestCase
+import json
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from hcx_resort.urls import schema_view
+from knox.models import AuthToken
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from .models import *
+from . import fastpath, metrics, queryplans, schema, tasks
+from .archive import archive_history
+from .auth import prune_tokens
+from .benchmarks import seed_catalog, seed_payments, seed_reservations, seed_reviews, seed_users
+from .checks import check_replica_cache
+from .middleware import QueryBudgetExceeded
+from .renderers import FastJSONParser, FastJSONRenderer
+from .occupancy import rebuild_nights
+from .pagination import CursorPagination
+from .ratings import apply_rating, rebuild_ratings
+from .reports import revenue_report
+from .views import RoomTypeViewSet
 
-# Create your tests here.
+
+class AvailabilityTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='guest', password='secret')
+        cls.suite = RoomType.objects.create(name='Suite', price_per_night=300, max_occupancy=4)
+        cls.single = RoomType.objects.create(name='Single', price_per_night=80, max_occupancy=1)
+        cls.room_101 = Room.objects.create(number='101', type_id=cls.suite)
+        cls.room_102 = Room.objects.create(number='102', type_id=cls.suite)
+        cls.room_201 = Room.objects.create(number='201', type_id=cls.single)
+        cls.start = date.today() + timedelta(days=10)
+        Reservation.objects.create(
+            user_id=cls.user, room_id=cls.room_101, status='confirmed',
+            check_in=cls.start, check_out=cls.start + timedelta(days=3),
+        )
+        Reservation.objects.create(
+            user_id=cls.user, room_id=cls.room_102, status='cancelled',
+            check_in=cls.start, check_out=cls.start + timedelta(days=3),
+        )
+
+    def search(self, **params):
+        return self.client.get('/api/rooms/availability/', params)
+
+    def test_excludes_overlapping_active_reservations(self):
+        response = self.search(check_in=self.start + timedelta(days=1), check_out=self.start + timedelta(days=2))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([room['number'] for room in response.data['results']], ['102', '201'])
+
+    def test_back_to_back_stay_is_available(self):
+        response = self.search(check_in=self.start + timedelta(days=3), check_out=self.start + timedelta(days=5))
+        self.assertIn('101', [room['number'] for room in response.data['results']])
+
+    def test_filters_by_occupancy_and_room_type(self):
+        response = self.search(check_in=self.start, check_out=self.start + timedelta(days=1), occupancy=2)
+        self.assertEqual([room['number'] for room in response.data['results']], ['102'])
+        response = self.search(check_in=self.start, check_out=self.start + timedelta(days=1), room_type=self.single.id)
+        self.assertEqual([room['number'] for room in response.data['results']], ['201'])
+
+    def test_rejects_inverted_range(self):
+        response = self.search(check_in=self.start, check_out=self.start)
+        self.assertEqual(response.status_code, 400)
+
+
+class QueryCountTests(APITestCase):
+    """List endpoints must cost the same number of queries for one row or many."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', password='secret', is_staff=True)
+        UserProfile.objects.create(user=cls.staff)
+        cls.room_type = RoomType.objects.create(name='Double', price_per_night=120, max_occupancy=2)
+        cls.service_type = ServiceType.objects.create(name='Spa', price=40)
+
+    def setUp(self):
+        self.client.force_authenticate(self.staff)
+        self.sequence = 0
+
+    def add_row(self):
+        self.sequence += 1
+        n = self.sequence
+        guest = User.objects.create_user(username=f'guest{n}')
+        UserProfile.objects.create(user=guest)
+        room = Room.objects.create(number=str(n), type_id=self.room_type)
+        service = Service.objects.create(name=f'Massage {n}', service_type_id=self.service_type)
+        reservation = Reservation.objects.create(
+            user_id=guest, room_id=room, check_in=date(2025, 1, n), check_out=date(2025, 1, n + 1),
+        )
+        ReservationService.objects.create(reservation_id=reservation, service_id=service)
+        Payment.objects.create(reservation_id=reservation, amount=120, method='cash')
+        Review.objects.create(user_id=guest, reservation_id=reservation, rating=5)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_list_query_count_is_constant(self):
+        reservation_tree = 'reservation_id.user_id,reservation_id.room_id.type_id'
+        urls = [
+            '/api/users/', '/api/rooms/', '/api/services/', '/api/reservations/',
+            '/api/reservation-services/', '/api/payments/', '/api/reviews/',
+            '/api/rooms/?expand=type_id',
+            '/api/services/?expand=service_type_id',
+            '/api/reservations/?expand=user_id,room_id.type_id',
+            f'/api/reservation-services/?expand={reservation_tree},service_id.service_type_id',
+            f'/api/payments/?expand={reservation_tree}',
+            f'/api/reviews/?expand=user_id,{reservation_tree}',
+        ]
+        self.add_row()
+        baseline = {url: self.count_queries(url) for url in urls}
+        for _ in range(4):
+            self.add_row()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), baseline[url])
+
+
+class PaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='guest', password='secret')
+        room_type = RoomType.objects.create(name='Double', price_per_night=120, max_occupancy=2)
+        for n in range(5):
+            room = Room.objects.create(number=str(n), type_id=room_type)
+            Reservation.objects.create(
+                user_id=cls.user, room_id=room, check_in=date(2025, 1, 1), check_out=date(2025, 1, 2),
+            )
+
+    def test_reservations_use_cursor_pages(self):
+        self.client.force_authenticate(self.user)
+        seen = []
+        url = '/api/reservations/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertNotIn('count', response.data)
+            seen += [reservation['id'] for reservation in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, sorted(seen, reverse=True))
+        self.assertEqual(len(seen), 5)
+
+    def test_catalog_uses_page_numbers(self):
+        response = self.client.get('/api/rooms/', {'page': 2, 'page_size': 2})
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual([room['number'] for room in response.data['results']], ['2', '3'])
+
+
+class SparseFieldsetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='guest', password='secret')
+        UserProfile.objects.create(user=cls.user, phone='555-0100')
+        room_type = RoomType.objects.create(name='Double', price_per_night=120, max_occupancy=2)
+        room = Room.objects.create(number='101', type_id=room_type)
+        reservation = Reservation.objects.create(
+            user_id=cls.user, room_id=room, check_in=date(2025, 1, 1), check_out=date(2025, 1, 2),
+        )
+        cls.payment = Payment.objects.create(reservation_id=reservation, amount=120, method='cash')
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_relations_default_to_primary_keys(self):
+        payment = self.client.get('/api/payments/').data['results'][0]
+        self.assertEqual(payment['reservation_id'], self.payment.reservation_id.id)
+
+    def test_fields_limits_top_level_fields(self):
+        payment = self.client.get('/api/payments/', {'fields': 'id,amount'}).data['results'][0]
+        self.assertEqual(set(payment), {'id', 'amount'})
+
+    def test_expand_renders_nested_relations(self):
+        payment = self.client.get('/api/payments/', {'expand': 'reservation_id.room_id.type_id'}).data['results'][0]
+        room = payment['reservation_id']['room_id']
+        self.assertEqual(room['type_id']['name'], 'Double')
+        self.assertEqual(payment['reservation_id']['user_id'], self.user.id)
+
+    def test_unexpanded_relations_are_not_joined(self):
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/api/payments/', {'fields': 'id,amount'})
+        self.assertFalse(any('core_room' in query['sql'] for query in context.captured_queries))
+
+    def test_fields_and_expand_do_not_apply_to_writes(self):
+        room = Room.objects.get(number='101')
+        for params in ('fields=id', 'expand=room_id'):
+            with self.subTest(params=params):
+                offset = 10 if params.startswith('fields') else 20
+                response = self.client.post(f'/api/reservations/?{params}', {
+                    'room_id': room.id, 'check_in': date(2030, 1, offset), 'check_out': date(2030, 1, offset + 2),
+                }, format='json')
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(response.data['room_id'], room.id)
+
+
+class OwnershipTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = User.objects.create_user(username='guest')
+        cls.other = User.objects.create_user(username='other')
+        room_type = RoomType.objects.create(name='Double', price_per_night=120, max_occupancy=2)
+        room = Room.objects.create(number='101', type_id=room_type)
+        cls.own = Reservation.objects.create(user_id=cls.guest, room_id=room, check_in=date(2025, 1, 1),
+                                             check_out=date(2025, 1, 3), status='checked_out')
+        cls.others = Reservation.objects.create(user_id=cls.other, room_id=room, check_in=date(2025, 2, 1),
+                                                check_out=date(2025, 2, 3), status='checked_out')
+        cls.service = Service.objects.create(name='Massage', service_type_id=ServiceType.objects.create(name='Spa', price=40))
+        cls.others_service = ReservationService.objects.create(reservation_id=cls.others, service_id=cls.service, quantity=1)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.guest)
+
+    def test_guests_cannot_pay_for_other_reservations(self):
+        response = self.client.post('/api/payments/', {
+            'reservation_id': self.others.id, 'amount': 240, 'method': 'cash', 'status': 'completed',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('reservation_id', response.data)
+        self.assertFalse(Payment.objects.exists())
+        self.assertFalse(Task.objects.filter(name='send_payment_receipt').exists())
+
+    def test_guests_review_only_their_own_stays_as_themselves(self):
+        response = self.client.post('/api/reviews/', {'reservation_id': self.others.id, 'rating': 1}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(RoomRating.objects.exists())
+        response = self.client.post('/api/reviews/', {
+            'reservation_id': self.own.id, 'user_id': self.other.id, 'rating': 5,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Review.objects.get().user_id, self.guest)
+
+    def test_guests_see_and_add_services_of_their_own_reservations_only(self):
+        response = self.client.post('/api/reservation-services/', {
+            'reservation_id': self.others.id, 'service_id': self.service.id, 'quantity': 3,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/reservation-services/').data['results'], [])
+        self.assertEqual(self.client.get(f'/api/reservation-services/{self.others_service.id}/').status_code, 404)
+        self.assertEqual(self.client.patch(
+            f'/api/reservation-services/{self.others_service.id}/', {'quantity': 9}, format='json',
+        ).status_code, 404)
+        self.assertEqual(ReservationService.objects.get().quantity, 1)
+
+    def test_staff_may_use_any_reservation(self):
+        self.client.force_authenticate(User.objects.create_user(username='manager', is_staff=True))
+        response = self.client.post('/api/reviews/', {'reservation_id': self.others.id, 'rating': 4}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Review.objects.get().user_id, self.other)
+
+
+@override_settings(SHARED_CACHE=True)
+class CatalogCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.room_type = RoomType.objects.create(name='Double', price_per_night=120, max_occupancy=2)
+        Room.objects.create(number='101', type_id=cls.room_type)
+
+    def setUp(self):
+        cache.clear()
+        caches['metrics'].clear()
+
+    def test_repeated_list_is_served_from_cache(self):
+        self.client.get('/api/rooms/', {'expand': 'type_id'})
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/rooms/', {'expand': 'type_id'})
+        self.assertEqual(response.data['results'][0]['type_id']['name'], 'Double')
+        self.assertEqual(metrics.snapshot()['catalog_cache_hits'], 1)
+
+    def test_related_model_write_invalidates(self):
+        self.client.get('/api/rooms/', {'expand': 'type_id'})
+        self.room_type.name = 'Deluxe double'
+        self.room_type.save()
+        response = self.client.get('/api/rooms/', {'expand': 'type_id'})
+        self.assertEqual(response.data['results'][0]['type_id']['name'], 'Deluxe double')
+
+    @override_settings(SHARED_CACHE=False)
+    def test_nothing_is_cached_without_a_shared_cache(self):
+        self.client.get('/api/rooms/')
+        with self.assertNumQueries(2):
+            self.client.get('/api/rooms/')
+        self.assertEqual(metrics.snapshot()['catalog_cache_hits'], 0)
+
+    def test_metrics_are_admin_only(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 401)
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_authenticate(staff)
+        self.assertIn('catalog_cache_misses', self.client.get('/api/metrics/').data)
+
+
+class ConditionalGetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='guest', password='secret')
+        room_type = RoomType.objects.create(name='Double', price_per_night=120, max_occupancy=2)
+        cls.room = Room.objects.create(number='101', type_id=room_type)
+        cls.reservation = Reservation.objects.create(
+            user_id=cls.user, room_id=cls.room, check_in=date(2025, 1, 1), check_out=date(2025, 1, 2),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def test_unchanged_list_returns_304(self):
+        etag = self.client.get('/api/reservations/')['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/reservations/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_write_changes_list_etag(self):
+        etag = self.client.get('/api/reservations/')['ETag']
+        self.reservation.status = 'confirmed'
+        self.reservation.save()
+        response = self.client.get('/api/reservations/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_unfiltered_list_reads_the_rows(self):
+        self.client.force_authenticate(User.objects.create_user(username='manager', is_staff=True))
+        etag = self.client.get('/api/reservations/')['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/reservations/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # A write that sends no signals (and bumps no version) still changes the ETag
+        Reservation.objects.filter(pk=self.reservation.pk).update(status='confirmed', updated_at=timezone.now())
+        self.assertEqual(self.client.get('/api/reservations/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_retrieve_honours_if_modified_since(self):
+        response = self.client.get(f'/api/reservations/{self.reservation.id}/')
+        response = self.client.get(
+            f'/api/reservations/{self.reservation.id}/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_version_counter_for_models_without_timestamps(self):
+        etag = self.client.get(f'/api/rooms/{self.room.id}/')['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(f'/api/rooms/{self.room.id}/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.room.status = 'cleaning'
+        self.room.save()
+        self.assertEqual(self.client.get(f'/api/rooms/{self.room.id}/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_no_version_counter_validators_without_a_shared_cache(self):
+        self.assertNotIn('ETag', self.client.get(f'/api/rooms/{self.room.id}/'))
+        self.assertNotIn('ETag', self.client.get('/api/reservations/', {'expand': 'room_id'}))
+        # Validators computed from the rows alone are still sent
+        self.assertIn('ETag', self.client.get('/api/reservations/'))
+
+
+class BookingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='guest', password='secret')
+        cls.room_type = RoomType.objects.create(name='Double', price_per_night=120, max_occupancy=2)
+        cls.room = Room.objects.create(number='101', type_id=cls.room_type)
+        cls.start = date.today() + timedelta(days=10)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def reserve(self, room, offset, nights):
+        return self.client.post('/api/reservations/', {
+            'room_id': room.id,
+            'check_in': self.start + timedelta(days=offset),
+            'check_out': self.start + timedelta(days=offset + nights),
+        })
+
+    def test_overlapping_booking_is_rejected(self):
+        self.assertEqual(self.reserve(self.room, 0, 3).status_code, 201)
+        self.assertEqual(self.reserve(self.room, 2, 2).status_code, 409)
+        self.assertEqual(self.reserve(self.room, 3, 2).status_code, 201)
+
+    def test_guest_books_for_themselves(self):
+        other = User.objects.create_user(username='other')
+        response = self.client.post('/api/reservations/', {
+            'user_id': other.id, 'room_id': self.room.id,
+            'check_in': self.start, 'check_out': self.start + timedelta(days=1),
+        })
+        self.assertEqual(response.data['user_id'], self.user.id)
+
+    def test_moving_onto_a_booked_night_is_rejected(self):
+        first = self.reserve(self.room, 0, 2).data
+        second = self.reserve(self.room, 5, 2).data
+        response = self.client.patch(f"/api/reservations/{second['id']}/", {'check_in': self.start + timedelta(days=1)})
+        self.assertEqual(response.status_code, 409)
+        self.client.patch(f"/api/reservations/{first['id']}/", {'status': 'cancelled'})
+        response = self.client.patch(f"/api/reservations/{second['id']}/", {'check_in': self.start + timedelta(days=1)})
+        self.assertEqual(response.status_code, 200)
+
+    def test_book_by_room_type_picks_a_free_room(self):
+        second_room = Room.objects.create(number='102', type_id=self.room_type)
+        self.reserve(self.room, 0, 2)
+        payload = {'room_type': self.room_type.id, 'check_in': self.start, 'check_out': self.start + timedelta(days=2)}
+        response = self.client.post('/api/reservations/book/', payload)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['room_id'], second_room.id)
+        self.assertEqual(self.client.post('/api/reservations/book/', payload).status_code, 409)
+
+    def test_overlap_outside_the_booking_engine_violates_the_constraint(self):
+        self.reserve(self.room, 0, 3)
+        overlapping = {'user_id': self.user, 'room_id': self.room, 'check_out': self.start + timedelta(days=4)}
+        with self.assertRaisesMessage(IntegrityError, 'reservation_no_overlap'), transaction.atomic():
+            Reservation.objects.create(check_in=self.start + timedelta(days=2), **overlapping)
+        Reservation.objects.create(check_in=self.start + timedelta(days=2), status='cancelled', **overlapping)
+
+
+@override_settings(SHARED_CACHE=True)
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='guest', password='secret')
+        _, token = AuthToken.objects.create(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+    def test_repeated_requests_skip_token_lookup(self):
+        self.client.get('/api/users/')
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get('/api/users/').status_code, 200)
+        self.assertFalse(any('knox_authtoken' in query['sql'] for query in context.captured_queries))
+
+    def test_logout_invalidates_cached_token(self):
+        self.client.get('/api/users/')
+        self.assertEqual(self.client.post('/api/logout/').status_code, 204)
+        self.assertEqual(self.client.get('/api/users/').status_code, 401)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_tokens_are_not_cached_without_a_shared_cache(self):
+        self.client.get('/api/users/')
+        # Logout handled by another process, whose cache this one does not see
+        with mock.patch('core.signals.forget_tokens'):
+            AuthToken.objects.filter(user=self.user).delete()
+        self.assertEqual(self.client.get('/api/users/').status_code, 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.client.get('/api/users/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/users/').status_code, 401)
+
+    def test_prune_removes_expired_and_inactive_tokens(self):
+        AuthToken.objects.create(self.user, expiry=timedelta(seconds=-1))
+        inactive = User.objects.create_user(username='gone', is_active=False)
+        AuthToken.objects.create(inactive)
+        self.assertEqual(prune_tokens(batch_size=1), 2)
+        self.assertEqual(AuthToken.objects.count(), 1)
+
+
+class ReplicaRoutingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='guest', password='secret')
+        room_type = RoomType.objects.create(name='Double', price_per_night=120, max_occupancy=2)
+        cls.room = Room.objects.create(number='101', type_id=room_type)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+        # Route "replica" reads to the test database and record when one is picked
+        patcher = mock.patch('core.db.replica_aliases', return_value=['default'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        chooser = mock.patch('core.db.random.choice', side_effect=lambda aliases: aliases[0])
+        self.replica_choice = chooser.start()
+        self.addCleanup(chooser.stop)
+
+    def test_safe_list_reads_from_replica(self):
+        self.client.get('/api/reservations/')
+        self.assertTrue(self.replica_choice.called)
+
+    @mock.patch('core.checks.replica_aliases', return_value=['replica_1'])
+    def test_replicas_require_a_shared_cache(self, replica_aliases):
+        with override_settings(SHARED_CACHE=False):
+            self.assertEqual([error.id for error in check_replica_cache(None)], ['core.E001'])
+        with override_settings(SHARED_CACHE=True):
+            self.assertEqual(check_replica_cache(None), [])
+
+    def test_own_write_pins_reads_to_primary(self):
+        start = date.today() + timedelta(days=5)
+        self.client.post('/api/reservations/', {
+            'room_id': self.room.id, 'check_in': start, 'check_out': start + timedelta(days=1),
+        })
+        self.replica_choice.reset_mock()
+        self.assertEqual(len(self.client.get('/api/reservations/').data['results']), 1)
+        self.assertFalse(self.replica_choice.called)
+
+    def test_exports_read_from_replica(self):
+        self.client.force_authenticate(User.objects.create_user(username='finance', is_staff=True))
+        for path in ('/api/reservations/export/', '/api/payments/export/'):
+            with self.subTest(path):
+                self.replica_choice.reset_mock()
+                response = self.client.get(path)
+                b''.join(response.streaming_content)
+                self.assertTrue(self.replica_choice.called)
+
+    def test_recent_catalog_write_keeps_catalog_reads_on_primary(self):
+        self.room.status = 'cleaning'
+        self.room.save()
+        self.client.get('/api/rooms/')
+        self.assertFalse(self.replica_choice.called)
+
+
+class OccupancyCalendarTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        room_type = RoomType.objects.create(name='Double', price_per_night=120, max_occupancy=2)
+        cls.room = Room.objects.create(number='101', type_id=room_type)
+        cls.other_room = Room.objects.create(number='102', type_id=room_type)
+        cls.start = date.today() + timedelta(days=3)
+
+    def setUp(self):
+        self.reservation = Reservation.objects.create(
+            user_id=self.staff, room_id=self.room, status='confirmed',
+            check_in=self.start, check_out=self.start + timedelta(days=3),
+        )
+
+    def nights(self, reservation):
+        return sorted(RoomNight.objects.filter(reservation_id=reservation).values_list('room_id', 'date'))
+
+    def test_nights_follow_moves_and_cancellation(self):
+        self.assertEqual(len(self.nights(self.reservation)), 3)
+        self.reservation.room_id = self.other_room
+        self.reservation.check_out = self.start + timedelta(days=2)
+        self.reservation.save()
+        self.assertEqual(self.nights(self.reservation), [
+            (self.other_room.id, self.start), (self.other_room.id, self.start + timedelta(days=1)),
+        ])
+        self.reservation.status = 'cancelled'
+        self.reservation.save()
+        self.assertEqual(self.nights(self.reservation), [])
+
+    def test_checkout_frees_remaining_nights(self):
+        reservation = Reservation.objects.create(
+            user_id=self.staff, room_id=self.other_room, status='checked_in',
+            check_in=date.today() - timedelta(days=2), check_out=date.today() + timedelta(days=2),
+        )
+        reservation.status = 'checked_out'
+        reservation.save()
+        spent = [date.today() - timedelta(days=2), date.today() - timedelta(days=1)]
+        self.assertEqual([night for _, night in self.nights(reservation)], spent)
+        self.assertEqual(reservation.departed_on, date.today())
+        # Later saves and rebuilds keep the nights actually spent
+        with mock.patch('core.occupancy.date') as clock:
+            clock.today.return_value = date.today() + timedelta(days=30)
+            reservation.save()
+            rebuild_nights()
+        self.assertEqual([night for _, night in self.nights(reservation)], spent)
+
+    def test_calendar_grid(self):
+        self.assertEqual(self.client.get('/api/rooms/calendar/').status_code, 401)
+        self.client.force_authenticate(self.staff)
+        response = self.client.get('/api/rooms/calendar/', {'start': self.start, 'days': 2})
+        self.assertEqual(response.status_code, 200)
+        rooms = {room['number']: room for room in response.data['results']['rooms']}
+        self.assertEqual(set(rooms['101']['nights']), {self.start.isoformat(), (self.start + timedelta(days=1)).isoformat()})
+        self.assertEqual(rooms['102']['nights'], {})
+
+
+class QuoteTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='guest')
+        cls.double = RoomType.objects.create(name='Double', price_per_night=120, max_occupancy=2, has_breakfast=True)
+        cls.suite = RoomType.objects.create(name='Suite', price_per_night='300.50', max_occupancy=4)
+        spa = ServiceType.objects.create(name='Spa', price=40)
+        cls.massage = Service.objects.create(name='Massage', service_type_id=spa)
+        cls.room = Room.objects.create(number='101', type_id=cls.double)
+
+    def setUp(self):
+        cache.clear()
+
+    def quote(self, **payload):
+        payload = {'check_in': '2025-03-01', 'check_out': '2025-03-04', **payload}
+        return self.client.post('/api/quotes/', payload, format='json')
+
+    def test_batch_quote_for_every_room_type(self):
+        response = self.quote(services=[{'service': self.massage.id, 'quantity': 2}])
+        self.assertEqual(response.status_code, 200)
+        totals = {quote['room_type_name']: quote['total'] for quote in response.data}
+        self.assertEqual(totals, {'Double': '440.00', 'Suite': '981.50'})
+        self.assertTrue(response.data[0]['breakfast_included'])
+
+    @override_settings(SHARED_CACHE=True)
+    def test_quotes_are_memoized_until_prices_change(self):
+        self.quote(room_types=[self.double.id])
+        with self.assertNumQueries(1):  # room type validation only
+            self.quote(room_types=[self.double.id])
+        self.double.price_per_night = 150
+        self.double.save()
+        self.assertEqual(self.quote(room_types=[self.double.id]).data[0]['total'], '450.00')
+
+    @override_settings(SHARED_CACHE=False)
+    def test_quotes_are_computed_each_time_without_a_shared_cache(self):
+        self.quote(room_types=[self.double.id], services=[{'service': self.massage.id, 'quantity': 1}])
+        with self.assertNumQueries(3):  # room type and service validation, service prices
+            self.quote(room_types=[self.double.id], services=[{'service': self.massage.id, 'quantity': 1}])
+
+    def test_reservation_quote(self):
+        reservation = Reservation.objects.create(
+            user_id=self.user, room_id=self.room, check_in=date(2025, 3, 1), check_out=date(2025, 3, 3),
+        )
+        ReservationService.objects.create(reservation_id=reservation, service_id=self.massage, quantity=1)
+        self.client.force_authenticate(self.user)
+        response = self.client.get(f'/api/reservations/{reservation.id}/quote/')
+        self.assertEqual(response.data['total'], '280.00')
+
+    def test_reservation_quote_keeps_the_booked_rates(self):
+        reservation = Reservation.objects.create(
+            user_id=self.user, room_id=self.room, check_in=date(2025, 3, 1), check_out=date(2025, 3, 3),
+        )
+        ReservationService.objects.create(reservation_id=reservation, service_id=self.massage, quantity=1)
+        RoomType.objects.filter(pk=self.double.pk).update(price_per_night=200)
+        ServiceType.objects.filter(pk=self.massage.service_type_id_id).update(price=90)
+        self.client.force_authenticate(self.user)
+        response = self.client.get(f'/api/reservations/{reservation.id}/quote/')
+        self.assertEqual(response.data['price_per_night'], '120.00')
+        self.assertEqual(response.data['services'][0]['unit_price'], '40.00')
+        self.assertEqual(response.data['total'], '280.00')
+
+
+class BulkTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='guest')
+        cls.room_type = RoomType.objects.create(name='Double', price_per_night=120, max_occupancy=2)
+        cls.start = date.today() + timedelta(days=20)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def stay(self, room, offset=0, nights=2):
+        return {
+            'room_id': room['id'] if isinstance(room, dict) else room.id,
+            'check_in': str(self.start + timedelta(days=offset)),
+            'check_out': str(self.start + timedelta(days=offset + nights)),
+        }
+
+    def test_group_block_is_created_in_one_request(self):
+        rooms = self.client.post('/api/rooms/bulk/', [
+            {'number': str(100 + n), 'type_id': self.room_type.id} for n in range(20)
+        ], format='json').data
+        self.assertEqual(len(rooms), 20)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post('/api/reservations/bulk/', [self.stay(room) for room in rooms], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertLess(len(context.captured_queries), 15)
+        self.assertEqual(Reservation.objects.filter(user_id=self.user).count(), 20)
+        self.assertEqual(RoomNight.objects.count(), 40)
+
+    def test_invalid_item_rejects_whole_batch_with_per_item_errors(self):
+        room = Room.objects.create(number='101', type_id=self.room_type)
+        response = self.client.post('/api/reservations/bulk/', [
+            self.stay(room), {**self.stay(room, offset=5), 'room_id': 999},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0], {})
+        self.assertIn('room_id', response.data['errors'][1])
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_overlaps_within_the_batch_conflict(self):
+        room = Room.objects.create(number='101', type_id=self.room_type)
+        response = self.client.post('/api/reservations/bulk/', [
+            self.stay(room), self.stay(room, offset=1),
+        ], format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['errors'][0], {})
+        self.assertIn('non_field_errors', response.data['errors'][1])
+
+    def test_bulk_update(self):
+        room = Room.objects.create(number='101', type_id=self.room_type)
+        created = self.client.post('/api/reservations/bulk/', [self.stay(room), self.stay(room, offset=3)], format='json').data
+        response = self.client.patch('/api/reservations/bulk/', [
+            {'id': created[0]['id'], 'status': 'cancelled'},
+            {'id': created[1]['id'], 'check_in': str(self.start)},
+        ], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Reservation.objects.get(id=created[1]['id']).check_in, self.start)
+        self.assertEqual(RoomNight.objects.filter(reservation_id=created[0]['id']).count(), 0)
+
+    def test_bulk_writes_are_scoped_like_single_writes(self):
+        room = Room.objects.create(number='101', type_id=self.room_type)
+        other = User.objects.create_user(username='other')
+        theirs = Reservation.objects.create(user_id=other, room_id=room, check_in=self.start,
+                                            check_out=self.start + timedelta(days=2))
+        service = Service.objects.create(name='Massage', service_type_id=ServiceType.objects.create(name='Spa', price=40))
+        line = ReservationService.objects.create(reservation_id=theirs, service_id=service, quantity=1)
+        response = self.client.patch('/api/reservation-services/bulk/', [{'id': line.id, 'quantity': 9}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0], {'id': ['Not found.']})
+        response = self.client.post('/api/reservation-services/bulk/', [
+            {'reservation_id': theirs.id, 'service_id': service.id, 'quantity': 2},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('reservation_id', response.data['errors'][0])
+        self.assertEqual(list(ReservationService.objects.values_list('quantity', flat=True)), [1])
+
+    def test_bulk_services_record_their_price(self):
+        room = Room.objects.create(number='101', type_id=self.room_type)
+        reservation = Reservation.objects.create(user_id=self.user, room_id=room, check_in=self.start,
+                                                 check_out=self.start + timedelta(days=2))
+        service = Service.objects.create(name='Massage', service_type_id=ServiceType.objects.create(name='Spa', price=40))
+        response = self.client.post('/api/reservation-services/bulk/', [
+            {'reservation_id': reservation.id, 'service_id': service.id, 'quantity': 2},
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(ReservationService.objects.get().unit_price, 40)
+
+    def test_malformed_ids_are_item_errors(self):
+        room = Room.objects.create(number='101', type_id=self.room_type)
+        response = self.client.post('/api/reservations/bulk/', [
+            self.stay(room), {**self.stay(room, offset=5), 'room_id': 'abc'}, {**self.stay(room, offset=9), 'room_id': [1]},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][0], {})
+        self.assertIn('room_id', response.data['errors'][1])
+        self.assertIn('room_id', response.data['errors'][2])
+        created = self.client.post('/api/reservations/bulk/', [self.stay(room)], format='json').data
+        response = self.client.patch('/api/reservations/bulk/', [
+            {'id': created[0]['id'], 'status': 'cancelled'}, {'id': 'abc'}, {'id': {'pk': 1}},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['errors'][1:], [{'id': ['Not found.']}] * 2)
+
+
+class ExportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='finance', is_staff=True)
+        cls.guest = User.objects.create_user(username='guest')
+        room_type = RoomType.objects.create(name='Double', price_per_night=120, max_occupancy=2)
+        room = Room.objects.create(number='101', type_id=room_type)
+        start = date.today() + timedelta(days=5)
+        cls.reservations = [
+            Reservation.objects.create(user_id=cls.guest, room_id=room, check_in=start + timedelta(days=3 * n),
+                                       check_out=start + timedelta(days=3 * n + 2))
+            for n in range(3)
+        ]
+        Payment.objects.create(reservation_id=cls.reservations[0], amount='240.00', method='cash')
+        cls.staff_token = AuthToken.objects.create(cls.staff)[1]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_payments_csv_is_streamed_flat(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get('/api/payments/export/', HTTP_ACCEPT='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:4], ['id', 'reservation_id', 'user_id', 'username'])
+        self.assertIn('guest,101,240.00,cash', lines[1])
+
+    def test_reservations_ndjson(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get('/api/reservations/export/?output=ndjson')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows], [r.id for r in self.reservations])
+        self.assertEqual(rows[0]['room_type'], 'Double')
+        self.assertEqual(rows[0]['check_in'], str(self.reservations[0].check_in))
+
+    def test_export_is_admin_only(self):
+        self.client.force_authenticate(self.guest)
+        self.assertEqual(self.client.get('/api/payments/export/').status_code, 403)
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.client.get('/api/payments/export/?output=xml').status_code, 400)
+
+    async def test_asgi_export_streams_asynchronously(self):
+        await cache.aclear()
+        response = await self.async_client.get('/api/reservations/export/?output=ndjson',
+                                               headers={'Authorization': f'Token {self.staff_token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        rows = [json.loads(line) async for line in response.streaming_content]
+        self.assertEqual([row['id'] for row in rows], [r.id for r in self.reservations])
+
+
+class ReportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username='manager', is_staff=True)
+        guest = User.objects.create_user(username='guest')
+        double = RoomType.objects.create(name='Double', price_per_night=100, max_occupancy=2)
+        suite = RoomType.objects.create(name='Suite', price_per_night=200, max_occupancy=4)
+        first = Reservation.objects.create(user_id=guest, room_id=Room.objects.create(number='101', type_id=double),
+                                           check_in=date(2025, 1, 10), check_out=date(2025, 1, 13), status='checked_out')
+        Reservation.objects.create(user_id=guest, room_id=Room.objects.create(number='201', type_id=suite),
+                                   check_in=date(2025, 1, 30), check_out=date(2025, 2, 2), status='checked_out')
+        spa = Service.objects.create(name='Spa', service_type_id=ServiceType.objects.create(name='Wellness', price=50))
+        ReservationService.objects.create(reservation_id=first, service_id=spa, quantity=2)
+        ReservationService.objects.create(reservation_id=first, service_id=spa, scheduled_time='2025-02-01T09:00:00Z')
+        Payment.objects.create(reservation_id=first, amount=300, method='credit_card', status='completed',
+                               paid_at='2025-01-13T12:00:00Z')
+        Payment.objects.create(reservation_id=first, amount=100, method='cash', paid_at='2025-01-13T12:00:00Z')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.staff)
+
+    def test_monthly_kpis(self):
+        response = self.client.get('/api/reports/', {'start': '2025-01-01', 'end': '2025-03-01'})
+        self.assertEqual(response.status_code, 200)
+        january, february = response.data['periods']
+        self.assertEqual(january['room_nights_available'], 62)
+        self.assertEqual(january['room_nights_sold'], 5)
+        self.assertEqual(january['room_revenue'], '700.00')
+        self.assertEqual(january['adr'], '140.00')
+        self.assertEqual(january['revpar'], '11.29')
+        self.assertEqual(january['service_revenue'], '100.00')
+        self.assertEqual([row['room_type_name'] for row in january['by_room_type']], ['Suite', 'Double'])
+        self.assertEqual(january['payments_by_method'], [{'method': 'credit_card', 'amount': '300.00', 'count': 1}])
+        self.assertEqual(february['room_revenue'], '200.00')
+        self.assertEqual(february['service_revenue'], '50.00')
+        self.assertEqual(response.data['totals']['room_nights_sold'], 6)
+        self.assertEqual(response.data['totals']['adr'], '150.00')
+
+    def test_room_revenue_uses_the_booked_rate(self):
+        RoomType.objects.filter(name='Double').update(price_per_night=999)
+        rebuild_nights()
+        report = revenue_report(date(2025, 1, 1), date(2025, 2, 1))
+        self.assertEqual(report['totals']['room_revenue'], Decimal('700.00'))
+
+    def test_service_revenue_uses_the_price_when_ordered(self):
+        ServiceType.objects.filter(name='Wellness').update(price=999)
+        report = revenue_report(date(2025, 1, 1), date(2025, 3, 1))
+        self.assertEqual(report['totals']['service_revenue'], Decimal('150.00'))
+
+    def test_closed_periods_are_not_recomputed(self):
+        params = {'start': '2025-01-01', 'end': '2025-03-01', 'period': 'week'}
+        first = self.client.get('/api/reports/', params).data
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get('/api/reports/', params).data, first)
+
+    def test_recently_closed_periods_are_not_cached(self):
+        today = date.today()
+        reservation = Reservation.objects.first()
+        start = today - timedelta(days=3)
+        self.assertEqual(revenue_report(start, today, 'day')['totals']['collected'], 0)
+        Payment.objects.create(reservation_id=reservation, amount=80, method='cash', status='completed',
+                               paid_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(revenue_report(start, today, 'day')['totals']['collected'], 80)
+
+    def test_report_is_admin_only(self):
+        self.client.force_authenticate(User.objects.get(username='guest'))
+        self.assertEqual(self.client.get('/api/reports/', {'start': '2025-01-01', 'end': '2025-02-01'}).status_code, 403)
+
+
+class RatingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = User.objects.create_user(username='guest')
+        cls.double = RoomType.objects.create(name='Double', price_per_night=100, max_occupancy=2)
+        cls.suite = RoomType.objects.create(name='Suite', price_per_night=200, max_occupancy=4)
+        cls.room = Room.objects.create(number='101', type_id=cls.double)
+        cls.reservation = Reservation.objects.create(user_id=cls.guest, room_id=cls.room, check_in=date(2025, 1, 10),
+                                                     check_out=date(2025, 1, 12), status='checked_out')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.guest)
+
+    def review(self, rating):
+        response = self.client.post('/api/reviews/', {'reservation_id': self.reservation.id, 'user_id': self.guest.id,
+                                                      'rating': rating}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Review.objects.get(id=response.data['id'])
+
+    def test_aggregates_follow_create_edit_and_delete(self):
+        first, second = self.review(5), self.review(4)
+        rating = RoomTypeRating.objects.get(room_type=self.double)
+        self.assertEqual((rating.review_count, rating.rating_total, rating.stars_5, rating.stars_4), (2, 9, 1, 1))
+        self.client.patch(f'/api/reviews/{second.id}/', {'rating': 2}, format='json')
+        first.delete()
+        rating = RoomRating.objects.get(room=self.room)
+        self.assertEqual((rating.review_count, rating.rating_total, rating.stars_2, rating.stars_5), (1, 2, 1, 0))
+        self.assertEqual(rating.average_rating, 2)
+
+    def test_failed_edit_leaves_review_and_aggregates_alone(self):
+        review = self.review(5)
+
+        def move_out_then_fail(reservation_id, rating, sign):
+            if sign > 0:
+                raise DatabaseError('lost connection')
+            apply_rating(reservation_id, rating, sign)
+
+        with mock.patch('core.signals.apply_rating', move_out_then_fail), self.assertRaises(DatabaseError):
+            self.client.patch(f'/api/reviews/{review.id}/', {'rating': 2}, format='json')
+        review.refresh_from_db()
+        rating = RoomRating.objects.get(room=self.room)
+        self.assertEqual((review.rating, rating.review_count, rating.rating_total), (5, 1, 5))
+
+    def test_rating_is_validated(self):
+        response = self.client.post('/api/reviews/', {'reservation_id': self.reservation.id, 'rating': 6}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('rating', response.data)
+
+    def test_catalog_shows_and_sorts_by_rating(self):
+        self.assertIsNone(self.client.get(f'/api/room-types/{self.double.id}/').data['rating'])
+        self.review(4)
+        self.review(5)
+        response = self.client.get('/api/room-types/', {'ordering': '-average_rating'})
+        self.assertEqual([row['name'] for row in response.data['results']], ['Double', 'Suite'])
+        self.assertEqual(response.data['results'][0]['rating']['average_rating'], '4.50')
+        with self.assertNumQueries(2):
+            self.client.get('/api/room-types/', {'ordering': 'review_count'})
+
+    def test_rebuild(self):
+        self.review(3)
+        RoomTypeRating.objects.all().delete()
+        self.assertEqual(rebuild_ratings(), (1, 1))
+        self.assertEqual(RoomTypeRating.objects.get(room_type=self.double).stars_3, 1)
+
+
+class RequestMetricsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        RoomType.objects.create(name='Double', price_per_night=100, max_occupancy=2)
+
+    def setUp(self):
+        cache.clear()
+        caches['metrics'].clear()
+
+    @override_settings(REQUEST_METRICS_HEADERS=True)
+    def test_timing_headers(self):
+        response = self.client.get('/api/room-types/')
+        self.assertEqual(response['X-DB-Queries'], '2')
+        self.assertRegex(
+            response['Server-Timing'], r'^db;dur=[\d.]+, serialize;dur=[\d.]+, render;dur=[\d.]+, total;dur=[\d.]+$',
+        )
+
+    @override_settings(SHARED_CACHE=True, METRICS_TOKEN='scrape-secret')
+    def test_prometheus_endpoint(self):
+        self.client.get('/api/room-types/')
+        self.client.get('/api/room-types/')
+        body = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret').content.decode()
+        self.assertIn('hcx_requests_total{view="RoomTypeViewSet",action="list"} 2', body)
+        self.assertIn('hcx_request_duration_seconds_count{view="RoomTypeViewSet",action="list"} 2', body)
+        self.assertIn('hcx_catalog_cache_hits_total 1', body)
+        # Behind a proxy every request comes from the proxy's (local) address
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_one_counter_write_per_request(self):
+        with mock.patch('core.metrics.incr_many', wraps=metrics.incr_many) as incr_many:
+            self.client.get('/api/room-types/')
+        self.assertEqual(incr_many.call_count, 1)
+        self.assertGreater(metrics.request_snapshot(['RoomTypeViewSet.list'])['RoomTypeViewSet.list']['serialize_us'], 0)
+
+    def test_query_budget(self):
+        with mock.patch.object(RoomTypeViewSet, 'query_budget', {'list': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/api/room-types/')
+            with override_settings(QUERY_BUDGET_STRICT=False), self.assertLogs('core.middleware', 'WARNING'):
+                self.assertEqual(self.client.get('/api/room-types/?page=1').status_code, 200)
+        self.assertEqual(metrics.request_snapshot(['RoomTypeViewSet.list'])['RoomTypeViewSet.list']['over_budget'], 2)
+
+
+class FastPathTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = User.objects.create_user(username='guest', email='guest@example.com')
+        UserProfile.objects.create(user=cls.guest, phone='555')
+        suite = RoomType.objects.create(name='Suite', price_per_night='310.50', max_occupancy=4)
+        RoomType.objects.create(name='Single', price_per_night=80, max_occupancy=1)
+        room = Room.objects.create(number='101', type_id=suite)
+        Room.objects.create(number='102', type_id=suite, notes='Sea view  ')
+        reservation = Reservation.objects.create(user_id=cls.guest, room_id=room, check_in=date(2025, 1, 10),
+                                                 check_out=date(2025, 1, 12), status='checked_out')
+        Review.objects.create(user_id=cls.guest, reservation_id=reservation, rating=4)
+
+    def setUp(self):
+        self.client.force_authenticate(self.guest)
+
+    def test_values_rows_render_like_the_serializers(self):
+        urls = [
+            '/api/room-types/',
+            '/api/rooms/?expand=type_id',
+            '/api/rooms/?fields=id,number',
+            '/api/reservations/?expand=user_id,room_id.type_id',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                with mock.patch('core.fastpath._represent', wraps=fastpath._represent) as represent:
+                    fast = self.client.get(url).content
+                self.assertTrue(represent.called)
+                cache.clear()
+                with override_settings(FAST_LIST_SERIALIZATION=False):
+                    self.assertEqual(fast, self.client.get(url).content)
+
+    def test_renderer_matches_drf(self):
+        data = {'price': Decimal('9.90'), 'at': timezone.now(), 'day': date(2025, 1, 1), 'text': 'a b é',
+                'label': gettext_lazy('Room'), 'nested': [{'n': 1, 'none': None}], 'ratio': 0.1}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONParser().parse(BytesIO(b'{"a": [1, 2.5, "\\u00e9"]}')), {'a': [1, 2.5, 'é']})
+
+
+class AsyncViewTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = User.objects.create_user(username='guest', email='guest@example.com')
+        suite = RoomType.objects.create(name='Suite', price_per_night=300, max_occupancy=4)
+        room = Room.objects.create(number='101', type_id=suite)
+        Room.objects.create(number='102', type_id=suite)
+        Reservation.objects.create(user_id=cls.guest, room_id=room, check_in=date(2030, 1, 10),
+                                   check_out=date(2030, 1, 12), status='confirmed')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.guest)
+
+    def test_async_lists_match_sync_endpoints(self):
+        paths = [
+            'room-types/',
+            'rooms/?expand=type_id&page_size=1&page=2',
+            'rooms/availability/?check_in=2030-01-11&check_out=2030-01-13',
+            'reservations/?expand=room_id',
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                response = self.client.get(f'/api/async/{path}')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.content, self.client.get(f'/api/{path}').content.replace(b'/api/', b'/api/async/'))
+        self.assertEqual(self.client.get('/api/async/rooms/availability/?check_in=2030-01-13').status_code, 400)
+        self.assertEqual(self.client.get('/api/async/rooms/?page=9').status_code, 404)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/async/reservations/').status_code, 401)
+
+    def test_async_cursor_pages_match_sync_pages(self):
+        room = Room.objects.get(number='102')
+        for day in range(1, 5):
+            Reservation.objects.create(user_id=self.guest, room_id=room, check_in=date(2030, 2, day),
+                                       check_out=date(2030, 2, day + 1), status='confirmed')
+        sync_pages, url = [], '/api/reservations/?page_size=2'
+        while url:
+            sync_pages.append(self.client.get(url).data)
+            url = sync_pages[-1]['next']
+        async_pages, url = [], '/api/async/reservations/?page_size=2'
+        with mock.patch.object(CursorPagination, 'paginate_queryset', side_effect=AssertionError):
+            while url:
+                async_pages.append(self.client.get(url).json())
+                url = async_pages[-1]['next']
+            previous = self.client.get(async_pages[-1]['previous']).json()
+        self.assertEqual([page['results'] for page in async_pages], [page['results'] for page in sync_pages])
+        self.assertEqual(len(async_pages), 3)
+        self.assertEqual(previous['results'], async_pages[-2]['results'])
+
+    async def test_asgi_requests_are_measured(self):
+        await caches['metrics'].aclear()
+        response = await self.async_client.get('/api/async/rooms/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)['results']), 2)
+        stats = metrics.request_snapshot(['AsyncRoomListView.get'])['AsyncRoomListView.get']
+        self.assertEqual(stats['count'], 1)
+        self.assertEqual(stats['queries'], 2)
+
+
+class SchemaCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        schema._rendered.clear()
+        self.addCleanup(schema._rendered.clear)
+
+    def test_scoped_views_generate_without_a_request(self):
+        with self.assertNoLogs('drf_yasg', 'WARNING'):
+            generated = schema.generate_schema.__wrapped__(schema_view)
+        self.assertIn('/reservations/', generated['paths'])
+
+    def test_schema_is_rendered_once_per_code_version(self):
+        with override_settings(OPENAPI_SCHEMA_DIR='/nonexistent'), \
+                mock.patch('core.schema.render_schema', wraps=schema.render_schema) as render:
+            response = self.client.get('/swagger/?format=openapi')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('/rooms/', json.loads(response.content)['paths'])
+            schema._rendered.clear()
+            self.assertEqual(self.client.get('/swagger/?format=openapi').content, response.content)
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(response['ETag'], f'"{schema.code_version()}"')
+        self.assertEqual(self.client.get('/swagger/?format=openapi', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+
+class TaskTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = User.objects.create_user(username='guest', email='guest@example.com')
+        cls.room_type = RoomType.objects.create(name='Double', price_per_night=120, max_occupancy=2)
+        cls.room = Room.objects.create(number='101', type_id=cls.room_type)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.guest)
+
+    def book(self):
+        response = self.client.post('/api/reservations/book/', {
+            'room_type': self.room_type.pk, 'check_in': '2030-01-10', 'check_out': '2030-01-12',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def test_booking_confirmation_runs_off_the_request(self):
+        reservation_id = self.book()
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(tasks.queue_stats()['due'], 1)
+        self.assertEqual(tasks.run_pending(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['guest@example.com'])
+        self.assertIn(f'#{reservation_id}', mail.outbox[0].subject)
+        self.assertEqual(Task.objects.get().status, 'done')
+
+    def test_receipt_is_sent_once_when_payment_completes(self):
+        reservation = Reservation.objects.create(user_id=self.guest, room_id=self.room, check_in=date(2030, 1, 10),
+                                                 check_out=date(2030, 1, 12), status='checked_out')
+        payment = Payment.objects.create(reservation_id=reservation, amount=240, method='cash')
+        self.assertFalse(Task.objects.filter(name='send_payment_receipt').exists())
+        payment.status = 'completed'
+        payment.save()
+        payment.save()
+        tasks.run_pending()
+        self.assertEqual([message.subject for message in mail.outbox], [f'Receipt for payment #{payment.pk}'])
+
+    @override_settings(SHARED_CACHE=False)
+    def test_worker_runs_without_a_shared_cache(self):
+        caches['metrics'].clear()
+        self.book()
+        stderr = StringIO()
+        with mock.patch('core.tasks.revenue_report') as revenue_report:
+            call_command('run_worker', '--once', stdout=StringIO(), stderr=stderr)
+            tasks.refresh_reports()
+        self.assertIn('CACHE_URL', stderr.getvalue())
+        self.assertEqual(Task.objects.get(name='send_reservation_confirmation').status, 'done')
+        revenue_report.assert_not_called()
+        self.assertEqual(metrics.snapshot()['tasks_succeeded'], 0)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_worker_counts_tasks_in_a_shared_cache(self):
+        caches['metrics'].clear()
+        self.book()
+        call_command('run_worker', '--once', stdout=StringIO())
+        self.assertGreaterEqual(metrics.snapshot()['tasks_succeeded'], 1)
+
+    def test_failures_are_retried_with_backoff(self):
+        self.book()
+        now = timezone.now()
+        with mock.patch('core.tasks.send_mail', side_effect=ConnectionError('SMTP down')):
+            for attempt, delay in ((1, 60), (2, 120)):
+                with self.assertLogs('core.tasks', 'WARNING'):
+                    self.assertEqual(tasks.run_pending(now=now), 1)
+                queued = Task.objects.get()
+                self.assertEqual((queued.status, queued.attempts), ('queued', attempt))
+                self.assertAlmostEqual(queued.run_at, timezone.now() + timedelta(seconds=delay), delta=timedelta(seconds=5))
+                self.assertIn('SMTP down', queued.last_error)
+                now = queued.run_at
+            with self.assertLogs('core.tasks', 'ERROR'):
+                tasks.run_pending(now=now)
+        self.assertEqual(Task.objects.get().status, 'failed')
+        self.assertEqual(mail.outbox, [])
+
+    def test_periodic_tasks_are_scheduled_after_their_last_run(self):
+        now = timezone.now()
+        names = {scheduled.name for scheduled in tasks.schedule_periodic(now)}
+        self.assertEqual(names, {'prune_expired_tokens', 'prune_finished_tasks', 'refresh_reports'})
+        self.assertEqual(tasks.schedule_periodic(now), [])
+        self.assertEqual(tasks.run_pending(now=now), 3)
+        following = {scheduled.name: scheduled.run_at for scheduled in tasks.schedule_periodic(now)}
+        self.assertEqual(following['refresh_reports'], now + timedelta(hours=6))
+        self.assertEqual(following['prune_expired_tokens'], now + timedelta(days=1))
+
+
+class LeanMiddlewareTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='guest', password='secret')
+
+    def login(self):
+        response = self.client.post('/api/login/', {'username': 'guest', 'password': 'secret'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('token', response.data)
+        return response
+
+    def test_api_login_writes_no_session(self):
+        response = self.login()
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertNotIn('X-Frame-Options', response)
+        self.assertFalse(Session.objects.exists())
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+        response = self.client.post('/api/register/', {'username': 'new', 'email': 'new@example.com', 'password': 'secret'},
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(Session.objects.exists())
+
+    def test_full_stack_outside_the_api_and_when_enabled(self):
+        response = self.client.get('/admin/login/')
+        self.assertEqual(response['X-Frame-Options'], 'DENY')
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+        with override_settings(API_SESSIONS=True):
+            response = self.login()
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertEqual(Session.objects.count(), 1)
+
+
+class QueryPlanTests(APITestCase):
+    """Read endpoints must reach the tables that grow with history through indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        rooms = seed_catalog(room_types=3, rooms=20, label='plan')[1]
+        guests = seed_users(5, label='plan')
+        seed_reservations(rooms, guests, 300)
+        seed_payments('plan')
+        seed_reviews('plan')
+        archive_history(date.today() - timedelta(days=365))
+        spa = Service.objects.create(name='Spa', service_type_id=ServiceType.objects.create(name='Wellness', price=50))
+        for index, reservation in enumerate(Reservation.objects.order_by('pk')[:40]):
+            scheduled = timezone.now() - timedelta(days=index) if index % 2 else None
+            ReservationService.objects.create(reservation_id=reservation, service_id=spa, scheduled_time=scheduled)
+        cls.users = [guests[0], User.objects.create_user(username='manager', is_staff=True)]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_no_full_scans(self):
+        for user in self.users:
+            self.client.force_authenticate(user)
+            for path in queryplans.endpoints(date.today()):
+                with self.subTest(user=user.username, path=path), queryplans.seq_scans_discouraged():
+                    response, results = queryplans.endpoint_scans(self.client, path)
+                    forbidden = path.startswith('/api/reports/') and not user.is_staff
+                    self.assertEqual(response.status_code, 403 if forbidden else 200)
+                    for alias, sql, plan, scans in results:
+                        self.assertEqual(scans, [], '\n'.join([alias, sql, *plan]))
+
+    def test_full_scans_are_detected(self):
+        queryset = Payment.objects.filter(method='cash')
+        sql, params = queryset.query.sql_with_params()
+        self.assertEqual(queryplans.full_scans(queryplans.explain(sql, params)), ['core_payment'])
+
+
+class ArchiveTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.guest = User.objects.create_user(username='guest')
+        cls.other = User.objects.create_user(username='other')
+        cls.room = Room.objects.create(
+            number='101', type_id=RoomType.objects.create(name='Double', price_per_night=100, max_occupancy=2),
+        )
+        spa = Service.objects.create(name='Spa', service_type_id=ServiceType.objects.create(name='Wellness', price=50))
+        cls.old = Reservation.objects.create(user_id=cls.guest, room_id=cls.room, check_in=date(2022, 3, 1),
+                                             check_out=date(2022, 3, 4), status='checked_out')
+        ReservationService.objects.create(reservation_id=cls.old, service_id=spa, quantity=2)
+        Payment.objects.create(reservation_id=cls.old, amount=300, method='cash', status='completed',
+                               paid_at='2022-03-04T10:00:00Z')
+        Review.objects.create(user_id=cls.guest, reservation_id=cls.old, rating=4)
+        # Still holds its room on paper, so it stays live however old it is
+        cls.unsettled = Reservation.objects.create(user_id=cls.guest, room_id=cls.room, check_in=date(2022, 5, 1),
+                                                   check_out=date(2022, 5, 2), status='confirmed')
+        cls.recent = Reservation.objects.create(user_id=cls.guest, room_id=cls.room, check_in=date(2025, 3, 1),
+                                                check_out=date(2025, 3, 3), status='checked_out')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_moves_finished_stays_and_keeps_history(self):
+        report = revenue_report(date(2022, 3, 1), date(2022, 4, 1))
+        totals = archive_history(date(2024, 1, 1), batch_size=1)
+        self.assertEqual({model.__name__: count for model, count in totals.items()},
+                         {'Reservation': 1, 'ReservationService': 1, 'Payment': 1, 'Review': 1})
+        self.assertEqual(set(Reservation.objects.values_list('pk', flat=True)), {self.unsettled.pk, self.recent.pk})
+        self.assertEqual(ArchivedReservation.objects.get().pk, self.old.pk)
+        self.assertEqual(ArchivedPayment.objects.get().reservation_id_id, self.old.pk)
+        self.assertFalse(Review.objects.exists())
+        # Nights, ratings and reports still count the archived stay
+        rebuild_nights()
+        nights = RoomNight.objects.filter(date__lt=date(2022, 4, 1))
+        self.assertEqual(list(nights.values_list('reservation_id', flat=True)), [None] * 3)
+        self.assertEqual(RoomRating.objects.get(pk=self.room.pk).review_count, 1)
+        rebuild_ratings()
+        self.assertEqual(RoomRating.objects.get(pk=self.room.pk).rating_total, 4)
+        cache.clear()
+        self.assertEqual(revenue_report(date(2022, 3, 1), date(2022, 4, 1)), report)
+        self.assertEqual(archive_history(date(2024, 1, 1))[Reservation], 0)
+
+    def test_archive_is_read_only_and_scoped(self):
+        archive_history(date(2024, 1, 1))
+        self.client.force_authenticate(self.guest)
+        response = self.client.get('/api/archive/reservations/')
+        self.assertEqual([row['id'] for row in response.data['results']], [self.old.pk])
+        payment = self.client.get('/api/archive/payments/', {'expand': 'reservation_id'}).data['results'][0]
+        self.assertEqual(payment['reservation_id']['check_in'], '2022-03-01')
+        self.assertEqual(self.client.post('/api/archive/reservations/', {}, format='json').status_code, 405)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get('/api/archive/reviews/').data['results'], [])
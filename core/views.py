@@ -1,15 +1,97 @@
-from rest_framework import viewsets, permissions, status
+from datetime import date
+from rest_framework import filters, viewsets, permissions, serializers, status
+from django.db import transaction
+from django.db.models import FloatField
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from knox.views import LoginView as KnoxLoginView
 from knox.views import LogoutView as KnoxLogoutView
 from knox.models import AuthToken
 from django.contrib.auth import login
+from django.contrib.auth.signals import user_logged_in
 from rest_framework.authtoken.serializers import AuthTokenSerializer
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from .models import *
 from .serializers import *
+from .availability import available_rooms
+from .booking import book_many, book_room, book_room_type, update_many, update_reservation
+from .bulk import BulkMixin
+from .cache import CatalogCacheMixin
+from .conditional import ConditionalGetMixin
+from . import metrics
+from .middleware import api_view_labels
+from .db import ReplicaReadMixin, pool_stats
+from .fastpath import ValuesListMixin
+from .exports import FORMATS, PAYMENT_COLUMNS, RESERVATION_COLUMNS, PassthroughRenderer, aexport_lines, export_lines
+from .occupancy import occupancy_grid
+from .pricing import quote_reservation, quote_stays, record_service_prices
+from .reports import revenue_report
+from .pagination import CreatedAtCursorPagination, PageNumberPagination
+from .signals import bump_version
+from .tasks import QUEUE_GAUGES, queue_stats
+
+# Eager loading: each viewset declares the relations its serializer tree walks,
+# so list endpoints cost a fixed number of queries whatever the page size.
+# Paths are trimmed to the relations the serializer actually renders, so a
+# relation is only joined when it is expanded and not dropped by ``?fields=``.
+class EagerLoadingMixin:
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    def get_queryset(self):
+        return self.apply_eager_loading(super().get_queryset())
+
+    def apply_eager_loading(self, queryset):
+        serializer = self.get_serializer()
+        select_related = {self._rendered_path(serializer, path) for path in self.select_related_fields} - {''}
+        prefetch_related = {self._rendered_path(serializer, path) for path in self.prefetch_related_fields} - {''}
+        if select_related:
+            queryset = queryset.select_related(*sorted(select_related))
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*sorted(prefetch_related))
+        return queryset
+
+    @staticmethod
+    def _rendered_path(serializer, path):
+        rendered = []
+        for name in path.split('__'):
+            field = serializer.fields.get(name)
+            if isinstance(field, serializers.ListSerializer):
+                field = field.child
+            if not isinstance(field, serializers.Serializer):
+                break
+            rendered.append(name)
+            serializer = field
+        return '__'.join(rendered)
+
+# Streaming export (admin only): ``?output=csv`` (default) or ``?output=ndjson``
+class ExportMixin:
+    export_columns = ()
+
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Stream every row as flat CSV or NDJSON (?output=csv|ndjson, admin only)",
+        manual_parameters=[openapi.Parameter('output', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(FORMATS))],
+    )
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser],
+            renderer_classes=[JSONRenderer, PassthroughRenderer])
+    def export(self, request):
+        output = request.query_params.get('output', 'csv')
+        if output not in FORMATS:
+            return Response({'output': [f'Expected one of: {", ".join(FORMATS)}.']}, status=status.HTTP_400_BAD_REQUEST)
+        queryset = self.filter_queryset(self.queryset.model.objects.all())
+        lines = aexport_lines if isinstance(request._request, ASGIRequest) else export_lines
+        response = StreamingHttpResponse(lines(queryset, self.export_columns, output), content_type=FORMATS[output])
+        response['Content-Disposition'] = f'attachment; filename="{self.basename}.{output}"'
+        return response
 
 # Register view
 class RegisterView(APIView):
@@ -65,7 +147,11 @@ class RegisterView(APIView):
         if serializer.is_valid():
             user = serializer.save()
             _, token = AuthToken.objects.create(user)
-            login(request, user)
+            if settings.API_SESSIONS:
+                login(request, user)
+            else:
+                # Token clients never send a session cookie back; keep last_login
+                user_logged_in.send(sender=user.__class__, request=request, user=user)
             return Response({
                 "user": UserSerializer(user).data,
                 "token": token
@@ -104,7 +190,11 @@ class LoginView(KnoxLoginView):
         serializer = AuthTokenSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data['user']
-        login(request, user)
+        if settings.API_SESSIONS:
+            login(request, user)
+        else:
+            # knox issues the token to request.user and sends user_logged_in
+            request.user = user
         return super(LoginView, self).post(request, format=None)
 
 # Logout view
@@ -116,16 +206,79 @@ class LogoutView(KnoxLogoutView):
     def post(self, request, format=None):
         return super(LogoutView, self).post(request, format=None)
 
+# Metrics view
+class MetricsView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(operation_description="Monitoring counters such as catalog cache hits and database pool usage (admin only)")
+    def get(self, request, format=None):
+        return Response({
+            **metrics.snapshot(),
+            'db_pool': pool_stats(),
+            'requests': metrics.request_snapshot(api_view_labels()),
+            'tasks': queue_stats(),
+        })
+
+# Prometheus scrape endpoint, served to scrapers sending METRICS_TOKEN as a bearer
+# token. Behind a proxy REMOTE_ADDR is the proxy's address, so it proves nothing.
+def prometheus_metrics(request):
+    expected = f'Bearer {settings.METRICS_TOKEN}'
+    if not settings.METRICS_TOKEN or not constant_time_compare(request.headers.get('Authorization', ''), expected):
+        return HttpResponseForbidden()
+    tasks = queue_stats()
+    body = metrics.prometheus_text(api_view_labels()) + metrics.prometheus_gauges([
+        (f'task_queue_{name}', description, tasks[name]) for name, description in QUEUE_GAUGES
+    ])
+    return HttpResponse(body, content_type='text/plain; version=0.0.4')
+
+# Quote view
+class QuoteView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    @swagger_auto_schema(
+        operation_description="Price a prospective stay for several room types at once (public)",
+        request_body=QuoteRequestSerializer,
+        responses={200: QuoteSerializer(many=True)},
+    )
+    def post(self, request, format=None):
+        params = QuoteRequestSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        room_types = data.get('room_types') or list(RoomType.objects.order_by('id'))
+        services = [(item['service'], item['quantity']) for item in data.get('services', [])]
+        quotes = quote_stays(room_types, data['check_in'], data['check_out'], services)
+        return Response(QuoteSerializer(quotes, many=True).data)
+
+# Revenue and occupancy report (admin only)
+class ReportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="ADR, RevPAR, occupancy and revenue by room type and payment method per day, week or month (admin only)",
+        query_serializer=ReportRequestSerializer,
+        responses={200: ReportSerializer},
+    )
+    def get(self, request, format=None):
+        params = ReportRequestSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        return Response(ReportSerializer(revenue_report(data['start'], data['end'], data['period'])).data)
+
 # User viewset
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    select_related_fields = ('profile',)
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 6, 'retrieve': 5}
 
     def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return User.objects.none()
+        queryset = super().get_queryset()
         if self.request.user.is_staff:
-            return User.objects.all()
-        return User.objects.filter(id=self.request.user.id)
+            return queryset
+        return queryset.filter(id=self.request.user.id)
 
     @swagger_auto_schema(operation_description="List all users (admin) or the current user")
     def list(self, request, *args, **kwargs):
@@ -136,10 +289,24 @@ class UserViewSet(viewsets.ModelViewSet):
         return super().create(request, *args, **kwargs)
 
 # RoomType viewset
-class RoomTypeViewSet(viewsets.ModelViewSet):
-    queryset = RoomType.objects.all()
+# ``?ordering=-average_rating`` / ``review_count`` sort on the maintained aggregates;
+# unrated types count as 0
+class RoomTypeViewSet(ReplicaReadMixin, ConditionalGetMixin, CatalogCacheMixin, ValuesListMixin, EagerLoadingMixin, viewsets.ModelViewSet):
+    queryset = RoomType.objects.annotate(
+        review_count=Coalesce('rating__review_count', 0),
+        average_rating=Coalesce(
+            Cast('rating__rating_total', FloatField()) / NullIf('rating__review_count', 0), 0.0,
+            output_field=FloatField(),
+        ),
+    ).order_by('id')
     serializer_class = RoomTypeSerializer
+    select_related_fields = ('rating',)
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    query_budget = {'list': 5, 'retrieve': 4}
+    pagination_class = PageNumberPagination
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ('name', 'price_per_night', 'max_occupancy', 'review_count', 'average_rating')
+    cache_models = (RoomType, RoomTypeRating)
 
     @swagger_auto_schema(operation_description="List all room types (public)")
     def list(self, request, *args, **kwargs):
@@ -150,86 +317,328 @@ class RoomTypeViewSet(viewsets.ModelViewSet):
         return super().create(request, *args, **kwargs)
 
 # Room viewset
-class RoomViewSet(viewsets.ModelViewSet):
-    queryset = Room.objects.all()
+class RoomViewSet(ReplicaReadMixin, ConditionalGetMixin, CatalogCacheMixin, BulkMixin, ValuesListMixin, EagerLoadingMixin, viewsets.ModelViewSet):
+    queryset = Room.objects.order_by('id')
     serializer_class = RoomSerializer
+    select_related_fields = ('type_id__rating', 'rating')
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    query_budget = {'list': 5, 'retrieve': 4, 'availability': 6, 'calendar': 6}
+    pagination_class = PageNumberPagination
+    cache_models = (Room, RoomType, RoomRating, RoomTypeRating)
+    replica_actions = ('list', 'retrieve', 'availability')
 
     @swagger_auto_schema(operation_description="List all rooms (public)")
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    @swagger_auto_schema(
+        method='get',
+        operation_description="List rooms free for the whole stay, optionally filtered by room type (public)",
+        query_serializer=AvailabilitySearchSerializer,
+    )
+    @action(detail=False, methods=['get'])
+    def availability(self, request):
+        rooms = self.get_availability_queryset()
+        page = self.paginate_queryset(rooms)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    def get_availability_queryset(self):
+        params = AvailabilitySearchSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        return self.apply_eager_loading(available_rooms(**params.validated_data))
+
+    @swagger_auto_schema(
+        method='get',
+        operation_description="Rooms x nights occupancy grid for the front desk (admin only)",
+        query_serializer=CalendarSearchSerializer,
+    )
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAdminUser])
+    def calendar(self, request):
+        params = CalendarSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        start = params.validated_data.get('start') or date.today()
+        rooms = Room.objects.order_by('number')
+        if 'room_type' in params.validated_data:
+            rooms = rooms.filter(type_id=params.validated_data['room_type'])
+        page = self.paginate_queryset(rooms.values('id', 'number', 'type_id', 'status'))
+        return self.get_paginated_response({
+            'start': start,
+            'days': params.validated_data['days'],
+            'rooms': occupancy_grid(page, start, params.validated_data['days']),
+        })
+
 # ServiceType viewset
-class ServiceTypeViewSet(viewsets.ModelViewSet):
-    queryset = ServiceType.objects.all()
+class ServiceTypeViewSet(ReplicaReadMixin, ConditionalGetMixin, CatalogCacheMixin, viewsets.ModelViewSet):
+    queryset = ServiceType.objects.order_by('id')
     serializer_class = ServiceTypeSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    query_budget = {'list': 5, 'retrieve': 4}
+    pagination_class = PageNumberPagination
+    cache_models = (ServiceType,)
 
     @swagger_auto_schema(operation_description="List all service types (public)")
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
 # Service viewset
-class ServiceViewSet(viewsets.ModelViewSet):
-    queryset = Service.objects.all()
+class ServiceViewSet(ReplicaReadMixin, ConditionalGetMixin, CatalogCacheMixin, EagerLoadingMixin, viewsets.ModelViewSet):
+    queryset = Service.objects.order_by('id')
     serializer_class = ServiceSerializer
+    select_related_fields = ('service_type_id',)
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    query_budget = {'list': 5, 'retrieve': 4}
+    pagination_class = PageNumberPagination
+    cache_models = (Service, ServiceType)
 
     @swagger_auto_schema(operation_description="List all services (public)")
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
 # Reservation viewset
-class ReservationViewSet(viewsets.ModelViewSet):
+class ReservationViewSet(ReplicaReadMixin, ConditionalGetMixin, BulkMixin, ExportMixin, ValuesListMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Reservation.objects.all()
     serializer_class = ReservationSerializer
+    select_related_fields = ('user_id__profile', 'room_id__rating', 'room_id__type_id__rating')
+    export_columns = RESERVATION_COLUMNS
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 6, 'retrieve': 5, 'quote': 6, 'create': 14, 'update': 14, 'partial_update': 14, 'book': 14}
+    pagination_class = CreatedAtCursorPagination
+    replica_actions = ('list', 'retrieve', 'export')
 
     def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Reservation.objects.none()
+        queryset = super().get_queryset()
         if self.request.user.is_staff:
-            return Reservation.objects.all()
-        return Reservation.objects.filter(user_id=self.request.user)
+            return queryset
+        return queryset.filter(user_id=self.request.user)
 
     @swagger_auto_schema(operation_description="List user's reservations (authenticated)")
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
+    # Writes go through the booking engine, which rejects overlapping stays with 409
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        serializer.instance = book_room(
+            user=data['user_id'] if self.request.user.is_staff else self.request.user,
+            room=data['room_id'],
+            check_in=data['check_in'],
+            check_out=data['check_out'],
+            status=data.get('status', 'pending'),
+        )
+
+    def perform_update(self, serializer):
+        changes = dict(serializer.validated_data)
+        if not self.request.user.is_staff:
+            changes.pop('user_id', None)
+        serializer.instance = update_reservation(serializer.instance, **changes)
+
+    def perform_bulk_create(self, validated):
+        if not self.request.user.is_staff:
+            validated = [dict(data, user_id=self.request.user) for data in validated]
+        reservations = book_many([Reservation(**data) for data in validated])
+        bump_version(Reservation)
+        return reservations
+
+    def perform_bulk_update(self, pairs):
+        if not self.request.user.is_staff:
+            for _, changes in pairs:
+                changes.pop('user_id', None)
+        reservations = update_many(pairs)
+        bump_version(Reservation)
+        return reservations
+
+    @swagger_auto_schema(method='get', operation_description="Price of the reservation's stay and services", responses={200: QuoteSerializer})
+    @action(detail=True, methods=['get'])
+    def quote(self, request, pk=None):
+        return Response(QuoteSerializer(quote_reservation(self.get_object())).data)
+
+    @swagger_auto_schema(
+        method='post',
+        operation_description="Book any free room of a room type for the stay (authenticated)",
+        request_body=RoomTypeBookingSerializer,
+        responses={201: ReservationSerializer, 409: "Conflict - No room of this type is free"},
+    )
+    @action(detail=False, methods=['post'])
+    def book(self, request):
+        params = RoomTypeBookingSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        reservation = book_room_type(user=request.user, **params.validated_data)
+        return Response(self.get_serializer(reservation).data, status=status.HTTP_201_CREATED)
+
 # ReservationService viewset
-class ReservationServiceViewSet(viewsets.ModelViewSet):
+class ReservationServiceViewSet(ConditionalGetMixin, BulkMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = ReservationService.objects.all()
     serializer_class = ReservationServiceSerializer
+    select_related_fields = (
+        'reservation_id__user_id__profile',
+        'reservation_id__room_id__rating',
+        'reservation_id__room_id__type_id__rating',
+        'service_id__service_type_id',
+    )
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 6, 'retrieve': 5}
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return ReservationService.objects.none()
+        queryset = super().get_queryset()
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(reservation_id__user_id=self.request.user)
+
+    def perform_bulk_create(self, validated):
+        services = [ReservationService(**data) for data in validated]
+        record_service_prices(services)
+        services = ReservationService.objects.bulk_create(services)
+        bump_version(ReservationService)
+        return services
 
     @swagger_auto_schema(operation_description="List reservation services (authenticated)")
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
 # Payment viewset
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(ReplicaReadMixin, ConditionalGetMixin, ExportMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
+    select_related_fields = (
+        'reservation_id__user_id__profile',
+        'reservation_id__room_id__rating',
+        'reservation_id__room_id__type_id__rating',
+    )
+    export_columns = PAYMENT_COLUMNS
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 6, 'retrieve': 5}
+    replica_actions = ('list', 'retrieve', 'export')
 
     def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Payment.objects.none()
+        queryset = super().get_queryset()
         if self.request.user.is_staff:
-            return Payment.objects.all()
-        return Payment.objects.filter(reservation_id__user_id=self.request.user)
+            return queryset
+        return queryset.filter(reservation_id__user_id=self.request.user)
 
     @swagger_auto_schema(operation_description="List user's payments (authenticated)")
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
 # Review viewset
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(ReplicaReadMixin, ConditionalGetMixin, EagerLoadingMixin, viewsets.ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
+    select_related_fields = (
+        'user_id__profile',
+        'reservation_id__user_id__profile',
+        'reservation_id__room_id__rating',
+        'reservation_id__room_id__type_id__rating',
+    )
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 6, 'retrieve': 5, 'create': 20, 'update': 20, 'partial_update': 20}
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Review.objects.none()
+        queryset = super().get_queryset()
         if self.request.user.is_staff:
-            return Review.objects.all()
-        return Review.objects.filter(user_id=self.request.user)
+            return queryset
+        return queryset.filter(user_id=self.request.user)
 
     @swagger_auto_schema(operation_description="List user's reviews (authenticated)")
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
\ No newline at end of file
+        return super().list(request, *args, **kwargs)
+
+    # A review and the rating aggregates it moves (see core.signals) commit together
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            serializer.save(user_id=serializer.validated_data['reservation_id'].user_id)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            super().perform_update(serializer)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            super().perform_destroy(instance)
+
+# Archive viewsets: finished stays moved out of the live tables by
+# ``manage.py archive_history`` (see core.archive). Read-only; guests see their own.
+class ArchivedReservationViewSet(ConditionalGetMixin, EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = ArchivedReservation.objects.all()
+    serializer_class = ArchivedReservationSerializer
+    select_related_fields = ('user_id__profile', 'room_id__rating', 'room_id__type_id__rating')
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 6, 'retrieve': 5}
+    pagination_class = CreatedAtCursorPagination
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return ArchivedReservation.objects.none()
+        queryset = super().get_queryset()
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(user_id=self.request.user)
+
+class ArchivedReservationServiceViewSet(ConditionalGetMixin, EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = ArchivedReservationService.objects.all()
+    serializer_class = ArchivedReservationServiceSerializer
+    select_related_fields = (
+        'reservation_id__user_id__profile',
+        'reservation_id__room_id__rating',
+        'reservation_id__room_id__type_id__rating',
+        'service_id__service_type_id',
+    )
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 6, 'retrieve': 5}
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return ArchivedReservationService.objects.none()
+        queryset = super().get_queryset()
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(reservation_id__user_id=self.request.user)
+
+class ArchivedPaymentViewSet(ConditionalGetMixin, EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = ArchivedPayment.objects.all()
+    serializer_class = ArchivedPaymentSerializer
+    select_related_fields = (
+        'reservation_id__user_id__profile',
+        'reservation_id__room_id__rating',
+        'reservation_id__room_id__type_id__rating',
+    )
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 6, 'retrieve': 5}
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return ArchivedPayment.objects.none()
+        queryset = super().get_queryset()
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(reservation_id__user_id=self.request.user)
+
+class ArchivedReviewViewSet(ConditionalGetMixin, EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = ArchivedReview.objects.all()
+    serializer_class = ArchivedReviewSerializer
+    select_related_fields = (
+        'user_id__profile',
+        'reservation_id__user_id__profile',
+        'reservation_id__room_id__rating',
+        'reservation_id__room_id__type_id__rating',
+    )
+    permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 6, 'retrieve': 5}
+    pagination_class = CreatedAtCursorPagination
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return ArchivedReview.objects.none()
+        queryset = super().get_queryset()
+        if self.request.user.is_staff:
+            return queryset
+        return queryset.filter(user_id=self.request.user)
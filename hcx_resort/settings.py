@@ -10,8 +10,10 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -45,15 +47,23 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',  # Outermost, so total latency covers every other middleware
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    # The Lean* classes are Django's, skipped on token-authenticated API routes (see API_SESSIONS)
+    'core.middleware.LeanSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.LeanCsrfViewMiddleware',
+    'core.middleware.LeanAuthenticationMiddleware',
+    'core.middleware.LeanMessageMiddleware',
+    'core.middleware.LeanXFrameOptionsMiddleware',
 ]
 
+# API routes authenticate with knox tokens. Unless API_SESSIONS is on, requests under
+# these prefixes skip the session, CSRF, messages and clickjacking middleware, and
+# the login and register endpoints do not start a session.
+API_PATH_PREFIXES = ('/api/',)
+API_SESSIONS = os.getenv('API_SESSIONS', default='').lower() in ('1', 'true', 'yes')
+
 ROOT_URLCONF = 'hcx_resort.urls'
 
 TEMPLATES = [
@@ -85,25 +95,157 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST', default='localhost'),
         'PORT': os.getenv('DB_PORT', default='5432'),
+        # Keep connections open between requests, checking them before reuse
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default='60')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
     }
 }
 
+# Connection pooling (DB_POOL=1) replaces persistent connections with a
+# psycopg 3 pool shared by the worker's threads.
+if os.getenv('DB_POOL', default='').lower() in ('1', 'true', 'yes'):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', default='2')),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', default='10')),
+        'timeout': int(os.getenv('DB_POOL_TIMEOUT', default='10')),
+    }
+
+
+# Read replicas: DB_REPLICA_HOSTS=replica1.internal,replica2.internal adds one alias
+# per host (same credentials as default). core.db.ReplicaRouter sends safe list and
+# retrieve requests there; writes and reads following a user's own write stay on
+# the primary for REPLICA_STICKY_SECONDS, which should exceed replication lag.
+# That window is kept in the cache, so replicas require CACHE_URL (check core.E001).
+
+for index, host in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', default='').split(',')), start=1):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', default='30'))
+
+# Cache
+# Local memory by default; set CACHE_URL=redis://host:6379/0 to share the cache
+# across worker processes. A local cache is private to each process, so catalog
+# caching, the version-token ETags and the task worker need a shared one
+# (SHARED_CACHE) and are off or refused without it.
+
+CACHE_URL = os.getenv('CACHE_URL')
+SHARED_CACHE = bool(CACHE_URL and CACHE_URL.startswith(('redis://', 'rediss://')))
+
+# Metrics counters (see core.metrics) have their own cache so cached responses
+# never evict them: on Redis they are stored without expiry (keep maxmemory-policy
+# at noeviction or a volatile-* policy, or set METRICS_CACHE_URL to a separate
+# instance), in local memory the cache has no entry limit.
+
+if SHARED_CACHE:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        },
+        'metrics': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('METRICS_CACHE_URL', default=CACHE_URL),
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+        'metrics': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'metrics',
+            'OPTIONS': {'MAX_ENTRIES': sys.maxsize},
+        },
+    }
+
+# Catalog responses are invalidated on write, the timeout only bounds memory use
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', default='3600'))
+QUOTE_CACHE_TIMEOUT = int(os.getenv('QUOTE_CACHE_TIMEOUT', default='3600'))
+# Reports of past periods are cached for a month, once they closed more than
+# REPORT_CACHE_GRACE_DAYS ago: until then late cancellations and back-dated
+# payments still move their figures
+REPORT_CACHE_TIMEOUT = int(os.getenv('REPORT_CACHE_TIMEOUT', default=str(30 * 24 * 3600)))
+REPORT_CACHE_GRACE_DAYS = int(os.getenv('REPORT_CACHE_GRACE_DAYS', default='7'))
 
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'knox.auth.TokenAuthentication',  # Use Knox token authentication
+        'core.auth.CachedTokenAuthentication',  # Knox token authentication with verified tokens cached
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',  # Require authentication by default
     ],
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.CursorPagination',  # Keyset pagination on indexed columns
+    # orjson when installed, DRF's json module otherwise (same output)
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'PAGE_SIZE': 50,
 }
 
 # Knox settings (optional)
 REST_KNOX = {
-    'TOKEN_TTL': None,  # Tokens don't expire by default; set to timedelta(hours=24) for expiration
+    # Tokens don't expire by default; set KNOX_TOKEN_TTL_HOURS (e.g. 24) for expiration
+    'TOKEN_TTL': timedelta(hours=int(os.getenv('KNOX_TOKEN_TTL_HOURS'))) if os.getenv('KNOX_TOKEN_TTL_HOURS') else None,
 }
 
+# Seconds a verified token is served from the cache without a database lookup
+TOKEN_CACHE_TIMEOUT = int(os.getenv('TOKEN_CACHE_TIMEOUT', default='60'))
+
+# OpenAPI schema: cached per code version; set CODE_VERSION to the release (e.g. git SHA)
+# to skip hashing the sources at startup, and run `manage.py generate_schema` on deploy
+CODE_VERSION = os.getenv('CODE_VERSION', default='')
+OPENAPI_SCHEMA_DIR = os.getenv('OPENAPI_SCHEMA_DIR', default=str(BASE_DIR / 'openapi'))
+
+# Serve hot list endpoints from .values() rows (see core.fastpath)
+FAST_LIST_SERIALIZATION = os.getenv('FAST_LIST_SERIALIZATION', default='true').lower() in ('1', 'true', 'yes')
+
+# Per-endpoint query count and latency metrics (see core.middleware), scraped from /metrics
+REQUEST_METRICS = os.getenv('REQUEST_METRICS', default='true').lower() in ('1', 'true', 'yes')
+# Adds X-DB-Queries and Server-Timing headers to API responses
+REQUEST_METRICS_HEADERS = os.getenv('REQUEST_METRICS_HEADERS', default='').lower() in ('1', 'true', 'yes')
+# Raise instead of logging when a view exceeds its query_budget; always on under `manage.py test`
+QUERY_BUDGET_STRICT = (
+    os.getenv('QUERY_BUDGET_STRICT', default='').lower() in ('1', 'true', 'yes') or sys.argv[1:2] == ['test']
+)
+# Bearer token Prometheus sends to scrape /metrics; unset, the endpoint is closed
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', default='')
+
+# Background tasks (see core.tasks), run by `manage.py run_worker`
+# Seconds after which a running task whose worker stopped responding is queued again
+TASK_TIMEOUT = int(os.getenv('TASK_TIMEOUT', default='600'))
+TASK_RETENTION_DAYS = int(os.getenv('TASK_RETENTION_DAYS', default='7'))
+
+# History archival (see core.archive), run by `manage.py archive_history`: finished
+# stays move to the archive tables this many days after check-out
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', default='730'))
+
+# Outgoing email (confirmations, receipts); printed to the worker's stdout unless configured
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.getenv('EMAIL_HOST', default='localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', default='25'))
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', default='').lower() in ('1', 'true', 'yes')
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', default='reservations@hcx-resort.example')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -1,15 +1,16 @@
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions
 from core.views import *
 from django.conf.urls.static import static
 from django.conf import settings
+from core.asyncviews import AsyncReservationListView, AsyncRoomAvailabilityView, AsyncRoomListView, AsyncRoomTypeListView
+from core.schema import get_cached_schema_view
 
-# Swagger setup
-schema_view = get_schema_view(
+# Swagger setup: the spec is generated once per code version (see core.schema)
+schema_view = get_cached_schema_view(
     openapi.Info(
         title="Hotel Booking API",
         default_version='v1',
@@ -18,7 +19,6 @@ schema_view = get_schema_view(
         contact=openapi.Contact(email="support@example.com"),
         license=openapi.License(name="MIT License"),
     ),
-    public=True,
     permission_classes=(permissions.AllowAny,),
 )
 
@@ -32,6 +32,10 @@ router.register(r'reservations', ReservationViewSet)
 router.register(r'reservation-services', ReservationServiceViewSet)
 router.register(r'payments', PaymentViewSet)
 router.register(r'reviews', ReviewViewSet)
+router.register(r'archive/reservations', ArchivedReservationViewSet)
+router.register(r'archive/reservation-services', ArchivedReservationServiceViewSet)
+router.register(r'archive/payments', ArchivedPaymentViewSet)
+router.register(r'archive/reviews', ArchivedReviewViewSet)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -39,6 +43,15 @@ urlpatterns = [
     path('api/register/', RegisterView.as_view(), name='register'),
     path('api/login/', LoginView.as_view(), name='login'),
     path('api/logout/', LogoutView.as_view(), name='logout'),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
+    path('metrics', prometheus_metrics, name='prometheus-metrics'),
+    path('api/quotes/', QuoteView.as_view(), name='quotes'),
+    path('api/reports/', ReportView.as_view(), name='reports'),
+    # Async variants of the read-heavy lists, for ASGI deployments (see core.asyncviews)
+    path('api/async/room-types/', AsyncRoomTypeListView.as_view(), name='async-room-types'),
+    path('api/async/rooms/', AsyncRoomListView.as_view(), name='async-rooms'),
+    path('api/async/rooms/availability/', AsyncRoomAvailabilityView.as_view(), name='async-room-availability'),
+    path('api/async/reservations/', AsyncReservationListView.as_view(), name='async-reservations'),
     # Swagger endpoints
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),